@@ -0,0 +1,50 @@
+"""
+Configuração padrão do app, sem dependências de interface.
+Compartilhada pela GUI (main.py) e pelo modo headless (cli.py).
+"""
+
+from typing import Dict, Optional
+
+from transcription import DEFAULT_BACKEND_CONFIG
+from vad import VADConfig
+
+# Configurações padrão
+DEFAULT_CONFIG = {
+    "shortcuts": {
+        "record": "ctrl+shift+r",
+        "stop": "ctrl+shift+s",
+        "history": "ctrl+shift+h"
+    },
+    "whisper_model": DEFAULT_BACKEND_CONFIG["whisper_model"],
+    # openai | faster-whisper (local, modelo carregado uma vez na inicialização)
+    "transcription_backend": DEFAULT_BACKEND_CONFIG["transcription_backend"],
+    "local_whisper_model": DEFAULT_BACKEND_CONFIG["local_whisper_model"],
+    "local_whisper_threads": DEFAULT_BACKEND_CONFIG["local_whisper_threads"],
+    "audio_encoder": "flac",  # wav | flac | opus | vorbis
+    "gpt_model": "gpt-4-turbo",
+    "use_gpt_enhancement": True,
+    # Mostra o texto do GPT conforme chega (e opcionalmente já copia parcial)
+    "stream_enhancement": True,
+    "stream_to_clipboard": False,
+    # Transcrições longas: tamanho máximo de cada pedaço e pedaços em paralelo
+    "enhancement_chunk_tokens": 3000,
+    "enhancement_parallelism": 4,
+    "streaming_transcription": True,
+    "vad_trim": True,
+    "vad_padding_ms": 300,
+    "vad_min_silence_ms": 600,
+    # Agendador de jobs: workers, concorrência por etapa e limite da fila
+    "max_concurrent_jobs": 2,
+    "stage_limits": {"upload": 2, "enhancement": 1},
+    "max_queued_jobs": 20,
+    "auto_start_minimized": True
+}
+
+def vad_config(config: Dict) -> Optional[VADConfig]:
+    """Configuração do VAD a partir do config (None se desativado)."""
+    if not config.get("vad_trim"):
+        return None
+    return VADConfig(
+        padding_ms=config["vad_padding_ms"],
+        min_silence_ms=config["vad_min_silence_ms"]
+    )
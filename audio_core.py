@@ -10,32 +10,308 @@ import numpy as np
 from datetime import datetime
 import threading
 import queue
+import io
 import os
-from dataclasses import dataclass
-from typing import Optional, Callable
+from typing import Optional, Callable, List, Dict
 import tempfile
 import time
 
-@dataclass
-class AudioSegment:
-    """Representa um segmento de áudio com metadados."""
-    data: np.ndarray
-    timestamp: datetime
-    duration: float
+from transcription import TranscriptResult
+from vad import VADConfig, frame_features, trim_silence
+
+# Encoders disponíveis: nome -> (formato, subtipo, extensão) do libsndfile.
+# Todos são aceitos pela API do Whisper.
+ENCODERS = {
+    "wav": ("WAV", "PCM_16", ".wav"),      # sem compressão (~1.9 MB/min @16kHz)
+    "flac": ("FLAC", "PCM_16", ".flac"),   # sem perdas (~50-60% do WAV)
+    "opus": ("OGG", "OPUS", ".ogg"),       # com perdas (~10x menor)
+    "vorbis": ("OGG", "VORBIS", ".ogg"),
+}
+
+def get_encoder(name: str):
+    """Retorna (formato, subtipo, extensão) do encoder ou ValueError."""
+    try:
+        return ENCODERS[name]
+    except KeyError:
+        raise ValueError(f"Encoder desconhecido: {name} (use {', '.join(ENCODERS)})")
+
+class RingBuffer:
+    """Buffer circular int16 pré-alocado, single-producer/single-consumer.
+
+    O callback do PortAudio (produtor) só escreve e avança `_write_pos`;
+    a thread de escrita (consumidor) só lê e avança `_read_pos`. Cada
+    índice tem um único dono, então não há lock nem alocação no caminho
+    quente - os índices crescem monotonicamente e a posição real é o
+    módulo da capacidade.
+    """
+
+    def __init__(self, capacity_frames: int, channels: int = 1):
+        self.capacity = capacity_frames
+        self.channels = channels
+        self._buffer = np.zeros((capacity_frames, channels), dtype=np.int16)
+        self._write_pos = 0
+        self._read_pos = 0
+
+        # Estatísticas (escritas só pelo produtor)
+        self.high_water = 0
+        self.overruns = 0
+
+    def reset(self):
+        """Zera índices e estatísticas. Só chamar sem produtor ativo."""
+        self._write_pos = 0
+        self._read_pos = 0
+        self.high_water = 0
+        self.overruns = 0
+
+    @property
+    def available(self) -> int:
+        """Frames prontos para leitura."""
+        return self._write_pos - self._read_pos
+
+    def write(self, data: np.ndarray) -> bool:
+        """Copia um bloco para o buffer. Retorna False (overrun) se não couber."""
+        frames = len(data)
+        read_pos = self._read_pos
+        used = self._write_pos - read_pos
+        if frames > self.capacity - used:
+            self.overruns += 1
+            return False
+
+        start = self._write_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        self._buffer[start:start + first] = data[:first]
+        if first < frames:
+            self._buffer[:frames - first] = data[first:]
+
+        # Publica os dados só depois da cópia completa
+        self._write_pos += frames
+
+        used += frames
+        if used > self.high_water:
+            self.high_water = used
+        return True
+
+    def peek(self, max_frames: Optional[int] = None) -> np.ndarray:
+        """Retorna view contígua dos próximos frames (sem copiar).
+
+        Para no fim físico do buffer; chame de novo após `advance` para
+        pegar o restante.
+        """
+        available = self.available
+        if max_frames is not None:
+            available = min(available, max_frames)
+        start = self._read_pos % self.capacity
+        end = min(start + available, self.capacity)
+        return self._buffer[start:end]
+
+    def advance(self, frames: int):
+        """Libera frames já consumidos para o produtor."""
+        self._read_pos += frames
+
+class SilenceChunker:
+    """Corta o fluxo de áudio ao vivo em pedaços nas pausas de fala.
+
+    Recebe fatias de PCM na ordem em que foram gravadas e devolve pedaços
+    completos assim que encontra um silêncio depois de `min_chunk_seconds`.
+    Se a fala não der trégua, corta à força em `max_chunk_seconds`.
+    """
+
+    FRAME_MS = 30
+
+    def __init__(self,
+                 sample_rate: int,
+                 min_chunk_seconds: float = 20.0,
+                 max_chunk_seconds: float = 60.0,
+                 silence_seconds: float = 0.6,
+                 silence_threshold: float = 500.0):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * self.FRAME_MS / 1000)
+        self.min_samples = int(min_chunk_seconds * sample_rate)
+        self.max_samples = int(max_chunk_seconds * sample_rate)
+        self.silence_samples = int(silence_seconds * sample_rate)
+        self.silence_threshold = silence_threshold
+
+        self._pending: List[np.ndarray] = []
+        self._pending_len = 0
+        self._analysed = 0  # amostras do pendente já analisadas
+        self._silent_run = 0
+
+    def feed(self, data: np.ndarray) -> List[np.ndarray]:
+        """Adiciona áudio e retorna os pedaços fechados (pode ser vazio)."""
+        if len(data) == 0:
+            return []
+        self._pending.append(np.array(data, copy=True))
+        self._pending_len += len(data)
+
+        chunks = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            chunks.append(self._split(cut))
+        return chunks
+
+    def flush(self) -> Optional[np.ndarray]:
+        """Retorna o áudio restante como último pedaço."""
+        if not self._pending_len:
+            return None
+        return self._split(self._pending_len)
+
+    def _find_cut(self) -> Optional[int]:
+        """Analisa frames novos e retorna a posição de corte, se houver."""
+        usable = (self._pending_len - self._analysed) // self.frame_len
+        if usable == 0:
+            return None
+
+        audio = self._joined()
+        frames = audio[self._analysed:self._analysed + usable * self.frame_len]
+        rms, _ = frame_features(frames, self.sample_rate, self.FRAME_MS)
+
+        for is_silent in rms < self.silence_threshold:
+            self._analysed += self.frame_len
+            self._silent_run = self._silent_run + self.frame_len if is_silent else 0
+
+            if (self._silent_run >= self.silence_samples
+                    and self._analysed >= self.min_samples):
+                # Corta no meio da pausa
+                return self._analysed - self._silent_run // 2
+            if self._analysed >= self.max_samples:
+                return self._analysed
+        return None
+
+    def _joined(self) -> np.ndarray:
+        """Concatena o pendente num único array (só quando necessário)."""
+        if len(self._pending) > 1:
+            self._pending = [np.concatenate(self._pending)]
+        return self._pending[0]
+
+    def _split(self, cut: int) -> np.ndarray:
+        """Separa o pedaço [0, cut) e mantém o resto como pendente."""
+        audio = self._joined()
+        chunk, rest = audio[:cut], audio[cut:]
+        self._pending = [rest] if len(rest) else []
+        self._pending_len = len(rest)
+        self._analysed = max(0, self._analysed - cut)
+        self._silent_run = min(self._silent_run, self._analysed)
+        return chunk
+
+class StreamingTranscriber:
+    """Transcreve pedaços de áudio em background durante a gravação.
+
+    `transcribe_fn` recebe um arquivo WAV em memória e devolve o
+    TranscriptResult do backend.
+    Os pedaços são processados em ordem por uma única thread e o texto
+    final é costurado na ordem de gravação em `finish()`. Com `vad_config`,
+    os silêncios de cada pedaço são cortados antes do envio.
+    """
+
+    def __init__(self,
+                 transcribe_fn: Callable[[io.BytesIO], TranscriptResult],
+                 sample_rate: int = 16000,
+                 vad_config: Optional[VADConfig] = None,
+                 encoder: str = "wav"):
+        self.transcribe_fn = transcribe_fn
+        self.sample_rate = sample_rate
+        self.vad_config = vad_config
+        self.encoder = get_encoder(encoder)
+
+        # Durações (segundos) gravada e efetivamente enviada
+        self.original_duration = 0.0
+        self.trimmed_duration = 0.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._results: Dict[int, str] = {}
+        self._errors: List[Exception] = []
+        self._all_cached = True
+        self._next_index = 0
+        self._discarded = False
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, samples: np.ndarray) -> Optional[int]:
+        """Enfileira um pedaço para transcrição e retorna seu índice.
+
+        Pedaços sem fala (após o VAD) são descartados e retornam None.
+        """
+        self.original_duration += len(samples) / self.sample_rate
+        if self.vad_config:
+            samples = trim_silence(samples, self.sample_rate, self.vad_config)
+            if len(samples) == 0:
+                return None
+        self.trimmed_duration += len(samples) / self.sample_rate
+
+        file_format, subtype, suffix = self.encoder
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, self.sample_rate, format=file_format, subtype=subtype)
+        buffer.seek(0)
+
+        index = self._next_index
+        self._next_index += 1
+        buffer.name = f"chunk_{index:04d}{suffix}"  # OpenAI usa o nome p/ formato
+        self._queue.put((index, buffer))
+        return index
+
+    @property
+    def cached(self) -> bool:
+        """True se todos os pedaços enviados saíram do cache de transcrições."""
+        return bool(self._results) and self._all_cached
+
+    @property
+    def pending(self) -> int:
+        """Pedaços ainda aguardando transcrição."""
+        return self._queue.qsize()
+
+    def _run(self):
+        """Loop do worker de transcrição."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            index, buffer = item
+            if self._discarded:
+                continue
+            try:
+                result = self.transcribe_fn(buffer)
+                self._results[index] = result.text.strip()
+                self._all_cached = self._all_cached and result.cached
+            except Exception as e:
+                print(f"Error transcribing chunk {index}: {e}")
+                self._errors.append(e)
+
+    def finish(self, timeout: Optional[float] = None) -> str:
+        """Aguarda os pedaços restantes e retorna o texto costurado."""
+        self._queue.put(None)
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            raise TimeoutError("Transcrição em streaming não terminou a tempo")
+        if self._errors:
+            raise self._errors[0]
+
+        texts = (self._results.get(i, "") for i in range(self._next_index))
+        return " ".join(t for t in texts if t)
+
+    def discard(self):
+        """Abandona o streaming: pedaços ainda na fila não são enviados."""
+        self._discarded = True
+        self._queue.put(None)
 
 class AudioRecorder:
     """Gerenciador de gravação de áudio thread-safe."""
     
-    MAX_QUEUE_SIZE = 200  # ~10 segundos de áudio
+    BLOCK_SIZE = 2048
+    RING_BLOCKS = 200  # ~25 segundos de áudio a 16kHz
+    DRAIN_INTERVAL = 0.05  # segundos entre drenagens do buffer
     
-    def __init__(self, sample_rate: int = 16000, channels: int = 1):
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, encoder: str = "wav"):
         self.sample_rate = sample_rate
         self.channels = channels
         self.dtype = 'int16'
+        self.encoder = encoder
+        get_encoder(encoder)  # valida cedo
         
         # Thread-safety
         self._lock = threading.Lock()
-        self._audio_queue: queue.Queue = queue.Queue(maxsize=self.MAX_QUEUE_SIZE)
+        self._ring = RingBuffer(self.BLOCK_SIZE * self.RING_BLOCKS, channels)
         self._is_recording = False
         self._is_paused = False
         self._stream: Optional[sd.InputStream] = None
@@ -46,6 +322,8 @@ class AudioRecorder:
         
         # Callbacks
         self._status_callback: Optional[Callable] = None
+        self._chunk_callback: Optional[Callable[[np.ndarray], None]] = None
+        self._chunker: Optional[SilenceChunker] = None
         
         # Estatísticas
         self._start_time: Optional[datetime] = None
@@ -61,6 +339,28 @@ class AudioRecorder:
         """Define callback para mudanças de status."""
         self._status_callback = callback
         
+    def set_chunk_callback(self, callback: Optional[Callable[[np.ndarray], None]]):
+        """Ativa o modo streaming: recebe pedaços cortados nas pausas.
+
+        O callback roda na thread de escrita, que também entrega o último
+        pedaço antes de terminar. Passe None para desativar.
+        """
+        self._chunk_callback = callback
+
+    @property
+    def draining(self) -> bool:
+        """True se a thread de escrita ainda não terminou após `stop_recording`
+        (o último pedaço do modo streaming pode não ter sido entregue)."""
+        return bool(self._processor_thread and self._processor_thread.is_alive()
+                    and not self._processor_running)
+
+    def _emit_chunk(self, chunk: np.ndarray):
+        """Entrega um pedaço ao callback de streaming."""
+        try:
+            self._chunk_callback(chunk)
+        except Exception as e:
+            print(f"Error in chunk callback: {e}")
+
     def _notify_status(self, status: str):
         """Notifica mudança de status se callback definido."""
         if self._status_callback:
@@ -79,17 +379,9 @@ class AudioRecorder:
             print(f"Audio status: {status}")
             
         try:
-            # Cria cópia para evitar problemas de memória
-            audio_copy = indata.copy()
-            
-            # Back-pressure: descarta se fila cheia
-            try:
-                self._audio_queue.put_nowait(AudioSegment(
-                    data=audio_copy,
-                    timestamp=datetime.now(),
-                    duration=len(audio_copy) / self.sample_rate
-                ))
-            except queue.Full:
+            # Copia direto para o buffer pré-alocado (sem alocação por bloco)
+            if not self._ring.write(indata):
+                # Back-pressure: descarta se buffer cheio
                 self._dropped_frames += 1
                 if self._dropped_frames % 100 == 0:  # Log a cada 100 drops
                     print(f"WARNING: Dropped {self._dropped_frames} frames")
@@ -105,14 +397,19 @@ class AudioRecorder:
                 
             try:
                 # Reset completo do estado
-                self._audio_queue = queue.Queue(maxsize=self.MAX_QUEUE_SIZE)
+                self._ring.reset()
                 self._dropped_frames = 0
                 self._segments_count = 0
                 self._total_duration = 0.0
+                self._chunker = (
+                    SilenceChunker(self.sample_rate)
+                    if self._chunk_callback else None
+                )
                 
-                # Cria arquivo temporário para gravação
+                # Cria arquivo temporário para gravação (codificado on-the-fly)
+                file_format, subtype, suffix = get_encoder(self.encoder)
                 self._temp_file = tempfile.NamedTemporaryFile(
-                    suffix='.wav', 
+                    suffix=suffix, 
                     delete=False
                 )
                 self._wave_writer = sf.SoundFile(
@@ -120,8 +417,8 @@ class AudioRecorder:
                     mode='w',
                     samplerate=self.sample_rate,
                     channels=self.channels,
-                    format='WAV',
-                    subtype='PCM_16'
+                    format=file_format,
+                    subtype=subtype
                 )
                 
                 # Flags de controle
@@ -132,6 +429,7 @@ class AudioRecorder:
                 # Inicia thread para processar fila ANTES do stream
                 self._processor_thread = threading.Thread(
                     target=self._process_audio_queue,
+                    args=(self._chunker,),
                     daemon=True
                 )
                 self._processor_thread.start()
@@ -142,7 +440,7 @@ class AudioRecorder:
                     channels=self.channels,
                     dtype=self.dtype,
                     callback=self._audio_callback,
-                    blocksize=2048
+                    blocksize=self.BLOCK_SIZE
                 )
                 self._stream.start()
                 
@@ -155,32 +453,56 @@ class AudioRecorder:
                 self._cleanup()
                 return False
     
-    def _process_audio_queue(self):
-        """Processa fila de áudio e salva em disco."""
+    def _process_audio_queue(self, chunker: Optional[SilenceChunker] = None):
+        """Drena o buffer circular em fatias grandes e salva em disco.
+        
+        `chunker` é o da gravação que iniciou esta thread (não o atual de
+        `self`, que muda se outra gravação começar antes de ela terminar).
+        """
         while self._processor_running:
             try:
-                # Timeout curto para responder rápido ao stop
-                segment = self._audio_queue.get(timeout=0.1)
-                
-                # Salva no arquivo temporário
-                if self._wave_writer and not self._wave_writer.closed:
-                    self._wave_writer.write(segment.data.flatten())
-                    self._segments_count += 1
-                    self._total_duration += segment.duration
-                    
-            except queue.Empty:
-                continue
+                if not self._drain_ring(chunker):
+                    # Nada pendente: dorme um pouco para acumular blocos
+                    time.sleep(self.DRAIN_INTERVAL)
             except Exception as e:
                 print(f"Error processing audio: {e}")
+                time.sleep(self.DRAIN_INTERVAL)
         
-        # Esvazia fila restante antes de sair
-        while not self._audio_queue.empty():
+        # Esvazia buffer restante antes de sair
+        try:
+            self._drain_ring(chunker)
+        except Exception as e:
+            print(f"Error processing audio: {e}")
+        
+        # Último pedaço do modo streaming: entregue aqui, depois do último
+        # feed(), para não concorrer com a drenagem
+        if chunker:
             try:
-                segment = self._audio_queue.get_nowait()
-                if self._wave_writer and not self._wave_writer.closed:
-                    self._wave_writer.write(segment.data.flatten())
-            except:
-                break
+                last_chunk = chunker.flush()
+                if last_chunk is not None:
+                    self._emit_chunk(last_chunk)
+            except Exception as e:
+                print(f"Error flushing last chunk: {e}")
+    
+    def _drain_ring(self, chunker: Optional[SilenceChunker] = None) -> int:
+        """Escreve todo o conteúdo disponível do buffer. Retorna frames escritos."""
+        written = 0
+        while True:
+            chunk = self._ring.peek()
+            frames = len(chunk)
+            if frames == 0:
+                return written
+            
+            if self._wave_writer and not self._wave_writer.closed:
+                self._wave_writer.write(chunk)
+            if chunker:
+                for piece in chunker.feed(chunk):
+                    self._emit_chunk(piece)
+            self._ring.advance(frames)
+            
+            written += frames
+            self._segments_count += 1
+            self._total_duration += frames / self.sample_rate
     
     def pause_recording(self) -> bool:
         """Pausa gravação mantendo dados."""
@@ -243,6 +565,12 @@ class AudioRecorder:
             if self._processor_thread and self._processor_thread.is_alive():
                 self._processor_thread.join(timeout=2.0)
             
+            # O último pedaço do modo streaming sai pela própria thread,
+            # depois do último feed() (ela guarda a referência ao chunker)
+            if self._processor_thread and self._processor_thread.is_alive():
+                print("Audio processor still draining after stop")
+            self._chunker = None
+            
             # Fecha arquivo
             temp_path = None
             if self._wave_writer:
@@ -292,12 +620,8 @@ class AudioRecorder:
                 pass
             self._temp_file = None
         
-        # Esvazia fila
-        while not self._audio_queue.empty():
-            try:
-                self._audio_queue.get_nowait()
-            except:
-                break
+        # Descarta o que ficou no buffer
+        self._ring.reset()
     
     @property
     def is_recording(self) -> bool:
@@ -315,7 +639,9 @@ class AudioRecorder:
                     "segments": 0,
                     "status": "idle",
                     "queue_size": 0,
-                    "dropped_frames": 0
+                    "dropped_frames": 0,
+                    "ring_high_water": 0,
+                    "ring_overruns": 0
                 }
             
             status = "idle"
@@ -327,8 +653,12 @@ class AudioRecorder:
                 "duration": duration,
                 "segments": self._segments_count,
                 "status": status,
-                "queue_size": self._audio_queue.qsize(),
-                "dropped_frames": self._dropped_frames
+                # Em blocos, para manter a mesma escala da antiga fila
+                "queue_size": self._ring.available // self.BLOCK_SIZE,
+                "dropped_frames": self._dropped_frames,
+                "ring_high_water": self._ring.high_water,
+                "ring_capacity": self._ring.capacity,
+                "ring_overruns": self._ring.overruns
             }
             
     def __del__(self):
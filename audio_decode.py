@@ -0,0 +1,144 @@
+"""
+Decodificação em streaming de arquivos de áudio existentes.
+Lê em blocos (sem carregar o arquivo inteiro) e grava FLAC mono.
+Aceita caminho ou arquivo aberto em modo binário (ex: buffer do bot).
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import soundfile as sf
+
+SUPPORTED_EXTENSIONS = (".mp3", ".m4a", ".ogg", ".oga", ".opus", ".wav", ".flac", ".webm")
+BLOCK_FRAMES = 64 * 1024
+# Taxa usada quando o ffmpeg decodifica (é a que o Whisper usa internamente)
+FFMPEG_SAMPLE_RATE = 16000
+
+AudioSource = Union[str, BinaryIO]
+
+@dataclass
+class DecodedAudio:
+    """Arquivo decodificado pronto para o pipeline."""
+    path: str
+    sample_rate: int
+    duration: float
+
+def _to_mono_int16(block: np.ndarray) -> np.ndarray:
+    """Mistura os canais e converte para int16."""
+    if block.ndim > 1 and block.shape[1] > 1:
+        block = block.astype(np.int32).mean(axis=1)
+    return block.reshape(-1).astype(np.int16, copy=False)
+
+def _source_name(source: AudioSource) -> str:
+    return os.path.basename(source if isinstance(source, str) else getattr(source, "name", "") or "áudio")
+
+def _soundfile_blocks(source: AudioSource, block_frames: int) -> Tuple[int, Iterator[np.ndarray]]:
+    """Abre via libsndfile (wav/flac/ogg e mp3 em versões recentes)."""
+    handle = sf.SoundFile(source)
+
+    def blocks():
+        with handle:
+            for block in handle.blocks(blocksize=block_frames, dtype='int16', always_2d=True):
+                yield _to_mono_int16(block)
+
+    return handle.samplerate, blocks()
+
+def _feed_stdin(process: subprocess.Popen, source: BinaryIO):
+    """Copia o arquivo aberto para o stdin do ffmpeg (thread própria)."""
+    try:
+        for data in iter(lambda: source.read(BLOCK_FRAMES * 2), b""):
+            process.stdin.write(data)
+    except (BrokenPipeError, ValueError):
+        pass  # ffmpeg terminou antes (erro aparece no stderr)
+    finally:
+        try: process.stdin.close()
+        except OSError: pass
+
+def _ffmpeg_blocks(source: AudioSource, block_frames: int) -> Tuple[int, Iterator[np.ndarray]]:
+    """Decodifica via subprocesso do ffmpeg (m4a/aac e o que mais faltar).
+
+    Arquivos abertos vão pelo stdin; formatos que precisam de seek (ex:
+    MP4 com o índice no final) só funcionam a partir de um caminho.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(f"Formato não suportado sem ffmpeg: {_source_name(source)}")
+
+    from_pipe = not isinstance(source, str)
+    input_args = ["-i", "pipe:0"] if from_pipe else ["-nostdin", "-i", source]
+    process = subprocess.Popen(
+        [ffmpeg, "-v", "error", *input_args,
+         "-f", "s16le", "-ac", "1", "-ar", str(FFMPEG_SAMPLE_RATE), "-"],
+        stdin=subprocess.PIPE if from_pipe else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    feeder = None
+    if from_pipe:
+        feeder = threading.Thread(target=_feed_stdin, args=(process, source), daemon=True)
+        feeder.start()
+
+    def blocks():
+        block_bytes = block_frames * 2
+        try:
+            while True:
+                data = process.stdout.read(block_bytes)
+                if not data:
+                    break
+                yield np.frombuffer(data[:len(data) - len(data) % 2], dtype=np.int16)
+        finally:
+            process.stdout.close()
+            if feeder:
+                feeder.join()
+            stderr = process.stderr.read().decode(errors="replace").strip()
+            process.stderr.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg falhou: {stderr or process.returncode}")
+
+    return FFMPEG_SAMPLE_RATE, blocks()
+
+def iter_blocks(source: AudioSource, block_frames: int = BLOCK_FRAMES) -> Tuple[int, Iterator[np.ndarray]]:
+    """Retorna (taxa de amostragem, gerador de blocos int16 mono).
+
+    Tenta libsndfile primeiro; se o formato não for suportado, usa ffmpeg.
+    """
+    position = None if isinstance(source, str) else source.tell()
+    try:
+        return _soundfile_blocks(source, block_frames)
+    except RuntimeError:  # sf.LibsndfileError herda de RuntimeError
+        if position is not None:
+            source.seek(position)
+        return _ffmpeg_blocks(source, block_frames)
+
+def decode_to_flac(path: str,
+                   output_path: Optional[str] = None,
+                   block_frames: int = BLOCK_FRAMES) -> DecodedAudio:
+    """Decodifica `path` em blocos e grava FLAC mono 16 bits.
+
+    Sem `output_path`, cria um arquivo temporário (o chamador remove).
+    """
+    # Abre a entrada antes de criar o temporário: se falhar, não sobra arquivo
+    sample_rate, blocks = iter_blocks(path, block_frames)
+    if output_path is None:
+        with tempfile.NamedTemporaryFile(suffix=".flac", delete=False) as tmp:
+            output_path = tmp.name
+
+    frames = 0
+    try:
+        with sf.SoundFile(output_path, mode='w', samplerate=sample_rate, channels=1,
+                          format='FLAC', subtype='PCM_16') as writer:
+            for block in blocks:
+                writer.write(block)
+                frames += len(block)
+    except Exception:
+        try: os.unlink(output_path)
+        except OSError: pass
+        raise
+
+    return DecodedAudio(output_path, sample_rate, frames / sample_rate)
@@ -0,0 +1,250 @@
+"""
+Importação em lote de áudios já gravados (sem interface gráfica).
+
+Uso:
+    python batch_import.py PASTA_OU_ARQUIVO [...] [--workers 4] [--processes]
+                           [--no-enhance] [--no-vad] [--db caminho.db]
+
+Cada arquivo é decodificado em blocos para FLAC mono e passa pelo mesmo
+pipeline do app (VAD → transcrição → aprimoramento → SQLite). Arquivos já
+importados são reconhecidos pelo SHA-256 do conteúdo e pulados, então é
+seguro interromper e rodar de novo.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from audio_decode import SUPPORTED_EXTENSIONS, decode_to_flac
+from enhancement import DESKTOP_PROMPT, Enhancer
+from pipeline import TranscriptionPipeline
+from storage import TranscriptionStorage
+from timing import StageTimer
+from transcription import DEFAULT_BACKEND_CONFIG, CachedBackend, get_backend
+from vad import VADConfig
+
+DEFAULT_OPTIONS = {
+    "db_path": None,
+    "backend_config": {},
+    "enhance": True,
+    "gpt_model": "gpt-4-turbo",
+    "vad": True,
+}
+
+# Reserva mais velha que isso é de uma importação interrompida (nenhum
+# arquivo leva tanto para transcrever); as mais novas podem ser de outra
+# importação rodando agora no mesmo banco
+STALE_CLAIM_SECONDS = float(os.getenv("IMPORT_STALE_CLAIM_SECONDS", str(6 * 3600)))
+
+@dataclass
+class ImportResult:
+    """Resultado da importação de um arquivo."""
+    path: str
+    status: str  # imported | skipped | failed
+    transcription_id: Optional[int] = None
+    duration: float = 0.0
+    cost_usd: float = 0.0
+    error: Optional[str] = None
+
+def find_audio_files(paths: Iterable[str],
+                     extensions: Iterable[str] = SUPPORTED_EXTENSIONS) -> List[str]:
+    """Lista arquivos de áudio (recursivo em pastas), em ordem estável."""
+    extensions = tuple(ext.lower() for ext in extensions)
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(os.path.abspath(path))
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            found.extend(
+                os.path.abspath(os.path.join(root, name))
+                for name in sorted(files)
+                if name.lower().endswith(extensions)
+            )
+    return list(dict.fromkeys(found))
+
+def hash_file(path: str) -> str:
+    """SHA-256 do conteúdo, lido em blocos."""
+    with open(path, "rb") as f:
+        return CachedBackend.hash_audio(f)[0]
+
+def build_pipeline(options: Dict) -> TranscriptionPipeline:
+    """Monta storage, backend (com cache) e enhancer a partir das opções."""
+    storage = TranscriptionStorage(options["db_path"])
+    backend = CachedBackend(get_backend(options["backend_config"]), storage)
+    enhancer = None
+    if options["enhance"]:
+        enhancer = Enhancer(storage, model=options["gpt_model"], prompt_template=DESKTOP_PROMPT)
+    return TranscriptionPipeline(
+        storage,
+        backend,
+        enhancer,
+        VADConfig() if options["vad"] else None
+    )
+
+def import_file(path: str, pipeline: TranscriptionPipeline) -> ImportResult:
+    """Importa um arquivo; nunca levanta exceção (falha vira `status='failed'`)."""
+    storage = pipeline.storage
+    try:
+        file_hash = hash_file(path)
+    except OSError as e:
+        return ImportResult(path, "failed", error=str(e))
+
+    # A reserva evita importar duas vezes arquivos idênticos no mesmo lote
+    if not storage.claim_imported_file(file_hash, path):
+        return ImportResult(path, "skipped")
+
+    decoded = None
+    timer = StageTimer()
+    try:
+        with timer.span("encode"):
+            decoded = decode_to_flac(path)
+        transcription = pipeline.process(
+            decoded.path,
+            decoded.duration,
+            metadata={
+                "source": "import",
+                "source_file": path,
+                "file_hash": file_hash,
+            },
+            timer=timer
+        )
+        storage.complete_imported_file(file_hash, transcription.id)
+        return ImportResult(path, "imported", transcription.id,
+                            transcription.audio_duration, transcription.cost_usd)
+    except Exception as e:
+        storage.release_imported_file(file_hash)
+        return ImportResult(path, "failed", error=str(e))
+    finally:
+        if decoded:
+            try: os.unlink(decoded.path)
+            except OSError: pass
+
+# Pipeline por processo (modo --processes) ou compartilhado entre threads
+_worker_pipeline: Optional[TranscriptionPipeline] = None
+_worker_lock = threading.Lock()
+
+def _init_worker(options: Dict):
+    global _worker_pipeline
+    with _worker_lock:
+        if _worker_pipeline is None:
+            _worker_pipeline = build_pipeline(options)
+
+def _import_in_worker(path: str, options: Dict) -> ImportResult:
+    _init_worker(options)
+    return import_file(path, _worker_pipeline)
+
+def run_import(paths: List[str],
+               options: Optional[Dict] = None,
+               workers: int = 2,
+               use_processes: bool = False,
+               on_progress: Optional[Callable[[int, int, ImportResult], None]] = None) -> List[ImportResult]:
+    """Importa `paths` com um pool de threads (ou processos).
+
+    Threads compartilham o backend e o pool HTTP (bom para a API); com
+    `use_processes` cada processo carrega seu próprio backend (útil para
+    o Whisper local, que é limitado por CPU).
+    """
+    settings = dict(DEFAULT_OPTIONS)
+    settings.update(options or {})
+
+    # Reservas de uma execução interrompida voltam para a fila
+    TranscriptionStorage(settings["db_path"]).reset_pending_imports(STALE_CLAIM_SECONDS)
+
+    if use_processes:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(settings,))
+    else:
+        executor = ThreadPoolExecutor(workers, thread_name_prefix="import")
+
+    results = []
+    with executor:
+        futures = [executor.submit(_import_in_worker, path, settings) for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_progress:
+                on_progress(len(results), len(paths), result)
+    return results
+
+class ProgressReport:
+    """Imprime uma linha por arquivo com contagem, custo acumulado e ETA."""
+
+    ICONS = {"imported": "✅", "skipped": "⏭️", "failed": "❌"}
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.started = time.time()
+        self.counts = {"imported": 0, "skipped": 0, "failed": 0}
+        self.duration = 0.0
+        self.cost = 0.0
+
+    def __call__(self, done: int, total: int, result: ImportResult):
+        self.counts[result.status] += 1
+        self.duration += result.duration
+        self.cost += result.cost_usd
+
+        elapsed = time.time() - self.started
+        eta = elapsed / done * (total - done)
+        detail = (
+            f"{result.duration / 60:.1f} min, ${result.cost_usd:.4f}"
+            if result.status == "imported" else (result.error or "já importado")
+        )
+        width = len(str(total))
+        print(f"[{done:>{width}}/{total}] {self.ICONS[result.status]} "
+              f"{os.path.basename(result.path)} ({detail}) | ETA {eta / 60:.1f} min",
+              file=self.stream, flush=True)
+
+    def summary(self) -> str:
+        elapsed = time.time() - self.started
+        return (
+            f"Importados: {self.counts['imported']} | Pulados: {self.counts['skipped']} | "
+            f"Falhas: {self.counts['failed']} | Áudio: {self.duration / 60:.1f} min | "
+            f"Custo: ${self.cost:.4f} | Tempo: {elapsed / 60:.1f} min"
+        )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Importa áudios já gravados para o histórico.")
+    parser.add_argument("paths", nargs="+", help="Pastas ou arquivos de áudio")
+    parser.add_argument("--workers", type=int, default=2, help="Arquivos em paralelo (padrão: 2)")
+    parser.add_argument("--processes", action="store_true",
+                        help="Usa processos em vez de threads (Whisper local)")
+    parser.add_argument("--backend", choices=["openai", "faster-whisper"],
+                        default=DEFAULT_BACKEND_CONFIG["transcription_backend"])
+    parser.add_argument("--gpt-model", default=DEFAULT_OPTIONS["gpt_model"])
+    parser.add_argument("--no-enhance", action="store_true", help="Não aprimora com GPT")
+    parser.add_argument("--no-vad", action="store_true", help="Não corta silêncios")
+    parser.add_argument("--db", help="Banco SQLite (padrão: ~/.audio_recorder/transcriptions.db)")
+    parser.add_argument("--extensions", nargs="+", default=list(SUPPORTED_EXTENSIONS))
+    args = parser.parse_args(argv)
+
+    files = find_audio_files(args.paths, args.extensions)
+    if not files:
+        print("Nenhum arquivo de áudio encontrado.")
+        return 1
+    print(f"🎧 {len(files)} arquivo(s) encontrados, {args.workers} worker(s)")
+
+    report = ProgressReport()
+    results = run_import(
+        files,
+        {
+            "db_path": args.db,
+            "backend_config": {"transcription_backend": args.backend},
+            "enhance": not args.no_enhance,
+            "gpt_model": args.gpt_model,
+            "vad": not args.no_vad,
+        },
+        workers=args.workers,
+        use_processes=args.processes,
+        on_progress=report
+    )
+    print(report.summary())
+    return 1 if any(result.status == "failed" for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
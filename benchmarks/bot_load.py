@@ -0,0 +1,165 @@
+"""
+Teste de carga do bot do Telegram: vazão com vários remetentes simultâneos.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bot_load [--senders 1 4 16 32] [--messages 3]
+                                  [--whisper 0.8] [--gpt 1.2]
+
+Roda o caminho real do bot (handle_audio → fila bot_jobs → workers →
+CachedBackend/OpenAIBackend → Enhancer → SQLite) com um cliente OpenAI
+falso que só espera a latência informada, e Bot API/mensagens do
+Telegram falsas. "Sequencial" usa um único worker (um áudio por vez);
+"concorrente" usa MAX_CONCURRENT_JOBS workers.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")  # nenhuma chamada sai da máquina
+
+from enhancement import BOT_PROMPT, Enhancer
+from rate_limit import RequestScheduler
+from storage import TranscriptionStorage
+from telegram_bot import TranscriptionBot
+from transcription import CachedBackend, OpenAIBackend
+
+class FakeAsyncOpenAI:
+    """Só as duas chamadas que o bot usa, com latência simulada."""
+
+    def __init__(self, whisper_seconds: float, gpt_seconds: float):
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcribe))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+        self.whisper_seconds = whisper_seconds
+        self.gpt_seconds = gpt_seconds
+
+    async def _transcribe(self, model, file, language):
+        digest = hashlib.sha256(file.read()).hexdigest()[:12]
+        await asyncio.sleep(self.whisper_seconds)
+        # Texto único por áudio: nenhum aprimoramento sai do cache
+        return SimpleNamespace(text=f"trecho {digest} da mensagem de voz " * 25)
+
+    async def _complete(self, model, messages, temperature, stream=False, stream_options=None):
+        await asyncio.sleep(self.gpt_seconds)
+        content = messages[0]["content"][-300:].upper()
+        usage = SimpleNamespace(prompt_tokens=200, completion_tokens=150)
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))],
+                                  usage=None)
+            yield SimpleNamespace(choices=[], usage=usage)
+        return chunks()
+
+class FakeStatus:
+    def __init__(self, message_id: int):
+        self.message_id = message_id
+
+    async def edit_text(self, text, **kwargs):
+        pass
+
+class FakeFile:
+    def __init__(self, payload: bytes):
+        self.payload = payload
+
+    async def download_to_memory(self, out):
+        out.write(self.payload)
+
+class FakeBot:
+    """As chamadas da Bot API feitas pelos workers da fila."""
+
+    def __init__(self):
+        self.files = {}
+        self.sent = []
+
+    async def get_file(self, file_id):
+        return self.files[file_id]
+
+    async def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        pass
+
+    async def delete_message(self, chat_id, message_id):
+        pass
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+class FakeMessage:
+    def __init__(self, bot: FakeBot, user: int, number: int):
+        payload = os.urandom(16) + f"{user}-{number}".encode() * 2000
+        file_id = f"{user}-{number}"
+        bot.files[file_id] = FakeFile(payload)
+        self.voice = SimpleNamespace(duration=30, file_id=file_id)
+        self.audio = None
+        self.caption = "gpt"
+        self.chat_id = user
+        self.message_id = number
+
+    async def reply_text(self, text, **kwargs):
+        return FakeStatus(self.message_id + 1000)
+
+def build_bot(whisper_seconds: float, gpt_seconds: float) -> TranscriptionBot:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    storage = TranscriptionStorage(path)
+    client = FakeAsyncOpenAI(whisper_seconds, gpt_seconds)
+    unlimited = RequestScheduler(requests_per_minute=0, tokens_per_minute=0)
+
+    whisper = OpenAIBackend()
+    whisper._async_client = client
+    whisper.scheduler = unlimited
+    enhancer = Enhancer(storage, model="gpt-4-turbo", prompt_template=BOT_PROMPT,
+                        scheduler=unlimited, async_client=client)
+    return TranscriptionBot("123:benchmark", storage, CachedBackend(whisper, storage), enhancer)
+
+async def run(senders: int, messages: int, workers: int, whisper: float, gpt: float):
+    bot = build_bot(whisper, gpt)
+    bot.bot = FakeBot()
+    bot.MAX_CONCURRENT_JOBS = workers
+    updates = [
+        SimpleNamespace(message=FakeMessage(bot.bot, user, n), effective_user=SimpleNamespace(id=user))
+        for n in range(messages) for user in range(senders)
+    ]
+    bot.start_workers()
+
+    # Mede de receber o primeiro áudio até a última resposta
+    start = time.perf_counter()
+    await asyncio.gather(*(bot.handle_audio(update, None) for update in updates))
+    while True:
+        stats = await bot.storage.get_bot_queue_stats()
+        if not stats["queued"] and not stats["running"]:
+            break
+        await asyncio.sleep(0.02)
+    elapsed = time.perf_counter() - start
+
+    await bot.stop_workers()
+    failed = stats["failed"]
+    bot.storage.close()
+    return len(updates) / elapsed, elapsed, failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--senders", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--messages", type=int, default=3, help="Áudios por remetente")
+    parser.add_argument("--whisper", type=float, default=0.8, help="Latência simulada do Whisper (s)")
+    parser.add_argument("--gpt", type=float, default=1.2, help="Latência simulada do GPT (s)")
+    args = parser.parse_args()
+
+    print(f"Latência simulada: Whisper {args.whisper}s + GPT {args.gpt}s | "
+          f"limites: {TranscriptionBot.MAX_CONCURRENT_JOBS} no total, "
+          f"{TranscriptionBot.MAX_JOBS_PER_USER} por usuário\n")
+    print(f"{'remetentes':>10} {'áudios':>7} {'sequencial (/s)':>16} {'concorrente (/s)':>17} "
+          f"{'ganho':>7} {'falhas':>7}")
+    for senders in args.senders:
+        # O sequencial é previsível; mede com poucas mensagens para não demorar
+        sequential, _, _ = asyncio.run(run(min(senders, 2), 1, 1, args.whisper, args.gpt))
+        concurrent, _, failed = asyncio.run(run(senders, args.messages, TranscriptionBot.MAX_CONCURRENT_JOBS,
+                                                args.whisper, args.gpt))
+        print(f"{senders:>10} {senders * args.messages:>7} {sequential:>16.2f} "
+              f"{concurrent:>17.2f} {concurrent / sequential:>6.1f}x {failed:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark dos encoders de gravação: custo de CPU x bytes enviados x latência.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.encoding [arquivo.wav] [--minutes 5] [--uplink-mbps 2]
+
+Sem arquivo, gera um sinal sintético parecido com fala (harmônicos com
+pitch variável, pausas e ruído de fundo). A latência estimada é
+encode + upload no uplink informado (o tempo de processamento do
+Whisper não depende do formato e fica de fora).
+"""
+
+import argparse
+import io
+import time
+
+import numpy as np
+import soundfile as sf
+
+from audio_core import AudioRecorder, ENCODERS
+
+SAMPLE_RATE = 16000
+
+def synthetic_speech(minutes: float, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Gera áudio int16 mono com 'frases' de 1-4s separadas por pausas."""
+    rng = np.random.default_rng(42)
+    total = int(minutes * 60 * sample_rate)
+    audio = rng.normal(0, 40, total)  # ruído de fundo
+
+    pos = 0
+    while pos < total:
+        length = int(rng.uniform(1, 4) * sample_rate)
+        t = np.arange(min(length, total - pos)) / sample_rate
+        pitch = 120 + 40 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+        envelope = np.abs(np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        audio[pos:pos + len(t)] += 4000 * voice * envelope
+        pos += len(t) + int(rng.uniform(0.2, 1.5) * sample_rate)
+
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+def encode_streaming(samples: np.ndarray, encoder: str, block: int) -> bytes:
+    """Codifica em blocos, como o writer do AudioRecorder faz."""
+    file_format, subtype, _ = ENCODERS[encoder]
+    buffer = io.BytesIO()
+    with sf.SoundFile(buffer, mode='w', samplerate=SAMPLE_RATE, channels=1,
+                      format=file_format, subtype=subtype) as writer:
+        for start in range(0, len(samples), block):
+            writer.write(samples[start:start + block])
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("audio", nargs="?", help="arquivo de áudio (opcional)")
+    parser.add_argument("--minutes", type=float, default=5.0)
+    parser.add_argument("--uplink-mbps", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.audio:
+        samples, rate = sf.read(args.audio, dtype='int16')
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1).astype(np.int16)
+        if rate != SAMPLE_RATE:
+            print(f"Aviso: arquivo a {rate} Hz, benchmark assume {SAMPLE_RATE} Hz")
+    else:
+        samples = synthetic_speech(args.minutes)
+
+    seconds = len(samples) / SAMPLE_RATE
+    # O writer drena o buffer em fatias de alguns blocos
+    block = AudioRecorder.BLOCK_SIZE * 4
+    uplink_bytes_per_s = args.uplink_mbps * 1_000_000 / 8
+
+    print(f"Áudio: {seconds / 60:.1f} min | uplink: {args.uplink_mbps} Mbit/s\n")
+    print(f"{'encoder':<8} {'CPU (s)':>8} {'CPU/min':>8} {'bytes':>11} "
+          f"{'MB/min':>7} {'vs WAV':>7} {'upload(s)':>10} {'total(s)':>9}")
+
+    wav_size = None
+    for name in ENCODERS:
+        cpu_start = time.process_time()
+        data = encode_streaming(samples, name, block)
+        cpu = time.process_time() - cpu_start
+
+        size = len(data)
+        wav_size = wav_size or size
+        upload = size / uplink_bytes_per_s
+        print(f"{name:<8} {cpu:>8.3f} {cpu / (seconds / 60):>8.4f} {size:>11,} "
+              f"{size / 1e6 / (seconds / 60):>7.2f} {size / wav_size:>6.0%} "
+              f"{upload:>10.1f} {cpu + upload:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Áudio longo no bot: uma requisição inteira x pedaços paralelos.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.long_audio [--minutes 10 30 60] [--parallel 4]
+                                    [--base 1.0] [--per-minute 3.0]
+
+O backend falso espera `base + per_minute x minutos do pedaço` (o tempo
+do Whisper cresce com a duração do áudio). Mede o tempo até o primeiro
+texto aparecer para o usuário e o tempo total. O áudio é sintético,
+parecido com fala (frases de 1-4 s separadas por pausas).
+"""
+
+import argparse
+import asyncio
+import io
+import time
+
+import numpy as np
+import soundfile as sf
+
+from long_audio import atranscribe_chunked
+from transcription import TranscriptionBackend, TranscriptResult
+
+SAMPLE_RATE = 16000
+
+def synthetic_speech(minutes: float, seed: int = 42) -> io.BytesIO:
+    """FLAC em memória com "frases" separadas por pausas e ruído de fundo."""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * SAMPLE_RATE)
+    audio = rng.normal(0, 40, total)
+    pos = 0
+    while pos < total:
+        length = min(int(rng.uniform(1, 4) * SAMPLE_RATE), total - pos)
+        t = np.arange(length) / SAMPLE_RATE
+        envelope = np.abs(np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        audio[pos:pos + length] += 4000 * np.sin(2 * np.pi * 150 * t) * envelope
+        pos += length + int(rng.uniform(0.2, 1.5) * SAMPLE_RATE)
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio.astype(np.int16), SAMPLE_RATE, format="FLAC")
+    buffer.seek(0)
+    buffer.name = "ditado.flac"
+    return buffer
+
+class SimulatedWhisper(TranscriptionBackend):
+    name = "simulated"
+
+    def __init__(self, base: float, per_minute: float):
+        self.base = base
+        self.per_minute = per_minute
+
+    @property
+    def model_name(self) -> str:
+        return "whisper-1"
+
+    async def atranscribe(self, audio, language=None) -> TranscriptResult:
+        seconds = sf.info(audio).duration
+        await asyncio.sleep(self.base + self.per_minute * seconds / 60)
+        return TranscriptResult(f"texto de {seconds:.0f}s", self.model_name)
+
+async def measure(backend, audio, parallel: int):
+    start = time.perf_counter()
+    first = []
+
+    async def on_text(text, chunks):
+        if not first:
+            first.append(time.perf_counter() - start)
+
+    if parallel:
+        await atranscribe_chunked(backend, audio, on_text=on_text, max_parallel=parallel)
+    else:
+        await backend.atranscribe(audio)
+    total = time.perf_counter() - start
+    return (first[0] if first else total), total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 30, 60])
+    parser.add_argument("--parallel", type=int, default=4, help="Pedaços simultâneos")
+    parser.add_argument("--base", type=float, default=1.0, help="Latência fixa por requisição (s)")
+    parser.add_argument("--per-minute", type=float, default=3.0, help="Latência por minuto de áudio (s)")
+    args = parser.parse_args()
+
+    backend = SimulatedWhisper(args.base, args.per_minute)
+    print(f"Whisper simulado: {args.base}s + {args.per_minute}s/min | {args.parallel} pedaços simultâneos\n")
+    print(f"{'minutos':>8} {'inteiro (s)':>12} {'1º texto (s)':>13} {'pedaços (s)':>12} {'ganho':>7}")
+    for minutes in args.minutes:
+        audio = synthetic_speech(minutes)
+        _, whole = asyncio.run(measure(backend, audio, 0))
+        audio.seek(0)
+        first, chunked = asyncio.run(measure(backend, audio, args.parallel))
+        print(f"{minutes:>8.0f} {whole:>12.1f} {first:>13.1f} {chunked:>12.1f} {whole / chunked:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Mede a latência por requisição: cliente novo a cada chamada x pool compartilhado.
+
+Uso (a partir da raiz do projeto, com OPENAI_API_KEY no .env):
+    python -m benchmarks.openai_client [--requests 20]
+
+Usa `models.retrieve` (barato e sem custo) como requisição de teste.
+A diferença entre os dois modos é o custo de conexão + handshake TLS
+que o pool com keep-alive economiza em cada chamada do app.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from openai_client import create_http_client
+
+load_dotenv()
+
+def timed_calls(make_client, requests: int, model: str):
+    """Executa `requests` chamadas e retorna as latências (ms)."""
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client = make_client()
+        client.models.retrieve(model)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def report(label: str, latencies):
+    print(f"{label:<22} média {statistics.mean(latencies):7.1f} ms | "
+          f"mediana {statistics.median(latencies):7.1f} ms | "
+          f"máx {max(latencies):7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--model", default="whisper-1")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("Configure OPENAI_API_KEY no .env")
+        sys.exit(1)
+
+    # Como era antes: um OpenAI(...) novo por chamada
+    fresh = timed_calls(lambda: OpenAI(api_key=api_key), args.requests, args.model)
+
+    # Pool compartilhado; a primeira chamada aquece a conexão
+    shared_client = OpenAI(api_key=api_key, http_client=create_http_client())
+    shared_client.models.retrieve(args.model)
+    pooled = timed_calls(lambda: shared_client, args.requests, args.model)
+    shared_client.close()
+
+    report("cliente novo/chamada", fresh)
+    report("pool compartilhado", pooled)
+    saved = statistics.median(fresh) - statistics.median(pooled)
+    print(f"\nEconomia por requisição (mediana): {saved:.1f} ms "
+          f"(x2 por gravação com aprimoramento GPT)")
+
+if __name__ == "__main__":
+    main()
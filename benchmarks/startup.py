@@ -0,0 +1,83 @@
+"""
+Mede o tempo de inicialização a frio (import) da GUI e do modo headless.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.startup [--runs 7]
+
+Cada medição roda num processo Python novo. "Adiado" é o custo dos
+módulos que saíram do caminho de inicialização (bandeja, atalhos,
+notificações, OpenAI, Notion): o que a inicialização pagaria se eles
+ainda fossem importados no topo do main.py. Módulos ausentes no
+ambiente são ignorados (e a GUI não é medida sem customtkinter).
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Importados de forma preguiçosa desde a separação GUI/headless
+DEFERRED = ["pystray", "plyer", "keyboard", "PIL.Image", "openai", "notion_client"]
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    try:
+        importlib.import_module(name)
+    except Exception as e:
+        print(json.dumps({{"error": f"{{name}}: {{e}}"}}))
+        sys.exit(0)
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": len(sys.modules)}}))
+"""
+
+def cold_import(modules, runs: int):
+    """Mediana (s) e nº de módulos carregados importando `modules` num processo novo."""
+    times, loaded = [], 0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(modules=modules)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        if "error" in result:
+            return None, result["error"]
+        times.append(result["seconds"])
+        loaded = result["modules"]
+    return statistics.median(times), loaded
+
+def available(modules):
+    """Filtra os módulos instalados neste ambiente."""
+    found = []
+    for name in modules:
+        result = subprocess.run([sys.executable, "-c", f"import {name}"], capture_output=True)
+        if result.returncode == 0:
+            found.append(name)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    deferred = available(DEFERRED)
+    targets = [
+        ("headless (cli)", ["cli"]),
+        ("GUI (main)", ["main"]),
+        ("adiado", deferred),
+        ("GUI se eager", ["main"] + deferred),
+        ("headless se eager", ["cli"] + deferred),
+    ]
+
+    print(f"Mediana de {args.runs} processos novos | adiados disponíveis: {', '.join(deferred) or '-'}\n")
+    print(f"{'alvo':<20} {'import (ms)':>12} {'módulos':>9}")
+    for label, modules in targets:
+        seconds, loaded = cold_import(modules, args.runs)
+        if seconds is None:
+            print(f"{label:<20} {'-':>12}   ({loaded})")
+            continue
+        print(f"{label:<20} {seconds * 1000:>12.1f} {loaded:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark do SQLite: conexão nova por operação x conexão persistente.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.storage_ops [--ops 2000] [--threads 4] [--processes 2]
+
+"antes" reproduz o comportamento antigo: `sqlite3.connect` a cada
+chamada, journal em modo rollback e synchronous=FULL. "depois" é o
+TranscriptionStorage atual (conexão por thread, WAL, synchronous=NORMAL,
+statements em cache). Cada modo usa um banco temporário próprio; com
+`--processes`, vários processos escrevem no mesmo banco ao mesmo tempo.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from storage import Transcription, TranscriptionStorage
+
+class LegacyStorage(TranscriptionStorage):
+    """Storage com o padrão antigo de conexões (para comparação)."""
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_MS / 1000)
+        conn.row_factory = sqlite3.Row
+        self._register_functions(conn)
+        return conn
+
+def _operations(storage: TranscriptionStorage, ops: int, seed: int):
+    """Mistura típica do app: salvar, ler, consultar cache e estatísticas."""
+    for i in range(ops):
+        kind = i % 5
+        if kind == 0:
+            storage.save_transcription(Transcription(
+                raw_text=f"texto {seed}-{i}", audio_duration=30,
+                metadata={"timings": {"whisper": 1.0}}
+            ))
+        elif kind == 1:
+            storage.get_transcription(1 + i % 50)
+        elif kind == 2:
+            storage.get_cached_transcription(f"chave-{i % 20}")
+        elif kind == 3:
+            storage.get_recent_transcriptions(10)
+        else:
+            storage.cache_transcription(f"chave-{seed}-{i}", "hash", "whisper-1", "pt", "texto")
+
+def _process_worker(args):
+    storage_cls, db_path, ops, seed = args
+    _operations(storage_cls(db_path), ops, seed)
+
+def _new_db(storage_cls):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    storage = storage_cls(path)
+    for i in range(50):
+        storage.save_transcription(Transcription(raw_text=f"base {i}", audio_duration=10))
+    return storage, path
+
+def run_threads(storage_cls, ops: int, threads: int) -> float:
+    storage, path = _new_db(storage_cls)
+    workers = [
+        threading.Thread(target=_operations, args=(storage, ops // threads, n))
+        for n in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    os.unlink(path)
+    return ops / elapsed
+
+def run_processes(storage_cls, ops: int, processes: int) -> float:
+    _, path = _new_db(storage_cls)
+    jobs = [(storage_cls, path, ops // processes, n) for n in range(processes)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        pool.map(_process_worker, jobs)
+    elapsed = time.perf_counter() - start
+    os.unlink(path)
+    return ops / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.ops} operações (20% escrita de transcrição, 20% escrita de cache)\n")
+    print(f"{'cenário':<22} {'antes (ops/s)':>14} {'depois (ops/s)':>15} {'ganho':>7}")
+    scenarios = [
+        ("1 thread", lambda cls: run_threads(cls, args.ops, 1)),
+        (f"{args.threads} threads", lambda cls: run_threads(cls, args.ops, args.threads)),
+        (f"{args.processes} processos", lambda cls: run_processes(cls, args.ops, args.processes)),
+    ]
+    for label, run in scenarios:
+        before = run(LegacyStorage)
+        after = run(TranscriptionStorage)
+        print(f"{label:<22} {before:>14,.0f} {after:>15,.0f} {after / before:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
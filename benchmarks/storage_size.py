@@ -0,0 +1,130 @@
+"""
+Tamanho do banco e vazão de leitura com/sem compressão dos textos.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.storage_size [--rows 20000] [--words 150]
+
+Gera um corpus sintético (fala transcrita + versão "aprimorada" parecida,
+com pontuação, maiúsculas e algumas palavras trocadas) e grava o mesmo
+corpus em bancos novos com cada configuração. O tamanho inclui o índice
+FTS5 (que não guarda cópia do texto). zstd só entra se o pacote
+zstandard estiver instalado.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from storage import Transcription, TranscriptionStorage
+import text_codec
+
+VOCABULARY = (
+    "então a gente precisa ver o orçamento do projeto antes da reunião de sexta "
+    "porque os custos subiram bastante no trimestre e o pessoal do financeiro pediu "
+    "uma estimativa nova também seria bom conversar com fornecedor sobre contrato "
+    "manutenção prazo entrega servidores atrasou duas semanas cliente aprovou proposta "
+    "mas quer mudar escopo da primeira fase equipe está animada com resultado testes "
+    "precisamos documentar decisões enviar resumo para todos amanhã cedo"
+).split()
+
+REPLACEMENTS = {"a gente": "nós", "pra": "para", "tá": "está", "né": ""}
+
+def synthetic_corpus(rows: int, words: int, seed: int = 42):
+    rng = random.Random(seed)
+    for _ in range(rows):
+        tokens = [rng.choice(VOCABULARY) for _ in range(rng.randint(words // 2, words * 3 // 2))]
+        raw = " ".join(tokens)
+        # "Aprimorado": frases com maiúscula e ponto, poucas palavras trocadas
+        sentences, enhanced_tokens = [], []
+        for i, token in enumerate(tokens):
+            if rng.random() < 0.04:
+                token = rng.choice(VOCABULARY)
+            enhanced_tokens.append(token)
+            if rng.random() < 0.08 or i == len(tokens) - 1:
+                sentence = " ".join(enhanced_tokens)
+                sentences.append(sentence[0].upper() + sentence[1:] + ".")
+                enhanced_tokens = []
+        yield Transcription(
+            raw_text=raw,
+            enhanced_text=" ".join(sentences),
+            audio_duration=len(tokens) / 2.5,
+            gpt_model="gpt-4-turbo",
+            tokens_used=len(tokens) * 3,
+            metadata={"source": "benchmark", "timings": {"whisper": 1.2, "gpt": 2.3}},
+        )
+
+def db_size(path: str) -> int:
+    return sum(os.path.getsize(path + suffix)
+               for suffix in ("", "-wal", "-shm") if os.path.exists(path + suffix))
+
+def run(label: str, compression, text_delta: bool, corpus, reads: int):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    storage = TranscriptionStorage(path, compression=compression, text_delta=text_delta)
+
+    start = time.perf_counter()
+    storage.insert_transcriptions(corpus)
+    write_seconds = time.perf_counter() - start
+
+    with storage._connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = db_size(path)
+
+    # Leitura sequencial (exportação) e páginas do histórico
+    start = time.perf_counter()
+    count = sum(1 for _ in storage.iter_transcriptions())
+    scan_rate = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(reads):
+        storage.get_transcriptions_page(50, before=storage.get_history_key(i * 37 % count))
+    page_rate = reads * 50 / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(reads // 10):
+        storage.search("orçamento fornecedor", limit=20)
+    search_ms = (time.perf_counter() - start) / max(1, reads // 10) * 1000
+
+    storage.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+    return label, size, count / write_seconds, scan_rate, page_rate, search_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=150, help="Palavras médias por transcrição")
+    parser.add_argument("--reads", type=int, default=200, help="Páginas lidas no teste de histórico")
+    args = parser.parse_args()
+
+    configs = [
+        ("sem compressão", None, False),
+        ("zlib", "zlib", False),
+        ("zlib + delta", "zlib", True),
+    ]
+    try:
+        text_codec.require_codec("zstd")
+        configs += [("zstd", "zstd", False), ("zstd + delta", "zstd", True)]
+    except RuntimeError:
+        pass
+
+    corpus = list(synthetic_corpus(args.rows, args.words))
+    text_bytes = sum(len(t.raw_text.encode()) + len(t.enhanced_text.encode()) for t in corpus)
+    print(f"{args.rows} transcrições, {text_bytes / 1e6:.1f} MB de texto (original + aprimorado)\n")
+    print(f"{'modo':<16} {'banco (MB)':>11} {'escrita/s':>10} {'varredura/s':>12} "
+          f"{'histórico/s':>12} {'busca (ms)':>11}")
+
+    baseline = None
+    for label, compression, text_delta in configs:
+        label, size, write_rate, scan_rate, page_rate, search_ms = run(
+            label, compression, text_delta, corpus, args.reads
+        )
+        baseline = baseline or size
+        print(f"{label:<16} {size / 1e6:>8.1f} ({size / baseline:>4.0%}) {write_rate:>7,.0f} "
+              f"{scan_rate:>12,.0f} {page_rate:>12,.0f} {search_ms:>11.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""
+Modo headless (sem GUI): linha de comando e daemon.
+
+Uso:
+    python cli.py record [--seconds N] [--no-enhance] [--copy]
+    python cli.py transcribe ARQUIVO [...] [--no-enhance] [--copy]
+    python cli.py import PASTA [...]            (mesmas opções de batch_import.py)
+    python cli.py daemon [--port 47821]
+    python cli.py ctl toggle|stop|status|quit [--port 47821]
+    python cli.py latency [--start AAAA-MM-DD] [--end AAAA-MM-DD]
+    python cli.py export ARQUIVO.jsonl|.csv|.parquet [--start ...] [--end ...]
+    python cli.py restore ARQUIVO.jsonl|.csv|.parquet
+
+Não importa customtkinter, pystray, plyer, keyboard nem PIL. O módulo de
+áudio (sounddevice) só carrega para gravar e o cliente OpenAI só quando
+o backend/aprimoramento precisam dele.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app_config import DEFAULT_CONFIG, vad_config
+from enhancement import DESKTOP_PROMPT, Enhancer
+from jobs import Job, JobScheduler
+from pipeline import TranscriptionPipeline
+from storage import Transcription, TranscriptionStorage
+from timing import STAGES, StageTimer
+from transcription import CachedBackend, TranscriptionBackend, TranscriptResult, get_backend
+
+load_dotenv()
+
+DAEMON_PORT = int(os.getenv("RECORDER_DAEMON_PORT", "47821"))
+
+def log(message: str, level: str = "info"):
+    """Log com horário no stderr (stdout fica só com o texto transcrito)."""
+    print(f"{time.strftime('%H:%M:%S')} [{level}] {message}", file=sys.stderr, flush=True)
+
+class HeadlessRecorder:
+    """Gravação + pipeline sem interface, usado pelo CLI e pelo daemon.
+
+    Mesmo fluxo do app desktop: streaming opcional durante a gravação,
+    jobs no `JobScheduler` (mais recente primeiro) e `TranscriptionPipeline`.
+    """
+
+    def __init__(self,
+                 config: Optional[Dict] = None,
+                 enhance: Optional[bool] = None,
+                 copy_to_clipboard: bool = False):
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update(config or {})
+        if enhance is not None:
+            self.config["use_gpt_enhancement"] = enhance
+        self.copy_to_clipboard = copy_to_clipboard
+
+        self.storage = TranscriptionStorage()
+        self.enhancer = Enhancer(
+            storage=self.storage,
+            model=self.config["gpt_model"],
+            prompt_template=DESKTOP_PROMPT,
+            max_chunk_tokens=self.config["enhancement_chunk_tokens"],
+            max_parallel=self.config["enhancement_parallelism"]
+        )
+        self.scheduler = JobScheduler(
+            max_workers=self.config["max_concurrent_jobs"],
+            stage_limits=self.config["stage_limits"],
+            max_queued=self.config["max_queued_jobs"]
+        )
+
+        self._backend: Optional[TranscriptionBackend] = None
+        self._backend_lock = threading.Lock()
+        self._recorder = None
+        self.streamer = None
+
+    @property
+    def backend(self) -> TranscriptionBackend:
+        """Backend carregado na primeira transcrição e mantido quente."""
+        with self._backend_lock:
+            if self._backend is None:
+                self._backend = CachedBackend(get_backend(self.config), self.storage)
+                log(f"Backend de transcrição: {self._backend.model_name}")
+            return self._backend
+
+    @property
+    def recorder(self):
+        """AudioRecorder criado sob demanda (importa sounddevice/PortAudio)."""
+        if self._recorder is None:
+            from audio_core import AudioRecorder
+            self._recorder = AudioRecorder(encoder=self.config["audio_encoder"])
+            self._recorder.set_status_callback(lambda status: log(f"Áudio: {status}"))
+        return self._recorder
+
+    def pipeline(self) -> TranscriptionPipeline:
+        return TranscriptionPipeline(
+            self.storage,
+            self.backend,
+            self.enhancer if self.config["use_gpt_enhancement"] else None,
+            vad_config(self.config),
+            stage=self.scheduler.stage,
+            on_log=log
+        )
+
+    def start_recording(self) -> bool:
+        """Inicia uma gravação (com streaming, se configurado)."""
+        if self.config.get("streaming_transcription"):
+            from audio_core import StreamingTranscriber
+            self.streamer = StreamingTranscriber(
+                self._transcribe_chunk,
+                self.recorder.sample_rate,
+                vad_config(self.config),
+                self.config["audio_encoder"]
+            )
+            self.recorder.set_chunk_callback(self.streamer.submit)
+        else:
+            self.streamer = None
+            self.recorder.set_chunk_callback(None)
+
+        started = self.recorder.start_recording()
+        if started:
+            log("🎙️ Gravando...")
+        elif self.streamer:
+            # Não deixa a thread do streaming viva sem gravação
+            self.streamer.discard()
+            self.streamer = None
+            self.recorder.set_chunk_callback(None)
+        return started
+
+    def _transcribe_chunk(self, audio) -> TranscriptResult:
+        """Pedaço do streaming: mesmo limite de uploads simultâneos do pipeline."""
+        with self.scheduler.stage("upload"):
+            return self.backend.transcribe(audio)
+
+    def stop_recording(self) -> Optional[Job]:
+        """Finaliza a gravação e enfileira o processamento."""
+        timer = StageTimer()
+        with timer.span("finalize"):
+            audio_file = self.recorder.stop_recording()
+        streamer, self.streamer = self.streamer, None
+        if not audio_file:
+            log("Nenhum áudio para processar", "warning")
+            return None
+
+        duration = self.recorder.recording_stats["duration"]
+        log(f"⏹️ Gravação finalizada ({duration:.1f}s)")
+        return self.scheduler.submit(
+            self.process_recording,
+            audio_file, duration, streamer, time.time(), timer,
+            name="gravação",
+            priority=JobScheduler.PRIORITY_INTERACTIVE,
+            latest_first=True,
+            on_cancel=lambda: _unlink(audio_file)
+        )
+
+    def toggle(self) -> str:
+        """Inicia ou finaliza a gravação (atalho único do daemon)."""
+        if self.recorder.recording_stats["status"] == "idle":
+            return "recording" if self.start_recording() else "error"
+        job = self.stop_recording()
+        return f"queued #{job.id}" if job else "idle"
+
+    def process_recording(self, audio_file: str, duration: float, streamer,
+                          submitted_at: float, timer: StageTimer) -> Transcription:
+        """Job de processamento de uma gravação (roda num worker)."""
+        timer.add("job_queue", time.time() - submitted_at)
+        try:
+            metadata = {"source": "cli"}
+            pipeline = self.pipeline()
+            if streamer:
+                # Os pedaços já passam pela etapa "upload" (_transcribe_chunk)
+                with timer.span("whisper"):
+                    raw_text = streamer.finish()
+                if streamer.cached:
+                    metadata["transcription_cached"] = True
+                if streamer.vad_config:
+                    metadata["original_duration"] = round(streamer.original_duration, 2)
+                    metadata["trimmed_duration"] = round(streamer.trimmed_duration, 2)
+            else:
+                raw_text, duration = pipeline.transcribe(audio_file, metadata, duration, timer)
+
+            enhancement = pipeline.enhance(
+                raw_text, metadata, self.config["gpt_model"], timer=timer
+            )
+            transcription = pipeline.save(raw_text, enhancement, duration, metadata, timer)
+            self._deliver(pipeline, transcription, timer,
+                          time.time() - submitted_at + timer.get("finalize"))
+            return transcription
+        except Exception as e:
+            log(f"❌ Erro: {e}", "error")
+            raise
+        finally:
+            _unlink(audio_file)
+
+    def transcribe_file(self, path: str) -> Transcription:
+        """Decodifica um arquivo qualquer e passa pelo pipeline."""
+        from audio_decode import decode_to_flac
+
+        timer = StageTimer()
+        start = time.perf_counter()
+        with timer.span("encode"):
+            decoded = decode_to_flac(path)
+        try:
+            pipeline = self.pipeline()
+            metadata = {"source": "cli", "source_file": os.path.abspath(path)}
+            raw_text, duration = pipeline.transcribe(decoded.path, metadata, decoded.duration, timer)
+            enhancement = pipeline.enhance(
+                raw_text, metadata, self.config["gpt_model"], timer=timer
+            )
+            transcription = pipeline.save(raw_text, enhancement, duration, metadata, timer)
+        finally:
+            _unlink(decoded.path)
+        self._deliver(pipeline, transcription, timer, time.perf_counter() - start)
+        return transcription
+
+    def _deliver(self, pipeline: TranscriptionPipeline, transcription: Transcription,
+                 timer: StageTimer, total_seconds: float):
+        """Clipboard opcional, tempos no metadata e texto no stdout."""
+        if self.copy_to_clipboard:
+            with timer.span("clipboard"):
+                try:
+                    self.storage.copy_to_clipboard(transcription.id)
+                except Exception as e:  # sem display/xclip em servidores
+                    log(f"Clipboard indisponível: {e}", "warning")
+        timer.add("total", total_seconds)
+        pipeline.record_timings(transcription, timer)
+
+        log(f"✅ #{transcription.id} | 💰 ${transcription.cost_usd:.4f} | ⏱️ {total_seconds:.1f}s")
+        print(transcription.to_clipboard_text(), flush=True)
+
+    def status(self) -> Dict:
+        stats = self.scheduler.stats()
+        return {
+            "recording": self._recorder.recording_stats if self._recorder else {"status": "idle"},
+            "queued": stats["queued"],
+            "running": stats["running"],
+            "done": stats["done"],
+            "failed": stats["failed"],
+        }
+
+    def shutdown(self):
+        """Finaliza gravação em andamento, espera os jobs e fecha conexões."""
+        if self._recorder and self._recorder.recording_stats["status"] != "idle":
+            job = self.stop_recording()
+            if job:
+                job.wait()
+        self.scheduler.shutdown(cancel_pending=False)
+        if self._recorder:
+            self._recorder._cleanup()
+        if "openai_client" in sys.modules:
+            sys.modules["openai_client"].close_openai_client()
+
+def _unlink(path: str):
+    try: os.unlink(path)
+    except OSError: pass
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """Protocolo de controle: uma linha com o comando, resposta em JSON."""
+
+    def handle(self):
+        command = self.rfile.readline().decode().strip().lower()
+        daemon: "Daemon" = self.server.daemon_ref
+        try:
+            reply = daemon.handle_command(command)
+        except Exception as e:
+            reply = {"error": str(e)}
+        self.wfile.write((json.dumps(reply, default=str) + "\n").encode())
+
+class Daemon:
+    """Processo de longa duração controlado por `cli.py ctl` ou sinais.
+
+    Escuta só em 127.0.0.1. No Linux/macOS, SIGUSR1 alterna a gravação
+    (útil para atalhos do gerenciador de janelas).
+    """
+
+    def __init__(self, recorder: HeadlessRecorder, port: int = DAEMON_PORT):
+        self.recorder = recorder
+        self.port = port
+        self._stop = threading.Event()
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", port), _ControlHandler)
+        self.server.daemon_threads = True
+        self.server.daemon_ref = self
+
+    def handle_command(self, command: str) -> Dict:
+        if command == "toggle":
+            return {"result": self.recorder.toggle()}
+        if command == "start":
+            return {"result": "recording" if self.recorder.start_recording() else "error"}
+        if command == "stop":
+            job = self.recorder.stop_recording()
+            return {"result": f"queued #{job.id}" if job else "idle"}
+        if command == "status":
+            return self.recorder.status()
+        if command == "quit":
+            self._stop.set()
+            return {"result": "bye"}
+        return {"error": f"comando desconhecido: {command}"}
+
+    def run(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda *_: log(f"SIGUSR1: {self.recorder.toggle()}"))
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        log(f"Daemon ouvindo em 127.0.0.1:{self.port} (pid {os.getpid()})")
+
+        try:
+            while not self._stop.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            log("Encerrando daemon...")
+            self.server.shutdown()
+            self.server.server_close()
+            self.recorder.shutdown()
+
+def send_command(command: str, port: int = DAEMON_PORT, timeout: float = 5.0) -> Dict:
+    """Envia um comando ao daemon local e devolve a resposta."""
+    with socket.create_connection(("127.0.0.1", port), timeout=timeout) as conn:
+        conn.sendall((command + "\n").encode())
+        return json.loads(conn.makefile().readline())
+
+def _cmd_record(args) -> int:
+    app = HeadlessRecorder(enhance=False if args.no_enhance else None, copy_to_clipboard=args.copy)
+    if not app.start_recording():
+        return 1
+    try:
+        if args.seconds:
+            time.sleep(args.seconds)
+        else:
+            input("Pressione Enter para finalizar...\n")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    job = app.stop_recording()
+    if job:
+        job.wait()
+    app.shutdown()
+    return 0 if job and job.status == "done" else 1
+
+def _cmd_transcribe(args) -> int:
+    app = HeadlessRecorder(enhance=False if args.no_enhance else None, copy_to_clipboard=args.copy)
+    failed = 0
+    for path in args.files:
+        try:
+            app.transcribe_file(path)
+        except Exception as e:
+            log(f"❌ {path}: {e}", "error")
+            failed += 1
+    app.shutdown()
+    return 1 if failed else 0
+
+def _cmd_latency(args) -> int:
+    report = TranscriptionStorage().get_latency_report(args.start, args.end)
+    if not report:
+        print("Sem tempos registrados no período.")
+        return 0
+    order = {name: i for i, name in enumerate(STAGES)}
+    print(f"{'etapa':<10} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for stage in sorted(report, key=lambda name: order.get(name, len(order))):
+        s = report[stage]
+        print(f"{stage:<10} {s['count']:>6} {s['p50']:>7.2f}s {s['p95']:>7.2f}s {s['p99']:>7.2f}s")
+    return 0
+
+def _cmd_export(args) -> int:
+    from export import export_transcriptions
+    try:
+        count = export_transcriptions(
+            TranscriptionStorage(), args.output, args.format,
+            start=args.start, end=args.end,
+            whisper_model=args.whisper_model, gpt_model=args.gpt_model
+        )
+    except (ValueError, RuntimeError) as e:
+        log(f"❌ {e}", "error")
+        return 1
+    log(f"✅ {count} transcrição(ões) exportadas para {args.output}")
+    return 0
+
+def _cmd_restore(args) -> int:
+    from export import import_transcriptions
+    try:
+        count = import_transcriptions(TranscriptionStorage(), args.input, args.format)
+    except (ValueError, RuntimeError) as e:
+        log(f"❌ {e}", "error")
+        return 1
+    log(f"✅ {count} transcrição(ões) restauradas de {args.input}")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["import"]:
+        from batch_import import main as import_main
+        return import_main(argv[1:])
+
+    parser = argparse.ArgumentParser(description="Gravador/transcritor sem interface gráfica.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="Grava do microfone e transcreve")
+    record.add_argument("--seconds", type=float, help="Duração fixa (padrão: até Enter)")
+    transcribe = sub.add_parser("transcribe", help="Transcreve arquivos de áudio")
+    transcribe.add_argument("files", nargs="+")
+    for command in (record, transcribe):
+        command.add_argument("--no-enhance", action="store_true", help="Não aprimora com GPT")
+        command.add_argument("--copy", action="store_true", help="Copia o resultado")
+
+    sub.add_parser("import", help="Importação em lote (ver batch_import.py --help)")
+
+    daemon = sub.add_parser("daemon", help="Processo contínuo controlado por `ctl`")
+    daemon.add_argument("--port", type=int, default=DAEMON_PORT)
+    daemon.add_argument("--no-enhance", action="store_true")
+    daemon.add_argument("--copy", action="store_true")
+
+    ctl = sub.add_parser("ctl", help="Envia comando ao daemon")
+    ctl.add_argument("action", choices=["toggle", "start", "stop", "status", "quit"])
+    ctl.add_argument("--port", type=int, default=DAEMON_PORT)
+
+    latency = sub.add_parser("latency", help="Percentis de latência por etapa")
+    latency.add_argument("--start", help="Data inicial (AAAA-MM-DD)")
+    latency.add_argument("--end", help="Data final, exclusiva (AAAA-MM-DD)")
+
+    export = sub.add_parser("export", help="Exporta o histórico (JSONL, CSV ou Parquet)")
+    export.add_argument("output", help="Arquivo de saída; o formato vem da extensão")
+    export.add_argument("--format", choices=["jsonl", "csv", "parquet"])
+    export.add_argument("--start", help="Data inicial (AAAA-MM-DD)")
+    export.add_argument("--end", help="Data final, exclusiva (AAAA-MM-DD)")
+    export.add_argument("--whisper-model")
+    export.add_argument("--gpt-model")
+
+    restore = sub.add_parser("restore", help="Restaura um arquivo exportado")
+    restore.add_argument("input")
+    restore.add_argument("--format", choices=["jsonl", "csv", "parquet"])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        return _cmd_record(args)
+    if args.command == "transcribe":
+        return _cmd_transcribe(args)
+    if args.command == "daemon":
+        app = HeadlessRecorder(enhance=False if args.no_enhance else None, copy_to_clipboard=args.copy)
+        Daemon(app, args.port).run()
+        return 0
+    if args.command == "ctl":
+        try:
+            print(json.dumps(send_command(args.action, args.port), indent=2, default=str))
+        except OSError as e:
+            print(f"Daemon não encontrado na porta {args.port}: {e}")
+            return 1
+        return 0
+    if args.command == "export":
+        return _cmd_export(args)
+    if args.command == "restore":
+        return _cmd_restore(args)
+    return _cmd_latency(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,526 @@
+"""
+Aprimoramento de transcrições com GPT, com cache de resultados.
+Compartilhado pelo app desktop e pelo bot do Telegram.
+"""
+
+import asyncio
+import difflib
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from rate_limit import RequestScheduler, get_request_scheduler
+
+# Prompts usados pelo app desktop e pelo bot ({text} = transcrição bruta)
+DESKTOP_PROMPT = (
+    "Reescreva o seguinte texto transcrito, corrigindo erros, "
+    "adicionando pontuação e melhorando a fluência."
+    "Mantenha o conteúdo original.\n\n"
+    "{text}"
+)
+
+BOT_PROMPT = (
+    "Reescreva o seguinte texto transcrito, corrigindo erros, "
+    "adicionando pontuação adequada e melhorando a fluência. "
+    "Mantenha todo o conteúdo original:\n\n"
+    "{text}"
+)
+
+def estimate_tokens(text: str) -> int:
+    """Estima número de tokens (aproximado)."""
+    return len(text) // 4
+
+_encodings: Dict[str, object] = {}
+
+def count_tokens(text: str, model: str = "gpt-4-turbo") -> int:
+    """Conta tokens com o tokenizer real (tiktoken), se instalado.
+
+    Sem tiktoken, cai na estimativa de `estimate_tokens`.
+    """
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            import tiktoken
+        except ImportError:
+            return estimate_tokens(text)
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model] = encoding
+    return len(encoding.encode(text))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_PARAGRAPH = re.compile(r"\n\s*\n")
+
+def split_sentences(text: str) -> List[str]:
+    """Quebra em frases (pontuação final seguida de espaço)."""
+    return [s for s in _SENTENCE_END.split(text.strip()) if s]
+
+def split_into_chunks(text: str, max_tokens: int, model: str = "gpt-4-turbo") -> List[str]:
+    """Divide o texto em pedaços de até `max_tokens`, sem cortar frases.
+
+    Prefere fronteiras de parágrafo, depois de frase; uma frase maior que
+    o limite sozinha é quebrada por palavras.
+    """
+    units = []  # (texto, separador que vinha antes dele)
+    for p_index, paragraph in enumerate(_PARAGRAPH.split(text.strip())):
+        for s_index, sentence in enumerate(split_sentences(paragraph)):
+            sep = "\n\n" if p_index and not s_index else " "
+            if count_tokens(sentence, model) <= max_tokens:
+                units.append((sentence, sep))
+                continue
+            words, current = sentence.split(), []
+            for word in words:
+                if current and count_tokens(" ".join(current + [word]), model) > max_tokens:
+                    units.append((" ".join(current), sep))
+                    sep, current = " ", []
+                current.append(word)
+            if current:
+                units.append((" ".join(current), sep))
+
+    chunks, current, current_tokens = [], "", 0
+    for unit, sep in units:
+        unit_tokens = count_tokens(unit, model) + 1  # +1: separador
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        current = f"{current}{sep}{unit}" if current else unit
+        current_tokens += unit_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+def tail_sentences(text: str, max_tokens: int, model: str = "gpt-4-turbo") -> str:
+    """Últimas frases de `text` que cabem em `max_tokens` (contexto de sobreposição)."""
+    tail: List[str] = []
+    for sentence in reversed(split_sentences(text)):
+        if tail and count_tokens(" ".join([sentence] + tail), model) > max_tokens:
+            break
+        tail.insert(0, sentence)
+        if count_tokens(" ".join(tail), model) > max_tokens:
+            break
+    return " ".join(tail)
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+def merge_overlap(previous: str, following: str, max_words: int = 80, min_ratio: float = 0.7) -> str:
+    """Junta dois textos removendo do início de `following` a repetição
+    do final de `previous`.
+
+    A comparação é aproximada, por palavras, porque o trecho repetido
+    pode ter sido reescrito de forma um pouco diferente em cada pedaço:
+    procura o último bloco em comum que chega ao fim de `previous` e
+    exige que a maior parte do início de `following` até ali case.
+    """
+    if not previous:
+        return following
+    if not following:
+        return previous
+
+    prev_words = _words(previous)[-max_words:]
+    tokens = list(re.finditer(r"\w+", following))[:max_words]
+    next_words = [m.group().lower() for m in tokens]
+
+    matcher = difflib.SequenceMatcher(None, prev_words, next_words, autojunk=False)
+    blocks = [b for b in matcher.get_matching_blocks() if b.size]
+    # Tolera uma palavra final diferente (ex: reescrita do fim da frase)
+    at_end = [b for b in blocks if b.a + b.size >= len(prev_words) - 1]
+
+    if at_end:
+        cut_words = at_end[-1].b + at_end[-1].size
+        matched = sum(b.size for b in blocks if b.b + b.size <= cut_words)
+        if cut_words >= 3 and matched >= min_ratio * cut_words:
+            # Corta depois da última palavra repetida e da pontuação colada nela
+            following = re.sub(r"^\W+", "", following[tokens[cut_words - 1].end():])
+            if not following:
+                return previous
+    return f"{previous} {following}"
+
+def normalize_text(text: str) -> str:
+    """Normaliza espaços para que variações triviais caiam na mesma chave."""
+    return re.sub(r"\s+", " ", text).strip()
+
+@dataclass
+class EnhancementResult:
+    """Resultado de um aprimoramento."""
+    text: str
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached: bool = False
+    # Tempo até o primeiro token (só em streaming) e tempo total, em segundos
+    first_token_seconds: Optional[float] = None
+    total_seconds: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+class _ChunkAssembler:
+    """Remonta pedaços aprimorados fora de ordem, emitindo o que já é contíguo.
+
+    O primeiro pedaço é transmitido ao vivo por quem o processa; os demais
+    vão para `on_delta` assim que todos os anteriores terminarem.
+    """
+
+    def __init__(self, start: float, on_delta: Optional[Callable[[str], None]]):
+        self.start = start
+        self.on_delta = on_delta
+        self.outputs: Dict[int, EnhancementResult] = {}
+        self.merged = ""
+        self.emitted = 0
+        self.first_token: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def emit(self, delta: str):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.start
+        if self.on_delta:
+            self.on_delta(delta)
+
+    def add(self, index: int, result: EnhancementResult):
+        with self._lock:
+            self.outputs[index] = result
+            while self.emitted in self.outputs:
+                part = self.outputs[self.emitted].text
+                before = self.merged
+                self.merged = merge_overlap(before, part) if before else part
+                if self.emitted > 0 or not self.on_delta:
+                    self.emit(self.merged[len(before):])
+                self.emitted += 1
+
+    def result(self, model: str) -> EnhancementResult:
+        results = [self.outputs[i] for i in range(len(self.outputs))]
+        return EnhancementResult(
+            self.merged,
+            model,
+            input_tokens=sum(r.input_tokens for r in results),
+            output_tokens=sum(r.output_tokens for r in results),
+            cached=all(r.cached for r in results),
+            first_token_seconds=self.first_token,
+            total_seconds=time.perf_counter() - self.start
+        )
+
+class Enhancer:
+    """Aprimora texto via chat completions com cache em dois níveis.
+
+    Nível 1: LRU em memória por instância. Nível 2: tabela no SQLite
+    (compartilhada entre app, bot e reexecuções). A chave é o hash de
+    (texto normalizado, modelo, template do prompt, temperatura). Um hit
+    não chama a API e registra zero tokens adicionais.
+
+    `aenhance` é a versão assíncrona (bot): usa o cliente AsyncOpenAI e
+    roda os acessos ao SQLite fora do event loop.
+    """
+
+    MEMORY_CACHE_SIZE = 128
+    # Textos acima deste tamanho são divididos e aprimorados em paralelo
+    CHUNK_TOKENS = 3000
+    OVERLAP_TOKENS = 60
+
+    def __init__(self,
+                 storage=None,
+                 client=None,
+                 model: str = "gpt-4-turbo",
+                 prompt_template: str = DESKTOP_PROMPT,
+                 temperature: float = 0.3,
+                 max_chunk_tokens: int = CHUNK_TOKENS,
+                 max_parallel: int = 4,
+                 scheduler: Optional[RequestScheduler] = None,
+                 async_client=None):
+        self.storage = storage
+        self._client = client
+        self._async_client = async_client
+        self.model = model
+        self.prompt_template = prompt_template
+        self.temperature = temperature
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_parallel = max_parallel
+        self.scheduler = scheduler or get_request_scheduler("chat")
+
+        self._memory: "OrderedDict[str, EnhancementResult]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Cliente OpenAI (compartilhado do processo, se não informado)."""
+        if self._client is None:
+            from openai_client import get_openai_client
+            self._client = get_openai_client()
+        return self._client
+
+    @property
+    def async_client(self):
+        """Cliente AsyncOpenAI (compartilhado do processo, se não informado)."""
+        if self._async_client is None:
+            from openai_client import get_async_openai_client
+            self._async_client = get_async_openai_client()
+        return self._async_client
+
+    def cache_key(self, text: str, model: Optional[str] = None) -> str:
+        """Chave do cache para este texto/configuração."""
+        parts = [
+            normalize_text(text),
+            model or self.model,
+            self.prompt_template,
+            repr(self.temperature),
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def enhance(self,
+                text: str,
+                model: Optional[str] = None,
+                on_delta: Optional[Callable[[str], None]] = None) -> EnhancementResult:
+        """Aprimora `text`, usando o cache quando possível.
+
+        Com `on_delta`, a resposta vem em streaming e o callback recebe
+        cada pedaço novo de texto (num hit de cache, o texto todo de uma vez).
+        Textos longos são divididos em pedaços aprimorados em paralelo.
+        """
+        model = model or self.model
+        if count_tokens(text, model) > self.max_chunk_tokens:
+            return self._enhance_chunked(text, model, on_delta)
+        return self._enhance_single(text, model, on_delta)
+
+    def _enhance_single(self,
+                        text: str,
+                        model: str,
+                        on_delta: Optional[Callable[[str], None]] = None) -> EnhancementResult:
+        """Aprimora o texto numa única chamada (com cache)."""
+        key = self.cache_key(text, model)
+
+        start = time.perf_counter()
+        cached = self._lookup(key, model)
+        if cached is not None:
+            cached.total_seconds = time.perf_counter() - start
+            if on_delta:
+                on_delta(cached.text)
+            return cached
+
+        if on_delta:
+            result = self._call_api_stream(text, model, on_delta)
+        else:
+            result = self._call_api(text, model)
+        result.total_seconds = time.perf_counter() - start
+        self._remember(key, result)
+        if self.storage:
+            self.storage.cache_enhancement(
+                key, model, result.text, result.input_tokens, result.output_tokens
+            )
+        return result
+
+    def _chunk_inputs(self, text: str, model: str) -> List[str]:
+        """Pedaços do texto; cada um (exceto o primeiro) leva as últimas
+        frases do anterior como contexto, removido depois na remontagem."""
+        chunks = split_into_chunks(text, self.max_chunk_tokens - self.OVERLAP_TOKENS, model)
+        return [chunks[0]] + [
+            f"{tail_sentences(prev, self.OVERLAP_TOKENS, model)} {chunk}"
+            for prev, chunk in zip(chunks, chunks[1:])
+        ]
+
+    def _enhance_chunked(self,
+                         text: str,
+                         model: str,
+                         on_delta: Optional[Callable[[str], None]]) -> EnhancementResult:
+        """Aprimora pedaços em paralelo e remonta na ordem original."""
+        assembler = _ChunkAssembler(time.perf_counter(), on_delta)
+        inputs = self._chunk_inputs(text, model)
+
+        def run(index: int):
+            stream = assembler.emit if index == 0 and on_delta else None
+            assembler.add(index, self._enhance_single(inputs[index], model, stream))
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            for future in [pool.submit(run, i) for i in range(len(inputs))]:
+                future.result()
+        return assembler.result(model)
+
+    async def aenhance(self,
+                       text: str,
+                       model: Optional[str] = None,
+                       on_delta: Optional[Callable[[str], None]] = None) -> EnhancementResult:
+        """Versão assíncrona de `enhance` (mesmo cache, mesmos pedaços)."""
+        model = model or self.model
+        if count_tokens(text, model) > self.max_chunk_tokens:
+            return await self._aenhance_chunked(text, model, on_delta)
+        return await self._aenhance_single(text, model, on_delta)
+
+    async def _aenhance_single(self,
+                               text: str,
+                               model: str,
+                               on_delta: Optional[Callable[[str], None]] = None) -> EnhancementResult:
+        key = self.cache_key(text, model)
+
+        start = time.perf_counter()
+        cached = await asyncio.to_thread(self._lookup, key, model)
+        if cached is not None:
+            cached.total_seconds = time.perf_counter() - start
+            if on_delta:
+                on_delta(cached.text)
+            return cached
+
+        if on_delta:
+            result = await self._acall_api_stream(text, model, on_delta)
+        else:
+            result = await self._acall_api(text, model)
+        result.total_seconds = time.perf_counter() - start
+        self._remember(key, result)
+        if self.storage:
+            await asyncio.to_thread(
+                self.storage.cache_enhancement,
+                key, model, result.text, result.input_tokens, result.output_tokens
+            )
+        return result
+
+    async def _aenhance_chunked(self,
+                                text: str,
+                                model: str,
+                                on_delta: Optional[Callable[[str], None]]) -> EnhancementResult:
+        assembler = _ChunkAssembler(time.perf_counter(), on_delta)
+        inputs = self._chunk_inputs(text, model)
+        slots = asyncio.Semaphore(self.max_parallel)
+
+        async def run(index: int):
+            stream = assembler.emit if index == 0 and on_delta else None
+            async with slots:
+                result = await self._aenhance_single(inputs[index], model, stream)
+            assembler.add(index, result)
+
+        await asyncio.gather(*(run(i) for i in range(len(inputs))))
+        return assembler.result(model)
+
+    def _lookup(self, key: str, model: str) -> Optional[EnhancementResult]:
+        """Procura na memória e depois no SQLite; hits custam zero tokens."""
+        with self._memory_lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+
+        if hit is not None:
+            if self.storage:
+                self.storage.record_cache_access("enhancement", hit=True)
+        elif self.storage:
+            # Conta hit/miss no próprio SQLite
+            stored_text = self.storage.get_cached_enhancement(key)
+            if stored_text is not None:
+                hit = EnhancementResult(stored_text, model)
+                self._remember(key, hit)
+
+        if hit is None:
+            return None
+        return EnhancementResult(hit.text, model, cached=True)
+
+    def _remember(self, key: str, result: EnhancementResult):
+        """Guarda no LRU em memória."""
+        with self._memory_lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.MEMORY_CACHE_SIZE:
+                self._memory.popitem(last=False)
+
+    def _reserve_tokens(self, prompt: str) -> int:
+        """Estimativa para o bucket de TPM: prompt + resposta de tamanho parecido."""
+        return 2 * estimate_tokens(prompt)
+
+    def _request(self, text: str, model: str, stream: bool = False) -> Tuple[str, Dict, int]:
+        """Prompt, argumentos da chamada e reserva de tokens para o bucket."""
+        prompt = self.prompt_template.format(text=text)
+        kwargs = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+        }
+        if stream:
+            kwargs.update(stream=True, stream_options={"include_usage": True})
+        return prompt, kwargs, self._reserve_tokens(prompt)
+
+    def _finish(self,
+                text: str,
+                model: str,
+                prompt: str,
+                content: Optional[str],
+                usage,
+                reserved: int,
+                first_token_seconds: Optional[float] = None) -> EnhancementResult:
+        """Mede tokens (uso real quando a API informar) e devolve a sobra da reserva."""
+        content = content.strip() if content else ""
+        content = content or text
+        if usage:
+            input_tokens, output_tokens = usage.prompt_tokens, usage.completion_tokens
+        else:
+            input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        self.scheduler.refund_tokens(reserved - input_tokens - output_tokens)
+        return EnhancementResult(
+            content, model, input_tokens, output_tokens,
+            first_token_seconds=first_token_seconds
+        )
+
+    def _stream_delta(self, chunk, state: Dict, on_delta: Callable[[str], None]):
+        """Processa um pedaço do stream (texto, uso e tempo do 1º token)."""
+        if chunk.usage:
+            state["usage"] = chunk.usage
+        if not chunk.choices:
+            return
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if state["first_token"] is None:
+                state["first_token"] = time.perf_counter() - state["start"]
+            state["parts"].append(delta)
+            try:
+                on_delta(delta)
+            except Exception as e:
+                print(f"Error in delta callback: {e}")
+
+    def _call_api(self, text: str, model: str) -> EnhancementResult:
+        """Chama o modelo e mede tokens (uso real quando a API informar)."""
+        prompt, kwargs, reserved = self._request(text, model)
+        response = self.scheduler.call(
+            self.client.chat.completions.create, tokens=reserved, **kwargs
+        )
+        usage = getattr(response, "usage", None)
+        return self._finish(text, model, prompt, response.choices[0].message.content, usage, reserved)
+
+    def _call_api_stream(self,
+                         text: str,
+                         model: str,
+                         on_delta: Callable[[str], None]) -> EnhancementResult:
+        """Mesmo que `_call_api`, mas com `stream=True` e texto incremental."""
+        prompt, kwargs, reserved = self._request(text, model, stream=True)
+        state = {"start": time.perf_counter(), "parts": [], "usage": None, "first_token": None}
+        # Só a abertura do stream é refeita em erro; depois do 1º token não
+        stream = self.scheduler.call(
+            self.client.chat.completions.create, tokens=reserved, **kwargs
+        )
+        for chunk in stream:
+            self._stream_delta(chunk, state, on_delta)
+        return self._finish(text, model, prompt, "".join(state["parts"]), state["usage"],
+                            reserved, state["first_token"])
+
+    async def _acall_api(self, text: str, model: str) -> EnhancementResult:
+        prompt, kwargs, reserved = self._request(text, model)
+        response = await self.scheduler.acall(
+            self.async_client.chat.completions.create, tokens=reserved, **kwargs
+        )
+        usage = getattr(response, "usage", None)
+        return self._finish(text, model, prompt, response.choices[0].message.content, usage, reserved)
+
+    async def _acall_api_stream(self,
+                                text: str,
+                                model: str,
+                                on_delta: Callable[[str], None]) -> EnhancementResult:
+        prompt, kwargs, reserved = self._request(text, model, stream=True)
+        state = {"start": time.perf_counter(), "parts": [], "usage": None, "first_token": None}
+        stream = await self.scheduler.acall(
+            self.async_client.chat.completions.create, tokens=reserved, **kwargs
+        )
+        async for chunk in stream:
+            self._stream_delta(chunk, state, on_delta)
+        return self._finish(text, model, prompt, "".join(state["parts"]), state["usage"],
+                            reserved, state["first_token"])
@@ -0,0 +1,171 @@
+"""
+Exportação e restauração do histórico em streaming (JSONL, CSV, Parquet).
+
+Uso:
+    python cli.py export historico.jsonl [--start 2024-01-01] [--end 2024-02-01]
+                                         [--whisper-model whisper-1] [--gpt-model gpt-4-turbo]
+    python cli.py restore historico.jsonl
+
+As linhas são lidas do SQLite em lotes por chave e escritas à medida que
+chegam (e lidas do arquivo da mesma forma na restauração), então a
+memória não cresce com o tamanho do banco. Parquet requer o pacote
+opcional pyarrow.
+"""
+
+import csv
+import json
+import os
+from dataclasses import asdict, fields
+from typing import Dict, Iterator, Optional
+
+from storage import Transcription, TranscriptionStorage
+
+FORMATS = ("jsonl", "csv", "parquet")
+COLUMNS = [field.name for field in fields(Transcription)]
+BATCH_SIZE = 1000
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """Formato explícito ou pela extensão do arquivo."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato não suportado: {fmt or path} (use {', '.join(FORMATS)})")
+    return fmt
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet requer o pacote pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def _flat_row(transcription: Transcription) -> Dict:
+    """Linha plana para CSV/Parquet (metadata como texto JSON)."""
+    row = asdict(transcription)
+    row["metadata"] = json.dumps(row["metadata"], ensure_ascii=False) if row["metadata"] else None
+    return row
+
+def _from_flat_row(row: Dict) -> Transcription:
+    """Inverso de `_flat_row`; aceita os valores como texto (CSV)."""
+    def value(name, cast=None):
+        raw = row.get(name)
+        if raw is None or raw == "":
+            return None
+        return cast(raw) if cast else raw
+
+    metadata = value("metadata")
+    return Transcription(
+        id=value("id", int),
+        created_at=value("created_at"),
+        raw_text=value("raw_text") or "",
+        enhanced_text=value("enhanced_text"),
+        audio_duration=value("audio_duration", float) or 0.0,
+        whisper_model=value("whisper_model") or "whisper-1",
+        gpt_model=value("gpt_model"),
+        tokens_used=value("tokens_used", int) or 0,
+        cost_usd=value("cost_usd", float) or 0.0,
+        metadata=json.loads(metadata) if isinstance(metadata, str) else metadata,
+    )
+
+# ---------- exportação ----------
+
+def _write_jsonl(rows: Iterator[Transcription], path: str) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for transcription in rows:
+            f.write(json.dumps(asdict(transcription), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def _write_csv(rows: Iterator[Transcription], path: str) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for transcription in rows:
+            writer.writerow(_flat_row(transcription))
+            count += 1
+    return count
+
+def _parquet_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("created_at", pa.string()),
+        ("raw_text", pa.string()),
+        ("enhanced_text", pa.string()),
+        ("audio_duration", pa.float64()),
+        ("whisper_model", pa.string()),
+        ("gpt_model", pa.string()),
+        ("tokens_used", pa.int64()),
+        ("cost_usd", pa.float64()),
+        ("metadata", pa.string()),
+    ])
+
+def _write_parquet(rows: Iterator[Transcription], path: str) -> int:
+    pa = _require_pyarrow()
+    schema = _parquet_schema(pa)
+    count = 0
+    batch = []
+    # Um row group por lote: a memória fica limitada a BATCH_SIZE linhas
+    with pa.parquet.ParquetWriter(path, schema) as writer:
+        for transcription in rows:
+            batch.append(_flat_row(transcription))
+            if len(batch) >= BATCH_SIZE:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch.clear()
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+WRITERS = {"jsonl": _write_jsonl, "csv": _write_csv, "parquet": _write_parquet}
+
+def export_transcriptions(storage: TranscriptionStorage,
+                          output_path: str,
+                          fmt: Optional[str] = None,
+                          start: Optional[str] = None,
+                          end: Optional[str] = None,
+                          whisper_model: Optional[str] = None,
+                          gpt_model: Optional[str] = None) -> int:
+    """Exporta (com filtros opcionais) e retorna o número de transcrições."""
+    fmt = detect_format(output_path, fmt)
+    if fmt == "parquet":
+        _require_pyarrow()  # falha antes de criar o arquivo
+    rows = storage.iter_transcriptions(
+        start=start, end=end,
+        whisper_model=whisper_model, gpt_model=gpt_model,
+        batch_size=BATCH_SIZE
+    )
+    return WRITERS[fmt](rows, output_path)
+
+# ---------- restauração ----------
+
+def _read_jsonl(path: str) -> Iterator[Transcription]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield _from_flat_row(json.loads(line))
+
+def _read_csv(path: str) -> Iterator[Transcription]:
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield _from_flat_row(row)
+
+def _read_parquet(path: str) -> Iterator[Transcription]:
+    pa = _require_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=BATCH_SIZE):
+        for row in batch.to_pylist():
+            yield _from_flat_row(row)
+
+READERS = {"jsonl": _read_jsonl, "csv": _read_csv, "parquet": _read_parquet}
+
+def import_transcriptions(storage: TranscriptionStorage,
+                          input_path: str,
+                          fmt: Optional[str] = None) -> int:
+    """Restaura um arquivo exportado; retorna quantas transcrições eram novas."""
+    fmt = detect_format(input_path, fmt)
+    return storage.insert_transcriptions(READERS[fmt](input_path), batch_size=BATCH_SIZE)
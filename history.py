@@ -0,0 +1,103 @@
+"""
+Modelos de dados da lista de histórico (sem dependência de GUI).
+
+A lista virtualizada só pede as linhas visíveis (`row(i)`); o modelo
+carrega páginas sob demanda por chave (created_at, id) e mantém poucas
+em memória, então o custo não cresce com o tamanho do histórico.
+"""
+
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from storage import SearchResult, Transcription, TranscriptionStorage
+
+# (transcrição, data exibida, trecho destacado ou None)
+HistoryRow = Tuple[Transcription, str, Optional[str]]
+
+class HistoryModel:
+    """Histórico completo, mais recentes primeiro, em páginas sob demanda."""
+
+    def __init__(self,
+                 storage: TranscriptionStorage,
+                 page_size: int = 50,
+                 max_pages: int = 20):
+        self.storage = storage
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[int, List[Transcription]]" = OrderedDict()
+        self.total = storage.count_transcriptions()
+
+    def __len__(self) -> int:
+        return self.total
+
+    def row(self, index: int) -> Optional[HistoryRow]:
+        if not 0 <= index < self.total:
+            return None
+        page = self._page(index // self.page_size)
+        offset = index % self.page_size
+        if offset >= len(page):
+            return None
+        transcription = page[offset]
+        return transcription, transcription.created_at, None
+
+    def refresh(self):
+        """Descarta as páginas (ex.: nova transcrição salva)."""
+        self._pages.clear()
+        self.total = self.storage.count_transcriptions()
+
+    @staticmethod
+    def _key(transcription: Transcription) -> Tuple[str, int]:
+        return transcription.created_at, transcription.id
+
+    def _page(self, number: int) -> List[Transcription]:
+        if number in self._pages:
+            self._pages.move_to_end(number)
+            return self._pages[number]
+
+        previous = self._pages.get(number - 1)
+        following = self._pages.get(number + 1)
+        if number == 0:
+            items = self.storage.get_transcriptions_page(self.page_size)
+        elif previous and len(previous) == self.page_size:
+            # Rolagem para baixo: continua a partir da página anterior
+            items = self.storage.get_transcriptions_page(
+                self.page_size, before=self._key(previous[-1]))
+        elif following:
+            # Rolagem para cima: página mais nova que a seguinte
+            items = self.storage.get_transcriptions_page(
+                self.page_size, after=self._key(following[0]))
+        else:
+            # Salto da barra de rolagem: acha a chave pelo índice e segue por chave
+            anchor = self.storage.get_history_key(number * self.page_size - 1)
+            items = self.storage.get_transcriptions_page(
+                self.page_size, before=anchor) if anchor else []
+
+        self._pages[number] = items
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return items
+
+class SearchModel:
+    """Resultados de busca (já limitados) com a mesma interface."""
+
+    def __init__(self, results: List[SearchResult]):
+        self.results = results
+        self.total = len(results)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def row(self, index: int) -> Optional[HistoryRow]:
+        if not 0 <= index < self.total:
+            return None
+        result = self.results[index]
+        return result.transcription, result.transcription.created_at, result.snippet
+
+    def refresh(self):
+        pass
+
+def history_model(storage, query: str = "", search_limit: int = 200):
+    """Modelo para a consulta: histórico completo (vazia) ou busca FTS5."""
+    if query:
+        return SearchModel(storage.search(query, limit=search_limit))
+    return HistoryModel(storage)
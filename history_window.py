@@ -0,0 +1,148 @@
+"""
+Lista de histórico virtualizada para a janela de histórico.
+
+Só existem widgets para as linhas visíveis (mais uma); rolar apenas
+troca o texto desses widgets com as linhas do modelo (`history.py`).
+"""
+
+import math
+from typing import Callable, List
+
+import customtkinter as ctk
+
+class VirtualHistoryList(ctk.CTkFrame):
+    """Lista de altura fixa por linha, com barra de rolagem sobre o total."""
+
+    ROW_HEIGHT = 78
+    PREVIEW_CHARS = 100
+
+    def __init__(self, master, on_copy: Callable[[int], None], **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_copy = on_copy
+        self.model = None
+        self.top = 0
+        self._rows: List[dict] = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.empty_label = ctk.CTkLabel(self.body, text="")
+
+        self.body.bind("<Configure>", self._on_resize)
+        for widget in (self.body, self.empty_label):
+            self._bind_wheel(widget)
+
+    # ---------- modelo ----------
+
+    def set_model(self, model, empty_text: str = "Nenhuma transcrição no histórico"):
+        """Troca o conteúdo (histórico completo ou resultados de busca)."""
+        self.model = model
+        self.top = 0
+        self.empty_label.configure(text=empty_text)
+        self.render()
+
+    # ---------- rolagem ----------
+
+    @property
+    def visible_rows(self) -> int:
+        return max(1, self.body.winfo_height() // self.ROW_HEIGHT)
+
+    def scroll_to(self, index: int):
+        total = len(self.model) if self.model else 0
+        top = max(0, min(index, total - self.visible_rows))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def _on_scrollbar(self, action, *args):
+        total = len(self.model) if self.model else 0
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * total))
+        elif action == "scroll":
+            step = int(args[0]) * (self.visible_rows if args[1] == "pages" else 1)
+            self.scroll_to(self.top + step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            step = -3
+        elif getattr(event, "num", None) == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self.scroll_to(self.top + step)
+        return "break"
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", self._on_wheel)
+        widget.bind("<Button-5>", self._on_wheel)
+
+    # ---------- widgets ----------
+
+    def _on_resize(self, _event=None):
+        needed = math.ceil(self.body.winfo_height() / self.ROW_HEIGHT) + 1
+        while len(self._rows) < needed:
+            self._rows.append(self._create_row())
+        self.render()
+
+    def _create_row(self) -> dict:
+        frame = ctk.CTkFrame(self.body, height=self.ROW_HEIGHT - 6)
+        frame.pack_propagate(False)
+
+        info = ctk.CTkLabel(frame, text="", font=("Arial", 10), anchor="w")
+        info.pack(pady=(4, 0), padx=10, anchor="w")
+        preview = ctk.CTkLabel(frame, text="", anchor="w", justify="left", wraplength=420)
+        preview.pack(side="left", padx=10, fill="x", expand=True)
+        row = {"frame": frame, "info": info, "preview": preview, "id": None}
+        button = ctk.CTkButton(
+            frame,
+            text="📋 Copiar",
+            width=80,
+            command=lambda: self.on_copy(row["id"]) if row["id"] else None
+        )
+        button.pack(side="right", padx=10)
+        row["button"] = button
+
+        for widget in (frame, info, preview):
+            self._bind_wheel(widget)
+        return row
+
+    def render(self):
+        """Preenche os widgets visíveis com as linhas a partir de `self.top`."""
+        total = len(self.model) if self.model else 0
+
+        if total == 0:
+            self.empty_label.place(relx=0.5, rely=0.3, anchor="center")
+        else:
+            self.empty_label.place_forget()
+
+        for offset, widgets in enumerate(self._rows):
+            entry = self.model.row(self.top + offset) if self.model else None
+            if entry is None:
+                widgets["frame"].place_forget()
+                widgets["id"] = None
+                continue
+
+            transcription, when, snippet = entry
+            text = transcription.to_clipboard_text().replace("\n", " ")
+            limit = self.PREVIEW_CHARS
+            preview = snippet or (text[:limit] + "..." if len(text) > limit else text)
+
+            widgets["id"] = transcription.id
+            widgets["info"].configure(
+                text=f"{when} | {transcription.audio_duration:.1f}s | ${transcription.cost_usd:.4f}"
+            )
+            widgets["preview"].configure(text=preview)
+            widgets["frame"].place(x=0, y=offset * self.ROW_HEIGHT + 3, relwidth=1.0)
+
+        if total:
+            first = self.top / total
+            last = min(1.0, (self.top + self.visible_rows) / total)
+            self.scrollbar.set(first, last)
+        else:
+            self.scrollbar.set(0, 1)
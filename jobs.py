@@ -0,0 +1,253 @@
+"""
+Agendador de jobs de transcrição com pool limitado e prioridades.
+Substitui a thread solta por gravação no app desktop.
+"""
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+@dataclass
+class Job:
+    """Um job enfileirado no agendador."""
+    id: int
+    name: str
+    fn: Callable
+    args: tuple = ()
+    priority: int = 10
+    status: str = "queued"  # queued | running | done | failed | cancelled
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[Exception] = None
+    on_cancel: Optional[Callable[[], None]] = None
+    _finished: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def wait_time(self) -> float:
+        """Tempo (s) na fila até começar (ou até agora)."""
+        return (self.started_at or time.time()) - self.submitted_at
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até o job terminar (ou ser cancelado). False se expirou."""
+        return self._finished.wait(timeout)
+
+class JobScheduler:
+    """Pool de workers com fila de prioridade e limites por etapa.
+
+    Menor `priority` roda primeiro; dentro da mesma prioridade a ordem é
+    FIFO, ou LIFO com `latest_first=True` (a gravação mais recente vai
+    primeiro para o clipboard). Etapas (`stage`) limitam quantos jobs
+    fazem upload/aprimoramento ao mesmo tempo, independente do pool.
+    """
+
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_NORMAL = 10
+    PRIORITY_BATCH = 20
+
+    def __init__(self,
+                 max_workers: int = 2,
+                 stage_limits: Optional[Dict[str, int]] = None,
+                 max_queued: int = 50,
+                 on_change: Optional[Callable[[Dict], None]] = None):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.on_change = on_change
+
+        self._heap: List[tuple] = []
+        self._jobs: Dict[int, Job] = {}
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._queued = 0
+        self._running = 0
+        self._counters = {"done": 0, "failed": 0, "cancelled": 0}
+        self._shutdown = False
+
+        # Limites por etapa
+        self._stage_limits = dict(stage_limits or {})
+        self._stage_sems = {
+            name: threading.BoundedSemaphore(limit)
+            for name, limit in self._stage_limits.items()
+        }
+        self._stage_active = {name: 0 for name in self._stage_limits}
+        self._stage_waiting = {name: 0 for name in self._stage_limits}
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self,
+               fn: Callable,
+               *args,
+               name: str = "",
+               priority: int = PRIORITY_NORMAL,
+               latest_first: bool = False,
+               on_cancel: Optional[Callable[[], None]] = None) -> Job:
+        """Enfileira um job. Levanta queue.Full se a fila estiver no limite."""
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Agendador encerrado")
+            if self._queued >= self.max_queued:
+                raise queue.Full(f"Fila cheia ({self._queued} jobs aguardando)")
+
+            job = Job(
+                id=next(self._ids),
+                name=name or getattr(fn, "__name__", "job"),
+                fn=fn,
+                args=args,
+                priority=priority,
+                on_cancel=on_cancel
+            )
+            order = next(self._order)
+            heapq.heappush(self._heap, (priority, -order if latest_first else order, job.id))
+            self._jobs[job.id] = job
+            self._queued += 1
+            self._cond.notify()
+
+        self._notify_change()
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancela um job ainda na fila. Jobs em execução não são interrompidos."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.status != "queued":
+                return False
+            # Remoção preguiçosa: o worker descarta ao tirar da fila
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            self._queued -= 1
+            self._counters["cancelled"] += 1
+            self._jobs.pop(job_id, None)
+        job._finished.set()
+
+        if job.on_cancel:
+            try:
+                job.on_cancel()
+            except Exception as e:
+                print(f"Error in cancel callback: {e}")
+        self._notify_change()
+        return True
+
+    def queued_jobs(self) -> List[Job]:
+        """Jobs aguardando, na ordem em que vão rodar."""
+        with self._cond:
+            return [
+                self._jobs[job_id]
+                for _, _, job_id in sorted(self._heap)
+                if job_id in self._jobs and self._jobs[job_id].status == "queued"
+            ]
+
+    @contextmanager
+    def stage(self, name: str):
+        """Limita a concorrência de uma etapa (ex: 'upload', 'enhancement')."""
+        sem = self._stage_sems.get(name)
+        if sem is None:
+            yield
+            return
+
+        with self._cond:
+            self._stage_waiting[name] += 1
+        self._notify_change()
+        sem.acquire()
+        with self._cond:
+            self._stage_waiting[name] -= 1
+            self._stage_active[name] += 1
+        self._notify_change()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._stage_active[name] -= 1
+            sem.release()
+            self._notify_change()
+
+    def stats(self) -> Dict:
+        """Profundidade da fila, jobs em execução e ocupação das etapas."""
+        with self._cond:
+            now = time.time()
+            waiting = [job for job in self._jobs.values() if job.status == "queued"]
+            return {
+                "queued": self._queued,
+                "running": self._running,
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "oldest_wait_seconds": max((now - job.submitted_at for job in waiting), default=0.0),
+                "stages": {
+                    name: {
+                        "limit": self._stage_limits[name],
+                        "active": self._stage_active[name],
+                        "waiting": self._stage_waiting[name],
+                    }
+                    for name in self._stage_limits
+                },
+                **self._counters
+            }
+
+    def shutdown(self, cancel_pending: bool = True):
+        """Encerra os workers (jobs em execução terminam normalmente)."""
+        if cancel_pending:
+            for job in self.queued_jobs():
+                self.cancel(job.id)
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    def _next_job(self) -> Optional[Job]:
+        """Bloqueia até haver um job válido (ou encerramento)."""
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job and job.status == "queued":
+                        job.status = "running"
+                        job.started_at = time.time()
+                        self._queued -= 1
+                        self._running += 1
+                        return job
+                if self._shutdown:
+                    return None
+                self._cond.wait()
+
+    def _worker(self):
+        """Loop de cada worker do pool."""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._notify_change()
+
+            try:
+                job.result = job.fn(*job.args)
+                job.status = "done"
+            except Exception as e:
+                job.error = e
+                job.status = "failed"
+                print(f"Job {job.id} ({job.name}) failed: {e}")
+            finally:
+                job.finished_at = time.time()
+                with self._cond:
+                    self._running -= 1
+                    self._counters[job.status] += 1
+                    self._jobs.pop(job.id, None)
+                job._finished.set()
+                self._notify_change()
+
+    def _notify_change(self):
+        """Avisa mudança de estado (ex: para atualizar a UI)."""
+        if self.on_change:
+            try:
+                self.on_change(self.stats())
+            except Exception as e:
+                print(f"Error in scheduler callback: {e}")
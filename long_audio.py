@@ -0,0 +1,129 @@
+"""
+Transcrição de áudios longos em pedaços paralelos (bot do Telegram).
+
+O áudio é decodificado em streaming e cortado nas pausas, com uma
+pequena sobreposição entre pedaços (vad.split_with_overlap). Cada pedaço
+vira um FLAC em memória enviado ao backend; vários rodam ao mesmo tempo
+e o texto é costurado na ordem, sem a repetição da sobreposição.
+"""
+
+import asyncio
+import io
+import os
+from typing import Awaitable, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from audio_decode import iter_blocks
+from enhancement import merge_overlap
+from transcription import TranscriptionBackend, TranscriptResult
+from vad import split_with_overlap
+
+# Pedaços curtos dão o primeiro texto em segundos e mais paralelismo;
+# a sobreposição (cobrada pelo Whisper) fica em ~2,5% do áudio
+CHUNK_SECONDS = float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", "60"))
+OVERLAP_SECONDS = 1.5
+SEARCH_SECONDS = 15.0
+MAX_PARALLEL = int(os.getenv("LONG_AUDIO_PARALLEL", "4"))
+
+TextCallback = Callable[[str, int], Awaitable[None]]
+
+def encode_chunk(samples: np.ndarray, sample_rate: int, index: int) -> io.BytesIO:
+    """FLAC em memória (barato de codificar; 60 s ficam bem abaixo de 25 MB)."""
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format="FLAC", subtype="PCM_16")
+    buffer.seek(0)
+    buffer.name = f"chunk_{index:04d}.flac"  # OpenAI usa o nome p/ formato
+    return buffer
+
+def iter_chunks(audio: BinaryIO,
+                chunk_seconds: float = CHUNK_SECONDS,
+                overlap_seconds: float = OVERLAP_SECONDS,
+                search_seconds: float = SEARCH_SECONDS) -> Iterator[Tuple[int, io.BytesIO]]:
+    """(índice, FLAC) de cada pedaço, decodificando só o necessário."""
+    sample_rate, blocks = iter_blocks(audio)
+    pieces = split_with_overlap(blocks, sample_rate, chunk_seconds, overlap_seconds, search_seconds)
+    for index, (_start, samples) in enumerate(pieces):
+        yield index, encode_chunk(samples, sample_rate, index)
+
+class ChunkStitcher:
+    """Junta os textos dos pedaços na ordem, conforme ficam prontos."""
+
+    def __init__(self):
+        self.text = ""
+        self.done = 0  # pedaços já incorporados ao texto contínuo
+        self._results: Dict[int, str] = {}
+
+    def add(self, index: int, text: str) -> bool:
+        """Registra o texto de um pedaço; True se o texto contínuo cresceu."""
+        self._results[index] = text.strip()
+        grew = False
+        while self.done in self._results:
+            part = self._results.pop(self.done)
+            self.text = merge_overlap(self.text, part)
+            self.done += 1
+            grew = True
+        return grew
+
+async def atranscribe_chunked(backend: TranscriptionBackend,
+                              audio: BinaryIO,
+                              language: Optional[str] = None,
+                              on_text: Optional[TextCallback] = None,
+                              max_parallel: int = MAX_PARALLEL,
+                              chunk_seconds: float = CHUNK_SECONDS) -> TranscriptResult:
+    """Transcreve `audio` em pedaços simultâneos (até `max_parallel`).
+
+    `on_text(texto, pedaços)` é aguardado sempre que o começo contínuo do
+    texto cresce. O próximo pedaço só é decodificado quando há vaga, então
+    a memória não cresce com a duração. Se o formato não puder ser
+    decodificado aqui, o arquivo vai inteiro para o backend, como antes.
+    """
+    position = audio.tell()
+    chunks = iter_chunks(audio, chunk_seconds)
+    stitcher = ChunkStitcher()
+    slots = asyncio.Semaphore(max_parallel)
+    tasks = []
+    cached = True
+
+    async def transcribe(index: int, buffer: io.BytesIO):
+        nonlocal cached
+        try:
+            result = await backend.atranscribe(buffer, language)
+        finally:
+            slots.release()
+        cached = cached and result.cached
+        if stitcher.add(index, result.text) and on_text:
+            await on_text(stitcher.text, stitcher.done)
+
+    try:
+        while True:
+            await slots.acquire()
+            # Um pedaço com erro interrompe o resto do áudio
+            for task in tasks:
+                if task.done() and task.exception():
+                    raise task.exception()
+            try:
+                item = await asyncio.to_thread(next, chunks, None)
+            except RuntimeError:
+                if tasks:
+                    raise
+                chunks.close()
+                audio.seek(position)
+                return await backend.atranscribe(audio, language)
+            if item is None:
+                break
+            index, buffer = item
+            tasks.append(asyncio.create_task(transcribe(index, buffer)))
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            chunks.close()  # fecha o arquivo/ffmpeg da decodificação
+        except ValueError:
+            pass  # cancelado no meio de um next() na thread
+        raise
+
+    return TranscriptResult(stitcher.text, backend.model_name, cached=bool(tasks) and cached)
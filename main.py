@@ -9,42 +9,34 @@ import customtkinter as ctk
 from datetime import datetime, timedelta
 import threading
 import queue
-import pystray
-from plyer import notification
-from plyer.platforms.win.notification import instance as _get_notifier
-from PIL import Image, ImageDraw
-import keyboard
 from dotenv import load_dotenv
 import time
 import os
 import sys
-from openai import OpenAI
+from typing import Optional
+import pyperclip
 
-# Importa módulos novos
-from audio_core import AudioRecorder
-from storage import TranscriptionStorage, Transcription
-from notion_sync import NotionSync
+# Bandeja (pystray/PIL), atalhos (keyboard), notificações (plyer), OpenAI
+# e Notion são importados só quando usados: a janela abre antes deles
+from app_config import DEFAULT_CONFIG, vad_config
+from audio_core import AudioRecorder, StreamingTranscriber
+from storage import TranscriptionStorage
+from vad import VADConfig
+from transcription import CachedBackend, TranscriptionBackend, TranscriptResult, get_backend
+from enhancement import DESKTOP_PROMPT, EnhancementResult, Enhancer
+from jobs import JobScheduler
+from pipeline import TranscriptionPipeline
+from rate_limit import rate_limit_stats
+from timing import StageTimer
 
 load_dotenv()
 
 # Configurações
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Configurações padrão
-DEFAULT_CONFIG = {
-    "shortcuts": {
-        "record": "ctrl+shift+r",
-        "stop": "ctrl+shift+s",
-        "history": "ctrl+shift+h"
-    },
-    "whisper_model": "whisper-1",
-    "gpt_model": "gpt-4-turbo",
-    "use_gpt_enhancement": True,
-    "auto_start_minimized": True
-}
-
 def create_image():
     """Cria ícone para bandeja."""
+    from PIL import Image, ImageDraw
     width = 64
     height = 64
     image = Image.new("RGB", (width, height), "blue")
@@ -53,9 +45,6 @@ def create_image():
     dc.ellipse([20, 20, 44, 44], fill="red")
     return image
 
-def estimate_tokens(text: str) -> int:
-    """Estima número de tokens (aproximado)."""
-    return len(text) // 4
 # ---------------------------------------------------------------------------
     # FUTURO: MODOS, MODELO LOCAL & ORGANIZAÇÃO AVANÇADA
     # 
@@ -81,22 +70,46 @@ class GravadorWidget:
         self.message_queue = queue.Queue()
         
         # Inicializa módulos
-        self.audio_recorder = AudioRecorder()
+        self.audio_recorder = AudioRecorder(encoder=self.config["audio_encoder"])
         self.audio_recorder.set_status_callback(self._on_audio_status)
         
         self.storage = TranscriptionStorage()
         
+        # Aprimoramento GPT com cache (memória + SQLite)
+        self.enhancer = Enhancer(
+            storage=self.storage,
+            model=self.config["gpt_model"],
+            prompt_template=DESKTOP_PROMPT,
+            max_chunk_tokens=self.config["enhancement_chunk_tokens"],
+            max_parallel=self.config["enhancement_parallelism"]
+        )
+        
+        # Backend de transcrição (carregado em background na inicialização)
+        self.backend: Optional[TranscriptionBackend] = None
+        self._backend_ready = threading.Event()
+        
+        # Jobs de transcrição (pool limitado, mais recente primeiro)
+        self.scheduler = JobScheduler(
+            max_workers=self.config["max_concurrent_jobs"],
+            stage_limits=self.config["stage_limits"],
+            max_queued=self.config["max_queued_jobs"],
+            on_change=self._on_scheduler_change
+        )
+        
         # Estado
         self.current_transcription_id = None
-        self.processing_start_time = None
+        self.streamer: Optional[StreamingTranscriber] = None
         
-        # Inicializa NotionSync para integração Notion
-        self.notion_sync = NotionSync()
+        # Integração Notion (criada no primeiro sync)
+        self._notion_sync = None
+        self.tray_icon = None
 
-        # Interface
+        # Interface (bandeja e atalhos entram depois que a janela existe)
         self._setup_ui()
-        self._setup_tray()
-        self._register_hotkeys()
+        self.root.after_idle(self._setup_tray)
+        self.root.after_idle(self._register_hotkeys)
+        
+        threading.Thread(target=self._load_backend, daemon=True).start()
         
         # Loops de atualização
         self.update_timer()
@@ -146,6 +159,9 @@ class GravadorWidget:
         self.stats_label = ctk.CTkLabel(stats_frame, text="", font=("Arial", 10))
         self.stats_label.pack()
         
+        self.queue_label = ctk.CTkLabel(stats_frame, text="Fila: vazia", font=("Arial", 10))
+        self.queue_label.pack()
+        
         # Botões principais
         button_frame = ctk.CTkFrame(self.main_frame)
         button_frame.pack(pady=10)
@@ -168,6 +184,15 @@ class GravadorWidget:
         )
         self.finish_button.grid(row=0, column=1, padx=5, pady=5)
         
+        self.cancel_button = ctk.CTkButton(
+            button_frame,
+            text="✖️ Cancelar último da fila",
+            command=self.cancel_last_queued,
+            fg_color="gray",
+            width=200
+        )
+        self.cancel_button.grid(row=1, column=0, columnspan=2, padx=5, pady=5)
+        
         # Opções
         options_frame = ctk.CTkFrame(self.main_frame)
         options_frame.pack(pady=10)
@@ -195,6 +220,11 @@ class GravadorWidget:
         self.log_textbox.configure(state="disabled")
         self.log_textbox.pack(pady=10)
         
+        # Prévia do texto aprimorado (atualizada em streaming)
+        self.preview_textbox = ctk.CTkTextbox(self.main_frame, width=450, height=100)
+        self.preview_textbox.configure(state="disabled")
+        self.preview_textbox.pack(pady=5)
+        
         # Custo total
         self.cost_label = ctk.CTkLabel(
             self.main_frame, 
@@ -210,6 +240,7 @@ class GravadorWidget:
     
     def _setup_tray(self):
         """Configura ícone da bandeja."""
+        import pystray
         image = create_image()
         menu = pystray.Menu(
             pystray.MenuItem('Mostrar', self.show_window),
@@ -222,6 +253,7 @@ class GravadorWidget:
     def _register_hotkeys(self):
         """Registra atalhos de teclado."""
         try:
+            import keyboard
             keyboard.add_hotkey(self.config['shortcuts']['record'], self.toggle_recording)
             keyboard.add_hotkey(self.config['shortcuts']['stop'], self.finish_recording)
             keyboard.add_hotkey(self.config['shortcuts']['history'], self.show_history)
@@ -229,6 +261,63 @@ class GravadorWidget:
         except Exception as e:
             self.add_log(f"⚠️ Erro nos atalhos: {str(e)}", "warning")
     
+    def _load_backend(self):
+        """Carrega o backend de transcrição uma vez e o mantém quente."""
+        try:
+            self.backend = CachedBackend(get_backend(self.config), self.storage)
+            self.add_log(f"✅ Transcrição: {self.backend.model_name}", "success")
+        except Exception as e:
+            self.add_log(f"❌ Falha ao carregar backend: {e}", "error")
+        finally:
+            self._backend_ready.set()
+    
+    def _on_scheduler_change(self, stats: dict):
+        """Callback do agendador (roda em threads de worker)."""
+        self.message_queue.put({
+            'type': 'queue',
+            'stats': stats
+        })
+    
+    def _update_queue_display(self, stats: dict):
+        """Mostra profundidade da fila e ocupação das etapas."""
+        if not stats['queued'] and not stats['running']:
+            self.queue_label.configure(text="Fila: vazia", text_color=("gray10", "gray90"))
+            return
+        
+        stages = " | ".join(
+            f"{name}: {s['active']}/{s['limit']}" + (f" (+{s['waiting']})" if s['waiting'] else "")
+            for name, s in stats['stages'].items()
+        )
+        text = (
+            f"Fila: {stats['queued']} aguardando, {stats['running']} em execução"
+            f" | espera máx {stats['oldest_wait_seconds']:.0f}s"
+        )
+        if stages:
+            text += f"\n{stages}"
+        
+        # Espera imposta pelos limites da OpenAI (RPM/TPM e 429)
+        limits = rate_limit_stats()
+        throttled = [
+            f"{group}: {s['waiting']} aguardando" + (f", pausa {s['paused_seconds']:.0f}s" if s['paused_seconds'] else "")
+            for group, s in limits.items() if s['waiting'] or s['paused_seconds']
+        ]
+        if throttled:
+            text += "\n⏳ Limite OpenAI — " + " | ".join(throttled)
+        
+        # Back-pressure: destaca quando a fila se aproxima do limite
+        near_full = stats['queued'] >= stats['max_queued'] * 0.8
+        self.queue_label.configure(text=text, text_color="orange" if near_full else ("gray10", "gray90"))
+    
+    def cancel_last_queued(self):
+        """Cancela o job que rodaria por último."""
+        queued = self.scheduler.queued_jobs()
+        if not queued:
+            self.add_log("Nenhum job aguardando na fila", "info")
+            return
+        job = queued[-1]
+        if self.scheduler.cancel(job.id):
+            self.add_log(f"✖️ Job #{job.id} cancelado ({job.name})", "warning")
+    
     def _on_audio_status(self, status: str):
         """Callback de status do gravador de áudio."""
         self.message_queue.put({
@@ -266,6 +355,18 @@ class GravadorWidget:
         if text:
             self.status_label.configure(text=text)
     
+    def _show_partial(self, text: str, progress: Optional[float] = None):
+        """Atualiza a prévia com o texto parcial do GPT."""
+        self.preview_textbox.configure(state="normal")
+        self.preview_textbox.delete("1.0", "end")
+        self.preview_textbox.insert("end", text)
+        self.preview_textbox.configure(state="disabled")
+        self.preview_textbox.see("end")
+        if progress is not None:
+            self.progress_bar.set(progress)
+        if self.config.get("stream_to_clipboard"):
+            pyperclip.copy(text)
+    
     def _update_statistics(self):
         """Atualiza estatísticas na UI."""
         stats = self.storage.get_statistics()
@@ -301,9 +402,15 @@ class GravadorWidget:
                 elif msg['type'] == 'log':
                     self.add_log(msg['text'], msg.get('level', 'info'))
                     
+                elif msg['type'] == 'queue':
+                    self._update_queue_display(msg['stats'])
+                    
                 elif msg['type'] == 'status':
                     self.status_label.configure(text=msg['text'])
                     
+                elif msg['type'] == 'partial':
+                    self._show_partial(msg['text'], msg.get('progress'))
+                    
                 elif msg['type'] == 'finish':
                     self.update_progress(1.0, "✅ Concluído!")
                     self.root.after(2000, self.reset_ui)
@@ -342,6 +449,19 @@ class GravadorWidget:
         stats = self.audio_recorder.recording_stats
         
         if stats['status'] == 'idle':
+            # Modo streaming: pedaços vão para o Whisper durante a gravação
+            if self.config.get("streaming_transcription"):
+                self.streamer = StreamingTranscriber(
+                    self._transcribe_chunk,
+                    self.audio_recorder.sample_rate,
+                    self._vad_config(),
+                    self.config["audio_encoder"]
+                )
+                self.audio_recorder.set_chunk_callback(self.streamer.submit)
+            else:
+                self.streamer = None
+                self.audio_recorder.set_chunk_callback(None)
+            
             # Inicia nova gravação
             if self.audio_recorder.start_recording():
                 self.record_button.configure(
@@ -350,6 +470,11 @@ class GravadorWidget:
                 )
                 self.status_label.configure(text="🎙️ Gravando...")
                 self.show_notification("Gravação Iniciada", "Microfone ativo")
+            elif self.streamer:
+                # Não deixa a thread do streaming viva sem gravação
+                self.streamer.discard()
+                self.streamer = None
+                self.audio_recorder.set_chunk_callback(None)
                 
         elif stats['status'] == 'recording':
             # Pausa
@@ -371,7 +496,15 @@ class GravadorWidget:
     
     def finish_recording(self):
         """Finaliza gravação e processa."""
-        audio_file = self.audio_recorder.stop_recording()
+        timer = StageTimer()
+        with timer.span("finalize"):
+            audio_file = self.audio_recorder.stop_recording()
+        streamer, self.streamer = self.streamer, None
+        if streamer and self.audio_recorder.draining:
+            # Último pedaço ainda não saiu: o texto em streaming ficaria incompleto
+            self.add_log("⚠️ Gravação ainda sendo gravada em disco; transcrevendo o arquivo inteiro", "warning")
+            streamer.discard()
+            streamer = None
         
         if not audio_file:
             self.add_log("⚠️ Nenhum áudio para processar", "warning")
@@ -380,49 +513,72 @@ class GravadorWidget:
         stats = self.audio_recorder.recording_stats
         duration = stats['duration']
         
-        self.processing_start_time = time.time()
         self.update_progress(0.1, "📝 Preparando transcrição...")
         
-        # Processa em thread separada
-        thread = threading.Thread(
-            target=self._process_transcription,
-            args=(audio_file, duration),
-            daemon=True
-        )
-        thread.start()
+        def discard_audio():
+            try: os.unlink(audio_file)
+            except: pass
+        
+        # Enfileira no agendador (gravação mais recente passa na frente)
+        try:
+            job = self.scheduler.submit(
+                self._process_transcription,
+                audio_file, duration, streamer, time.time(), timer,
+                name=f"gravação {datetime.now().strftime('%H:%M:%S')}",
+                priority=JobScheduler.PRIORITY_INTERACTIVE,
+                latest_first=True,
+                on_cancel=discard_audio
+            )
+        except queue.Full as e:
+            self.add_log(f"⚠️ {e} - gravação descartada", "error")
+            discard_audio()
+            return
+        
+        if job.status == "queued" and self.scheduler.stats()['running'] >= self.scheduler.max_workers:
+            self.add_log(f"⏳ Job #{job.id} aguardando na fila", "info")
     
-    def _process_transcription(self, audio_file: str, duration: float):
+    def _process_transcription(self, audio_file: str, duration: float,
+                               streamer: Optional[StreamingTranscriber] = None,
+                               submitted_at: Optional[float] = None,
+                               timer: Optional[StageTimer] = None):
         """Processa transcrição em etapas: transcrição, aprimoramento, salvamento, sync, notificações."""
+        timer = timer or StageTimer()
+        if submitted_at:
+            timer.add("job_queue", time.time() - submitted_at)
         try:
-            # Etapa 1: Transcrição
-            raw_text = self._transcribe_audio(audio_file)
+            metadata = {"source": "desktop"}
+            pipeline = self._pipeline()
+            
+            # Etapa 1: Transcrição (em streaming, só falta o último pedaço)
+            raw_text = None
+            if streamer:
+                self.update_progress(0.2, '🎤 Finalizando último trecho...')
+                try:
+                    # Cada pedaço já passa pela etapa "upload" (_transcribe_chunk);
+                    # segurar a vaga aqui travaria o último pedaço
+                    with timer.span("whisper"):
+                        raw_text = streamer.finish()
+                    if streamer.cached:
+                        metadata["transcription_cached"] = True
+                        self.add_log('♻️ Transcrição reaproveitada do cache', 'info')
+                    if streamer.vad_config:
+                        metadata["original_duration"] = round(streamer.original_duration, 2)
+                        metadata["trimmed_duration"] = round(streamer.trimmed_duration, 2)
+                except Exception as e:
+                    # A gravação inteira continua no disco: tenta de uma vez
+                    self.add_log(f'⚠️ Falha num trecho ({e}); transcrevendo a gravação inteira', 'warning')
+            if raw_text is None:
+                self.update_progress(0.2, '🎤 Enviando para Whisper...')
+                raw_text, duration = pipeline.transcribe(audio_file, metadata, duration, timer)
             self.add_log(f'✅ Transcrição: {len(raw_text)} caracteres', 'success')
 
             # Etapa 2: Aprimoramento opcional
-            enhanced_text, tokens_used, gpt_model = None, 0, None
-            if self.config["use_gpt_enhancement"]:
-                enhanced_text, tokens_used, gpt_model = self._enhance_transcription(raw_text)
-            else:
-                enhanced_text = raw_text
+            enhancement = self._enhance_transcription(pipeline, raw_text, metadata, timer)
 
-            # Etapa 3: Salvamento
-            cost, _ = self.storage.calculate_cost(
-                duration,
-                self.config["whisper_model"],
-                gpt_model,
-                tokens_used // 2,
-                tokens_used // 2
-            )
-            transcription = Transcription(
-                raw_text=raw_text,
-                enhanced_text=enhanced_text,
-                audio_duration=duration,
-                whisper_model=self.config["whisper_model"],
-                gpt_model=gpt_model,
-                tokens_used=tokens_used,
-                cost_usd=cost
-            )
-            transcription_id = self.storage.save_transcription(transcription)
+            # Etapa 3: Salvamento com custo real
+            transcription = pipeline.save(raw_text, enhancement, duration, metadata, timer)
+            transcription_id = transcription.id
+            cost = transcription.cost_usd
             self.current_transcription_id = transcription_id
 
             # Sincronização Notion (threaded)
@@ -432,11 +588,21 @@ class GravadorWidget:
             # self._notify_telegram(transcription_id) -- removido pois não existe
 
             # Copiar para clipboard
-            self.storage.copy_to_clipboard(transcription_id)
+            with timer.span("clipboard"):
+                self.storage.copy_to_clipboard(transcription_id)
+
+            # Tempos por etapa no metadata (relatório em get_latency_report)
+            total_time = (time.time() - submitted_at) if submitted_at else 0
+            timer.add("total", total_time + timer.get("finalize"))
+            pipeline.record_timings(transcription, timer)
 
             # Feedbacks UI e notificações
-            total_time = (time.time() - self.processing_start_time) if self.processing_start_time else 0
-            self.add_log(f'💰 Custo: ${cost:.4f} | ⏱️ Tempo: {total_time:.1f}s', 'info')
+            slowest = max(
+                (name for name in ("encode", "queue", "whisper", "gpt", "save") if timer.get(name)),
+                key=timer.get, default=None
+            )
+            slowest_text = f' (mais lento: {slowest} {timer.get(slowest):.1f}s)' if slowest else ''
+            self.add_log(f'💰 Custo: ${cost:.4f} | ⏱️ Tempo: {total_time:.1f}s{slowest_text}', 'info')
             self.update_progress(1.0, '✅ Copiado para área de transferência!')
             self.show_notification("Transcrição Concluída", f"Copiado! Custo: ${cost:.3f}")
 
@@ -457,46 +623,90 @@ class GravadorWidget:
         """Stub para integração com Telegram (implementação futura).
         Substituir este método pelo envio real via Bot Telegram ou outro canal."""
         self.add_log(f'[STUB] Integração Telegram não implementada. ID: {transcription_id}', 'warning')
-    def _transcribe_audio(self, audio_file):
-        """Realiza transcrição do áudio via Whisper API."""
-        self.update_progress(0.2, '🎤 Enviando para Whisper...')
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        with open(audio_file, "rb") as f:
-            response = client.audio.transcriptions.create(
-                model=self.config["whisper_model"],
-                file=f,
-                language="pt"
-            )
-        return response.text.strip()
 
-    def _enhance_transcription(self, text):
-        """Aprimora texto usando GPT-4 ou modelo configurado."""
-        self.update_progress(0.5, '🤖 Aprimorando com GPT-4...')
-        prompt = (
-            "Reescreva o seguinte texto transcrito, corrigindo erros, "
-            "adicionando pontuação e melhorando a fluência."
-            "Mantenha o conteúdo original.\n\n"
-            f"{text}"
-        )
-        input_tokens = estimate_tokens(prompt)
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model=self.config["gpt_model"],
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
+    def _vad_config(self) -> Optional[VADConfig]:
+        """Configuração do VAD a partir do config (None se desativado)."""
+        return vad_config(self.config)
+
+    def _pipeline(self) -> TranscriptionPipeline:
+        """Pipeline com o backend, VAD e aprimoramento da configuração atual."""
+        return TranscriptionPipeline(
+            self.storage,
+            self._get_backend(),
+            self.enhancer if self.config["use_gpt_enhancement"] else None,
+            self._vad_config(),
+            stage=self.scheduler.stage,
+            on_log=self.add_log
         )
-        content = response.choices[0].message.content.strip() if response.choices[0].message.content else text
-        output_tokens = estimate_tokens(content)
-        total_tokens = input_tokens + output_tokens
-        self.add_log(f'✅ Aprimorado: ~{total_tokens} tokens', 'success')
-        return content, total_tokens, self.config["gpt_model"]
+
+    def _transcribe_chunk(self, audio) -> TranscriptResult:
+        """Envia um buffer de áudio (modo streaming) ao backend."""
+        backend = self._get_backend()
+        with self.scheduler.stage("upload"):
+            return backend.transcribe(audio)
+
+    def _get_backend(self) -> TranscriptionBackend:
+        """Aguarda o carregamento do backend e o retorna."""
+        self._backend_ready.wait()
+        if self.backend is None:
+            raise RuntimeError("Backend de transcrição indisponível")
+        return self.backend
+
+    def _enhance_transcription(self, pipeline: TranscriptionPipeline,
+                               text: str, metadata: dict,
+                               timer: Optional[StageTimer] = None) -> Optional[EnhancementResult]:
+        """Aprimora texto usando GPT-4 ou modelo configurado (com cache)."""
+        if pipeline.enhancer is None:
+            return None
+        self.update_progress(0.5, '🤖 Aprimorando com GPT-4...')
+        
+        on_delta = None
+        if self.config.get("stream_enhancement"):
+            parts = []
+            last_push = [0.0]
+            
+            def push_delta(delta: str):
+                # Junta os pedaços e manda para a UI no máximo a cada 150ms
+                parts.append(delta)
+                now = time.time()
+                if now - last_push[0] < 0.15:
+                    return
+                last_push[0] = now
+                partial = "".join(parts)
+                self.message_queue.put({
+                    'type': 'partial',
+                    'text': partial,
+                    'progress': 0.5 + 0.4 * min(1.0, len(partial) / max(1, len(text)))
+                })
+            on_delta = push_delta
+        
+        result = pipeline.enhance(text, metadata, self.config["gpt_model"], on_delta, timer)
+        if on_delta:
+            self.message_queue.put({'type': 'partial', 'text': result.text, 'progress': 0.9})
+        if result.cached:
+            self.add_log('♻️ Aprimoramento reaproveitado do cache (0 tokens)', 'success')
+        else:
+            ttft = f' | 1º token {result.first_token_seconds:.1f}s' if result.first_token_seconds else ''
+            self.add_log(f'✅ Aprimorado: {result.total_tokens} tokens em {result.total_seconds:.1f}s{ttft}', 'success')
+        return result
+
+    @property
+    def notion_sync(self):
+        """NotionSync criado sob demanda (importa notion_client/OpenAI)."""
+        if self._notion_sync is None:
+            from notion_sync import NotionSync
+            self._notion_sync = NotionSync()
+        return self._notion_sync
 
     def _sync_to_notion_threaded(self, transcription_id):
         """Sincroniza com Notion em thread, se credencial existir."""
         if os.getenv("NOTION_TOKEN"):
             def sync_job():
                 try:
-                    self.notion_sync.create_transcription_page(transcription_id)
+                    timer = StageTimer()
+                    with timer.span("notion"):
+                        self.notion_sync.create_transcription_page(transcription_id)
+                    self.storage.merge_metadata(transcription_id, {"timings": timer.as_dict()})
                     self.add_log("✅ Sincronizado com Notion", "success")
                 except Exception as e:
                     self.add_log(f"❌ Falha sync Notion: {e}", "error")
@@ -506,67 +716,45 @@ class GravadorWidget:
             ).start()
     
     def show_history(self):
-        """Mostra janela de histórico."""
+        """Mostra janela de histórico (lista virtualizada + busca em todo o histórico)."""
+        from history import history_model
+        from history_window import VirtualHistoryList
+        
         history_window = ctk.CTkToplevel(self.root)
         history_window.title("📋 Histórico de Transcrições")
-        history_window.geometry("600x400")
+        history_window.geometry("600x450")
         
         # Frame principal
         frame = ctk.CTkFrame(history_window)
         frame.pack(pady=10, padx=10, fill="both", expand=True)
         
-        # Lista de transcrições
-        history = self.storage.get_clipboard_history(20)
+        # Busca (FTS5): vazio mostra todo o histórico, mais recentes primeiro
+        search_entry = ctk.CTkEntry(frame, placeholder_text="🔍 Buscar no histórico...")
+        search_entry.pack(pady=(10, 0), padx=10, fill="x")
         
-        if not history:
-            label = ctk.CTkLabel(frame, text="Nenhuma transcrição no histórico")
-            label.pack(pady=50)
-            return
+        # Só as linhas visíveis viram widgets; o resto é lido por página ao rolar
+        history_list = VirtualHistoryList(frame, on_copy=self._copy_from_history)
+        history_list.pack(pady=10, padx=10, fill="both", expand=True)
         
-        # Scrollable frame
-        scroll_frame = ctk.CTkScrollableFrame(frame, width=550, height=300)
-        scroll_frame.pack(pady=10, padx=10, fill="both", expand=True)
+        pending_search = [None]
         
-        for transcription, copied_at in history:
-            # Frame para cada item
-            item_frame = ctk.CTkFrame(scroll_frame)
-            item_frame.pack(pady=5, padx=5, fill="x")
-            
-            # Texto preview (primeiros 100 chars)
-            text = transcription.to_clipboard_text()
-            preview = text[:100] + "..." if len(text) > 100 else text
-            
-            # Info
-            info_text = (
-                f"{copied_at} | "
-                f"{transcription.audio_duration:.1f}s | "
-                f"${transcription.cost_usd:.4f}"
+        def refresh():
+            pending_search[0] = None
+            query = search_entry.get().strip()
+            history_list.set_model(
+                history_model(self.storage, query),
+                f"Nada encontrado para \"{query}\"" if query else "Nenhuma transcrição no histórico"
             )
-            
-            info_label = ctk.CTkLabel(
-                item_frame,
-                text=info_text,
-                font=("Arial", 10),
-                anchor="w"
-            )
-            info_label.pack(pady=2, padx=10, anchor="w")
-            
-            preview_label = ctk.CTkLabel(
-                item_frame,
-                text=preview,
-                wraplength=500,
-                anchor="w"
-            )
-            preview_label.pack(pady=2, padx=10, anchor="w")
-            
-            # Botão copiar
-            copy_btn = ctk.CTkButton(
-                item_frame,
-                text="📋 Copiar",
-                width=80,
-                command=lambda tid=transcription.id: self._copy_from_history(tid) if tid else None
-            )
-            copy_btn.pack(side="right", padx=10)
+        
+        def on_key(_event=None):
+            # Espera a digitação parar antes de consultar
+            if pending_search[0]:
+                history_window.after_cancel(pending_search[0])
+            pending_search[0] = history_window.after(250, refresh)
+        
+        search_entry.bind("<KeyRelease>", on_key)
+        refresh()
+        search_entry.focus_set()
         
         # Mostra janela
         history_window.transient(self.root)
@@ -599,10 +787,14 @@ class GravadorWidget:
         self.time_label.configure(text="00:00:00")
     
     def show_notification(self, title: str, message: str):
-        """Mostra notificação do sistema no Windows via plyer."""
+        """Mostra notificação do sistema via plyer (backend nativo no Windows)."""
         try:
-            notifier = _get_notifier()       # isto é um WindowsNotification()
-            notifier.notify(                 # ou notifier._notify(...) se preferir
+            if sys.platform == "win32":
+                from plyer.platforms.win.notification import instance as _get_notifier
+                notifier = _get_notifier()   # isto é um WindowsNotification()
+            else:
+                from plyer import notification as notifier
+            notifier.notify(
                 title=title,
                 message=message,
                 app_name="Gravador de Áudio v2",
@@ -623,11 +815,16 @@ class GravadorWidget:
     def exit_app(self, icon=None, item=None):
         """Fecha aplicação."""
         self.audio_recorder._cleanup()
+        self.scheduler.shutdown()
+        # Só fecha o pool HTTP se o cliente chegou a ser carregado
+        if "openai_client" in sys.modules:
+            sys.modules["openai_client"].close_openai_client()
         self.root.after(0, self.root.quit)
-        self.tray_icon.stop()
+        if self.tray_icon:
+            self.tray_icon.stop()
 
 if __name__ == "__main__":
-    if not OPENAI_API_KEY:
+    if not OPENAI_API_KEY and DEFAULT_CONFIG["transcription_backend"] == "openai":
         print("ERRO: Configure OPENAI_API_KEY no arquivo .env")
         sys.exit(1)
         
@@ -2,7 +2,9 @@ from notion_client import Client
 from storage import TranscriptionStorage
 import os
 from datetime import datetime
-from openai import OpenAI
+from openai_client import get_openai_client
+from rate_limit import get_request_scheduler
+from enhancement import estimate_tokens
 
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 NOTION_DATABASE_ID = os.getenv("NOTION_TRANSCRIPTIONS_DB")
@@ -12,7 +14,7 @@ class NotionSync:
     def __init__(self):
         self.notion = Client(auth=NOTION_TOKEN)
         self.storage = TranscriptionStorage()
-        self.openai = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+        self.openai = get_openai_client() if OPENAI_API_KEY else None
 
     def _generate_headline(self, text: str) -> str:
         """Gera um resumo/headline curto para título de página Notion."""
@@ -24,11 +26,13 @@ class NotionSync:
             f"{text[:1800]}"
         )
         try:
-            response = self.openai.chat.completions.create(
+            response = get_request_scheduler("chat").call(
+                self.openai.chat.completions.create,
                 model="gpt-4-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.1,
-                max_tokens=60
+                max_tokens=60,
+                tokens=estimate_tokens(prompt) + 60
             )
             headline = response.choices[0].message.content.strip().replace('\n', ' ')
             if len(headline) > 120:
@@ -0,0 +1,98 @@
+"""
+Cliente OpenAI compartilhado pelo processo inteiro.
+Um único pool HTTP com keep-alive evita handshake TLS a cada chamada.
+"""
+
+import os
+import threading
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+load_dotenv()
+
+# Ajustáveis via .env
+POOL_CONFIG = {
+    "max_connections": int(os.getenv("OPENAI_POOL_SIZE", "10")),
+    "max_keepalive_connections": int(os.getenv("OPENAI_POOL_KEEPALIVE", "10")),
+    "keepalive_expiry": float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "120")),
+    "connect_timeout": float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10")),
+    # Uploads longos de áudio precisam de folga na leitura/escrita
+    "timeout": float(os.getenv("OPENAI_TIMEOUT", "300")),
+}
+
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_client_lock = threading.Lock()
+
+def _http_options(pool_config: Optional[dict] = None) -> dict:
+    config = dict(POOL_CONFIG)
+    config.update(pool_config or {})
+    return {
+        "limits": httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_keepalive_connections"],
+            keepalive_expiry=config["keepalive_expiry"],
+        ),
+        "timeout": httpx.Timeout(config["timeout"], connect=config["connect_timeout"]),
+    }
+
+def create_http_client(pool_config: Optional[dict] = None) -> httpx.Client:
+    """Cria o transporte HTTP com pool de conexões e timeouts configurados."""
+    return DefaultHttpxClient(**_http_options(pool_config))
+
+def create_async_http_client(pool_config: Optional[dict] = None) -> httpx.AsyncClient:
+    """Mesmo transporte de `create_http_client`, para o cliente assíncrono."""
+    return DefaultAsyncHttpxClient(**_http_options(pool_config))
+
+def get_openai_client() -> OpenAI:
+    """Retorna o cliente OpenAI do processo (criado na primeira chamada).
+
+    O cliente é thread-safe; todos os módulos (app, bot, Notion, backends)
+    devem usar esta instância em vez de criar `OpenAI(...)` por chamada.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    http_client=create_http_client(),
+                    # Retentativas ficam com o rate_limit.RequestScheduler
+                    max_retries=0,
+                )
+    return _client
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Cliente assíncrono do processo (bot do Telegram).
+
+    Deve ser usado sempre no mesmo event loop; as chamadas não bloqueiam
+    o loop e compartilham um pool de conexões próprio.
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncOpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    http_client=create_async_http_client(),
+                    max_retries=0,
+                )
+    return _async_client
+
+async def close_async_openai_client():
+    """Fecha o pool do cliente assíncrono (no mesmo loop em que foi usado)."""
+    global _async_client
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.close()
+
+def close_openai_client():
+    """Fecha o pool de conexões (ao encerrar o processo)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,173 @@
+"""
+Pipeline de processamento sem interface gráfica.
+Corte de silêncio → transcrição → aprimoramento → salvamento, usado pelo
+app desktop e pela importação em lote.
+"""
+
+import os
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional, Tuple
+
+import soundfile as sf
+
+from enhancement import EnhancementResult, Enhancer
+from storage import Transcription, TranscriptionStorage
+from timing import StageTimer
+from transcription import TranscriptionBackend
+from vad import VADConfig, trim_file
+
+LogCallback = Callable[[str, str], None]
+
+class TranscriptionPipeline:
+    """Etapas do processamento de um áudio, independentes da UI.
+
+    `stage` recebe o nome da etapa ('upload', 'enhancement') e devolve um
+    context manager (ex: `JobScheduler.stage`) para limitar concorrência.
+    `on_log(mensagem, nível)` recebe os avisos de cada etapa. Com um
+    `StageTimer`, cada etapa registra sua duração (ver timing.STAGES).
+    """
+
+    def __init__(self,
+                 storage: TranscriptionStorage,
+                 backend: TranscriptionBackend,
+                 enhancer: Optional[Enhancer] = None,
+                 vad_config: Optional[VADConfig] = None,
+                 stage: Optional[Callable[[str], object]] = None,
+                 on_log: Optional[LogCallback] = None):
+        self.storage = storage
+        self.backend = backend
+        self.enhancer = enhancer
+        self.vad_config = vad_config
+        self.stage = stage or (lambda name: nullcontext())
+        self.on_log = on_log
+
+    def transcribe(self,
+                   audio_file: str,
+                   metadata: Dict,
+                   duration: Optional[float] = None,
+                   timer: Optional[StageTimer] = None) -> Tuple[str, float]:
+        """Transcreve um arquivo (cortando silêncios se houver VAD).
+
+        Retorna (texto bruto, duração original em segundos) e preenche
+        `metadata` com durações e flag de cache.
+        """
+        timer = timer or StageTimer()
+        trimmed_file = None
+        upload_file = audio_file
+        try:
+            if self.vad_config:
+                with timer.span("encode"):
+                    trim = trim_file(audio_file, self.vad_config)
+                if trim.path is None:
+                    raise ValueError("Nenhuma fala detectada no áudio")
+                duration = trim.original_duration
+                metadata["original_duration"] = round(trim.original_duration, 2)
+                metadata["trimmed_duration"] = round(trim.trimmed_duration, 2)
+                if trim.path != audio_file:
+                    trimmed_file = upload_file = trim.path
+                    self._log(f'✂️ Silêncio removido: {trim.removed_seconds:.1f}s', 'info')
+            elif duration is None:
+                duration = sf.info(audio_file).duration
+
+            waiting_since = time.perf_counter()
+            with self.stage("upload"):
+                timer.add("queue", time.perf_counter() - waiting_since)
+                with timer.span("whisper"):
+                    result = self.backend.transcribe(upload_file)
+            if result.cached:
+                metadata["transcription_cached"] = True
+                self._log('♻️ Transcrição reaproveitada do cache', 'info')
+            return result.text, duration
+        finally:
+            if trimmed_file:
+                try: os.unlink(trimmed_file)
+                except OSError: pass
+
+    def enhance(self,
+                raw_text: str,
+                metadata: Dict,
+                model: Optional[str] = None,
+                on_delta: Optional[Callable[[str], None]] = None,
+                timer: Optional[StageTimer] = None) -> Optional[EnhancementResult]:
+        """Aprimora o texto (None se não houver enhancer) e registra tempos."""
+        if self.enhancer is None:
+            return None
+
+        timer = timer or StageTimer()
+        with self.stage("enhancement"), timer.span("gpt"):
+            enhancement = self.enhancer.enhance(raw_text, model, on_delta)
+        if enhancement.cached:
+            metadata["enhancement_cached"] = True
+        if enhancement.first_token_seconds is not None:
+            metadata["enhancement_ttft"] = round(enhancement.first_token_seconds, 3)
+        metadata["enhancement_seconds"] = round(enhancement.total_seconds, 3)
+        return enhancement
+
+    def save(self,
+             raw_text: str,
+             enhancement: Optional[EnhancementResult],
+             duration: float,
+             metadata: Dict,
+             timer: Optional[StageTimer] = None) -> Transcription:
+        """Calcula o custo real e grava. Retorna a transcrição com `id`.
+
+        Os tempos medidos até aqui vão junto no metadata; os das etapas
+        seguintes entram depois via `record_timings`.
+        """
+        timer = timer or StageTimer()
+        timings = timer.as_dict()
+        if timings:
+            metadata["timings"] = timings
+        input_tokens = enhancement.input_tokens if enhancement else 0
+        output_tokens = enhancement.output_tokens if enhancement else 0
+        gpt_model = enhancement.model if enhancement else None
+
+        # Whisper cobra só o áudio enviado
+        transcription = Transcription(
+            raw_text=raw_text,
+            enhanced_text=enhancement.text if enhancement else raw_text,
+            audio_duration=duration,
+            whisper_model=self.backend.model_name,
+            gpt_model=gpt_model,
+            tokens_used=input_tokens + output_tokens,
+            metadata=metadata or None
+        )
+        cost, _ = self.storage.calculate_cost(
+            transcription.billed_duration,
+            transcription.whisper_model,
+            gpt_model,
+            input_tokens,
+            output_tokens
+        )
+        transcription.cost_usd = cost
+        with timer.span("save"):
+            transcription.id = self.storage.save_transcription(transcription)
+        return transcription
+
+    def record_timings(self, transcription: Transcription, timer: StageTimer):
+        """Grava no metadata os tempos finais (save, clipboard, total...)."""
+        timings = timer.as_dict()
+        transcription.metadata = dict(transcription.metadata or {}, timings=timings)
+        self.storage.merge_metadata(transcription.id, {"timings": timings})
+
+    def process(self,
+                audio_file: str,
+                duration: Optional[float] = None,
+                metadata: Optional[Dict] = None,
+                model: Optional[str] = None,
+                timer: Optional[StageTimer] = None) -> Transcription:
+        """Roda todas as etapas para um arquivo e retorna o resultado salvo."""
+        timer = timer or StageTimer()
+        start = time.perf_counter()
+        metadata = dict(metadata or {})
+        raw_text, duration = self.transcribe(audio_file, metadata, duration, timer)
+        enhancement = self.enhance(raw_text, metadata, model, timer=timer)
+        transcription = self.save(raw_text, enhancement, duration, metadata, timer)
+        timer.add("total", time.perf_counter() - start)
+        self.record_timings(transcription, timer)
+        return transcription
+
+    def _log(self, message: str, level: str = 'info'):
+        if self.on_log:
+            self.on_log(message, level)
@@ -0,0 +1,255 @@
+"""
+Agendador central das chamadas à OpenAI.
+Buckets de requisições/min e tokens/min, Retry-After e backoff com jitter,
+compartilhados por app desktop, bot, Notion e importação em lote.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+T = TypeVar("T")
+
+# Limites por grupo (a OpenAI limita por modelo; áudio e chat são separados).
+# Ajustáveis via .env conforme o tier da conta.
+RATE_LIMITS = {
+    "chat": {
+        "requests_per_minute": int(os.getenv("OPENAI_CHAT_RPM", "500")),
+        "tokens_per_minute": int(os.getenv("OPENAI_CHAT_TPM", "30000")),
+    },
+    "audio": {
+        "requests_per_minute": int(os.getenv("OPENAI_AUDIO_RPM", "50")),
+        "tokens_per_minute": 0,  # Whisper é cobrado/limitado por requisição
+    },
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Bucket com reabastecimento contínuo e reservas antecipadas.
+
+    `reserve` debita na hora (o saldo pode ficar negativo) e devolve
+    quanto esperar até a reserva estar coberta; assim a ordem de chegada
+    é respeitada sem segurar o lock durante a espera.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """Debita `amount` e retorna a espera (s) até poder usá-lo."""
+        # Pedidos maiores que o bucket inteiro esperariam para sempre
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float):
+        """Devolve tokens reservados a mais (ex: estimativa acima do uso real)."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Lê Retry-After (ou retry-after-ms) da resposta de erro, se houver."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # formato de data HTTP: cai no backoff normal
+    return None
+
+def is_retryable(error: Exception) -> bool:
+    """429, 5xx, timeouts e falhas de conexão valem nova tentativa."""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+class RequestScheduler:
+    """Controla o ritmo das chamadas de um grupo de limites.
+
+    Toda chamada passa por `call`: espera vaga nos buckets (RPM e TPM),
+    executa e, em erro transitório, espera Retry-After ou backoff
+    exponencial com jitter. Um 429 pausa o grupo inteiro, não só a
+    chamada que falhou, para as outras não insistirem no mesmo limite.
+    `acall` faz o mesmo para corrotinas (bot), esperando sem bloquear o
+    event loop; as duas formas dividem os mesmos buckets.
+    """
+
+    WAIT_SAMPLES = 500
+
+    def __init__(self,
+                 requests_per_minute: int = 500,
+                 tokens_per_minute: int = 0,
+                 max_retries: int = 5,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic,
+                 async_sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        self.requests = TokenBucket(requests_per_minute, clock=clock) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._waits = deque(maxlen=self.WAIT_SAMPLES)
+        self._counters = {"requests": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    def call(self, fn: Callable[..., T], *args, tokens: int = 0, **kwargs) -> T:
+        """Executa `fn(*args, **kwargs)` respeitando limites e refazendo em erro transitório.
+
+        `tokens` é a estimativa de tokens (entrada + saída) da chamada.
+        """
+        attempt = 0
+        queued_at = self.clock()
+        while True:
+            wait = self._reserve(tokens)
+            if wait > 0:
+                self.sleep(wait)
+            self._acquired(wait > 0, attempt, queued_at)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                attempt += 1
+                self.sleep(delay)
+                continue
+            self._count("requests")
+            return result
+
+    async def acall(self, fn: Callable[..., Awaitable[T]], *args, tokens: int = 0, **kwargs) -> T:
+        """Versão assíncrona de `call` (`fn` retorna um awaitable)."""
+        attempt = 0
+        queued_at = self.clock()
+        while True:
+            wait = self._reserve(tokens)
+            if wait > 0:
+                await self.async_sleep(wait)
+            self._acquired(wait > 0, attempt, queued_at)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                attempt += 1
+                await self.async_sleep(delay)
+                continue
+            self._count("requests")
+            return result
+
+    def refund_tokens(self, amount: int):
+        """Devolve a diferença quando o uso real ficou abaixo da estimativa."""
+        if self.tokens and amount > 0:
+            self.tokens.refund(amount)
+
+    def stats(self) -> Dict:
+        """Métricas: espera na fila (média/p95/máx), retries e 429s."""
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "waiting": self._waiting,
+                "queue_wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                "queue_wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "queue_wait_max": waits[-1] if waits else 0.0,
+                "paused_seconds": max(0.0, self._paused_until - self.clock()),
+                **self._counters
+            }
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserva vaga nos dois buckets; retorna a espera (inclui pausa por 429)."""
+        wait = self.requests.reserve(1) if self.requests else 0.0
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - self.clock())
+            if wait > 0:
+                self._waiting += 1
+        return wait
+
+    def _acquired(self, waited: bool, attempt: int, queued_at: float):
+        """Fim da espera: sai da contagem de espera e registra o tempo na fila."""
+        with self._lock:
+            if waited:
+                self._waiting -= 1
+            if attempt == 0:
+                self._waits.append(self.clock() - queued_at)
+
+    def _on_error(self, error: Exception, attempt: int) -> float:
+        """Relança erros definitivos; senão contabiliza e retorna a espera até a próxima tentativa."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            self._count("failed")
+            raise error
+        delay = self._retry_delay(error, attempt)
+        with self._lock:
+            self._counters["retries"] += 1
+            if _status_code(error) == 429:
+                self._counters["rate_limited"] += 1
+                self._paused_until = max(self._paused_until, self.clock() + delay)
+        return delay
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Retry-After do servidor (+ jitter) ou backoff exponencial com jitter total."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+def get_request_scheduler(group: str = "chat") -> RequestScheduler:
+    """Agendador do processo para um grupo de limites ('chat' ou 'audio')."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(group)
+        if scheduler is None:
+            scheduler = RequestScheduler(**RATE_LIMITS[group])
+            _schedulers[group] = scheduler
+        return scheduler
+
+def rate_limit_stats() -> Dict[str, Dict]:
+    """Métricas de todos os grupos já usados no processo."""
+    with _schedulers_lock:
+        return {group: scheduler.stats() for group, scheduler in _schedulers.items()}
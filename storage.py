@@ -3,15 +3,22 @@ Módulo de persistência para histórico de transcrições.
 Sprint 1: SQLite + clipboard history
 """
 
+import asyncio
 import sqlite3
 import json
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional, Dict, Tuple
+from typing import Iterable, Iterator, List, Optional, Dict, Tuple
 from dataclasses import dataclass, asdict
 import pyperclip
 from pathlib import Path
 
+import text_codec
+from timing import percentile
+
 @dataclass
 class Transcription:
     """Representa uma transcrição completa."""
@@ -30,6 +37,26 @@ class Transcription:
         """Retorna texto para copiar ao clipboard."""
         return self.enhanced_text or self.raw_text
 
+    @property
+    def billed_duration(self) -> float:
+        """Duração efetivamente cobrada pelo Whisper.
+
+        Zero se a transcrição veio do cache; senão, a duração após o
+        corte de silêncio (quando houve).
+        """
+        if self.metadata and self.metadata.get("transcription_cached"):
+            return 0.0
+        if self.metadata and "trimmed_duration" in self.metadata:
+            return self.metadata["trimmed_duration"]
+        return self.audio_duration
+
+@dataclass
+class SearchResult:
+    """Resultado de busca: transcrição, relevância bm25 (menor = melhor) e trecho."""
+    transcription: Transcription
+    rank: float
+    snippet: str
+
 class TranscriptionStorage:
     """Gerenciador de persistência de transcrições."""
     
@@ -40,7 +67,37 @@ class TranscriptionStorage:
         "gpt-4": {"input": 0.03, "output": 0.06}
     }
     
-    def __init__(self, db_path: Optional[str] = None):
+    # Limites do cache de transcrições (por hash do áudio)
+    CACHE_MAX_ENTRIES = 5000
+    CACHE_MAX_AGE_DAYS = 180
+    
+    # Fila do bot: tentativas por job (reinícios no meio contam) e
+    # retenção dos jobs já terminados
+    BOT_JOB_MAX_ATTEMPTS = 3
+    BOT_JOBS_MAX_AGE_DAYS = 7
+    # Job em andamento sem heartbeat do dono há esse tempo (s) é de um
+    # processo que morreu e volta para a fila
+    BOT_JOB_STALE_SECONDS = 120
+    
+    # Conexões: espera por lock entre processos e cache de statements
+    BUSY_TIMEOUT_MS = 5000
+    CACHED_STATEMENTS = 256
+    
+    # Compressão dos textos em novas linhas (None, "zlib" ou "zstd") e
+    # texto aprimorado como delta do original; linhas antigas continuam legíveis
+    COMPRESSION = os.getenv("STORAGE_COMPRESSION") or None
+    TEXT_DELTA = os.getenv("STORAGE_TEXT_DELTA", "0") == "1"
+    
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 compression: Optional[str] = COMPRESSION,
+                 text_delta: bool = TEXT_DELTA):
+        if compression == "none":
+            compression = None
+        text_codec.require_codec(compression)
+        self.compression = compression
+        self.text_delta = text_delta
+        
         if db_path is None:
             # Cria diretório de dados do app
             app_dir = Path.home() / ".audio_recorder"
@@ -48,11 +105,69 @@ class TranscriptionStorage:
             db_path = str(app_dir / "transcriptions.db")
             
         self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+        self.fts_enabled = False
         self._init_db()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão persistente da thread atual (criada no primeiro uso).
+        
+        Usar como `with self._connection() as conn:` — o bloco faz commit
+        (ou rollback), mas a conexão continua aberta e reaproveita os
+        statements já preparados nas próximas chamadas.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._connections_lock:
+                # Fecha conexões de threads que já terminaram (ex: pools temporários)
+                alive = []
+                for thread, other in self._connections:
+                    if thread.is_alive():
+                        alive.append((thread, other))
+                    else:
+                        other.close()
+                alive.append((threading.current_thread(), conn))
+                self._connections = alive
+        return conn
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Abre conexão em modo WAL (leitores não bloqueiam o escritor)."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.BUSY_TIMEOUT_MS / 1000,
+            cached_statements=self.CACHED_STATEMENTS,
+            check_same_thread=False  # só para close() a partir de outra thread
+        )
+        conn.row_factory = sqlite3.Row
+        self._register_functions(conn)
+        if self.fts_enabled:
+            conn.executescript(self._fts_triggers_sql(decode=True))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}")
+        # Em WAL, NORMAL é seguro contra corrupção e evita fsync a cada commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    @staticmethod
+    def _register_functions(conn: sqlite3.Connection):
+        """Funções SQL do app (usadas pela view de texto e pelos triggers do FTS)."""
+        conn.create_function("text_decode", -1, text_codec.sql_decode, deterministic=True)
+    
+    def close(self):
+        """Fecha todas as conexões abertas por esta instância."""
+        with self._connections_lock:
+            for _, conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
         
     def _init_db(self):
         """Inicializa banco de dados."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS transcriptions (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -68,11 +183,13 @@ class TranscriptionStorage:
                 )
             """)
             
-            # Índices para busca rápida
+            # Índices para busca rápida: (created_at, id) serve a paginação
+            # por chave e cobre a contagem de posições do histórico
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_created_at 
-                ON transcriptions(created_at DESC)
+                CREATE INDEX IF NOT EXISTS idx_created_at_id
+                ON transcriptions(created_at DESC, id DESC)
             """)
+            conn.execute("DROP INDEX IF EXISTS idx_created_at")
             
             # Tabela de clipboard history
             conn.execute("""
@@ -84,8 +201,352 @@ class TranscriptionStorage:
                 )
             """)
             
+            # Cache de transcrições endereçado pelo conteúdo do áudio
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transcription_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    audio_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    language TEXT,
+                    raw_text TEXT NOT NULL,
+                    audio_bytes INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_transcription_cache_last_used
+                ON transcription_cache(last_used_at)
+            """)
+            
+            # Cache de aprimoramentos GPT (texto + modelo + prompt + temperatura)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS enhancement_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    enhanced_text TEXT NOT NULL,
+                    input_tokens INTEGER DEFAULT 0,
+                    output_tokens INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_enhancement_cache_last_used
+                ON enhancement_cache(last_used_at)
+            """)
+            
+            # Arquivos já importados em lote (retomada pelo hash do conteúdo)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS imported_files (
+                    file_hash TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    transcription_id INTEGER,
+                    imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (transcription_id) REFERENCES transcriptions(id)
+                )
+            """)
+            
+            # Contadores de acerto/erro dos caches
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    name TEXT PRIMARY KEY,
+                    hits INTEGER DEFAULT 0,
+                    misses INTEGER DEFAULT 0
+                )
+            """)
+            
+            # Fila do bot do Telegram: sobrevive a reinícios (o áudio é
+            # baixado de novo pelo file_id ao retomar)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bot_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    message_id INTEGER NOT NULL,
+                    status_message_id INTEGER,
+                    file_id TEXT NOT NULL,
+                    file_name TEXT,
+                    duration REAL DEFAULT 0,
+                    caption TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    stage TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    error TEXT,
+                    transcription_id INTEGER,
+                    created_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    FOREIGN KEY (transcription_id) REFERENCES transcriptions(id)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_bot_jobs_status
+                ON bot_jobs(status, id)
+            """)
+            
+            conn.commit()
+        
+        self._migrate()
+        self.fts_enabled = self._init_fts()
+        self._init_rollups()
+    
+    # ---------- migrações (PRAGMA user_version) ----------
+    
+    def _migration_metadata_columns(self, conn: sqlite3.Connection):
+        """Campos do metadata como colunas geradas (JSON1), com índices."""
+        for column, expression in self.METADATA_COLUMNS.items():
+            conn.execute(f"""
+                ALTER TABLE transcriptions ADD COLUMN {column}
+                GENERATED ALWAYS AS ({expression}) VIRTUAL
+            """)
+        conn.execute("CREATE INDEX idx_transcriptions_source ON transcriptions(source, created_at)")
+        conn.execute("CREATE INDEX idx_transcriptions_file_hash ON transcriptions(file_hash)")
+    
+    def _migration_fts_decoded_text(self, conn: sqlite3.Connection):
+        """Remove o FTS que lia `transcriptions` direto (textos podem estar comprimidos).
+        
+        `_init_fts` recria o índice sobre a view `transcriptions_text`.
+        """
+        conn.execute("DROP TRIGGER IF EXISTS transcriptions_fts_insert")
+        conn.execute("DROP TRIGGER IF EXISTS transcriptions_fts_delete")
+        conn.execute("DROP TRIGGER IF EXISTS transcriptions_fts_update")
+        conn.execute("DROP TABLE IF EXISTS transcriptions_fts")
+    
+    def _migration_import_claimed_at(self, conn: sqlite3.Connection):
+        """Hora da reserva de cada importação (só reservas velhas são descartadas)."""
+        conn.execute("ALTER TABLE imported_files ADD COLUMN claimed_at TIMESTAMP")
+        conn.execute("UPDATE imported_files SET claimed_at = imported_at WHERE status = 'pending'")
+    
+    def _migration_fts_plain_triggers(self, conn: sqlite3.Connection):
+        """Remove os triggers do FTS que chamavam `text_decode`.
+        
+        Com eles, qualquer INSERT fora do app (sqlite3 da linha de comando,
+        DB Browser) falhava com "no such function". `_init_fts` recria os
+        triggers sem a função; o índice continua válido.
+        """
+        conn.execute("DROP TRIGGER IF EXISTS transcriptions_fts_insert")
+        conn.execute("DROP TRIGGER IF EXISTS transcriptions_fts_delete")
+        conn.execute("DROP TRIGGER IF EXISTS transcriptions_fts_update")
+    
+    def _migration_bot_job_owner(self, conn: sqlite3.Connection):
+        """Dono e heartbeat dos jobs do bot (só jobs abandonados voltam à fila)."""
+        conn.execute("ALTER TABLE bot_jobs ADD COLUMN worker_id TEXT")
+        conn.execute("ALTER TABLE bot_jobs ADD COLUMN heartbeat_at TIMESTAMP")
+    
+    # Em ordem; o índice + 1 é a versão do esquema depois de cada uma
+    MIGRATIONS = (
+        _migration_metadata_columns,
+        _migration_fts_decoded_text,
+        _migration_import_claimed_at,
+        _migration_bot_job_owner,
+        _migration_fts_plain_triggers,
+    )
+    SCHEMA_VERSION = len(MIGRATIONS)
+    
+    # Colunas geradas a partir do metadata (consultáveis e indexáveis)
+    METADATA_COLUMNS = {
+        "source": "json_extract(metadata, '$.source')",
+        "file_hash": "json_extract(metadata, '$.file_hash')",
+        "transcription_cached": "COALESCE(json_extract(metadata, '$.transcription_cached'), 0)",
+        "total_seconds": "json_extract(metadata, '$.timings.total')",
+    }
+    
+    def _migrate(self):
+        """Aplica as migrações pendentes, cada uma na sua transação."""
+        with self._connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version > self.SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Banco na versão {version}, mais nova que a suportada ({self.SCHEMA_VERSION})"
+                )
+            
+            for number in range(version + 1, self.SCHEMA_VERSION + 1):
+                conn.execute("BEGIN IMMEDIATE")
+                # Outro processo pode ter migrado enquanto esperávamos o lock
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+                    conn.rollback()
+                    continue
+                self.MIGRATIONS[number - 1](self, conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+                conn.commit()
+    
+    # Agregados mantidos por trigger: tabela -> (colunas-chave, expressões sobre a linha)
+    ROLLUPS = {
+        "stats_global": (("id",), ("1",)),
+        "stats_daily": (("day",), ("date({row}.created_at)",)),
+        "stats_model": (("whisper_model", "gpt_model"),
+                        ("COALESCE({row}.whisper_model, '')", "COALESCE({row}.gpt_model, '')")),
+    }
+    
+    def _rollup_upsert(self, table: str, row: str, sign: int) -> str:
+        """SQL que soma (ou subtrai) a linha `row` (new/old) no agregado."""
+        keys, expressions = self.ROLLUPS[table]
+        key_values = ", ".join(expr.format(row=row) for expr in expressions)
+        return f"""
+            INSERT INTO {table} ({", ".join(keys)}, count, total_duration, total_tokens, total_cost)
+            VALUES ({key_values}, {sign},
+                    {sign} * COALESCE({row}.audio_duration, 0),
+                    {sign} * COALESCE({row}.tokens_used, 0),
+                    {sign} * COALESCE({row}.cost_usd, 0))
+            ON CONFLICT ({", ".join(keys)}) DO UPDATE SET
+                count = count + excluded.count,
+                total_duration = total_duration + excluded.total_duration,
+                total_tokens = total_tokens + excluded.total_tokens,
+                total_cost = total_cost + excluded.total_cost;
+        """
+    
+    def _init_rollups(self):
+        """Cria os agregados (global, por dia UTC, por modelo) e os triggers.
+        
+        Na primeira vez, preenche a partir do histórico existente na mesma
+        transação em que os triggers passam a valer.
+        """
+        with self._connection() as conn:
+            exists = conn.execute("""
+                SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_global'
+            """).fetchone()
+            if exists:
+                return
+            
+            conn.execute("BEGIN IMMEDIATE")
+            exists = conn.execute("""
+                SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_global'
+            """).fetchone()
+            if exists:  # outro processo criou enquanto esperávamos o lock
+                conn.rollback()
+                return
+            
+            for table, (keys, _) in self.ROLLUPS.items():
+                key_columns = ", ".join(f"{key} {'INTEGER' if key == 'id' else 'TEXT'} NOT NULL" for key in keys)
+                conn.execute(f"""
+                    CREATE TABLE {table} (
+                        {key_columns},
+                        count INTEGER NOT NULL DEFAULT 0,
+                        total_duration REAL NOT NULL DEFAULT 0,
+                        total_tokens INTEGER NOT NULL DEFAULT 0,
+                        total_cost REAL NOT NULL DEFAULT 0,
+                        PRIMARY KEY ({", ".join(keys)})
+                    )
+                """)
+            
+            add = "".join(self._rollup_upsert(table, "new", 1) for table in self.ROLLUPS)
+            subtract = "".join(self._rollup_upsert(table, "old", -1) for table in self.ROLLUPS)
+            conn.execute(f"""
+                CREATE TRIGGER stats_insert AFTER INSERT ON transcriptions BEGIN {add} END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER stats_delete AFTER DELETE ON transcriptions BEGIN {subtract} END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER stats_update
+                AFTER UPDATE OF created_at, audio_duration, whisper_model, gpt_model, tokens_used, cost_usd
+                ON transcriptions BEGIN {subtract} {add} END
+            """)
+            
+            totals = """
+                COUNT(*), COALESCE(SUM(audio_duration), 0),
+                COALESCE(SUM(tokens_used), 0), COALESCE(SUM(cost_usd), 0)
+                FROM transcriptions
+            """
+            conn.execute(f"INSERT INTO stats_global SELECT 1, {totals}")
+            conn.execute(f"INSERT INTO stats_daily SELECT date(created_at), {totals} GROUP BY 1")
+            conn.execute(f"""
+                INSERT INTO stats_model
+                SELECT COALESCE(whisper_model, ''), COALESCE(gpt_model, ''), {totals} GROUP BY 1, 2
+            """)
             conn.commit()
     
+    # Triggers do FTS: (nome, evento, linha). No UPDATE o texto antigo sai
+    # do índice (BEFORE) antes de o novo entrar; na ordem inversa o FTS5
+    # perde os termos que os dois têm em comum
+    FTS_TRIGGERS = (
+        ("insert", "AFTER INSERT", "new"),
+        ("delete", "AFTER DELETE", "old"),
+        ("update_old", "BEFORE UPDATE OF raw_text, enhanced_text", "old"),
+        ("update", "AFTER UPDATE OF raw_text, enhanced_text", "new"),
+    )
+    
+    def _fts_triggers_sql(self, decode: bool) -> str:
+        """Triggers que mantêm o FTS em dia.
+        
+        Os gravados no banco (`decode=False`) só indexam linhas de texto
+        puro e não usam funções do app, então qualquer cliente SQLite
+        consegue gravar. As linhas comprimidas/delta (BLOB) ficam com
+        triggers TEMP criados em cada conexão do app, que usam `text_decode`.
+        """
+        statements = []
+        for name, event, row in self.FTS_TRIGGERS:
+            plain = f"typeof({row}.raw_text) != 'blob' AND typeof({row}.enhanced_text) != 'blob'"
+            if decode:
+                create = f"CREATE TEMP TRIGGER IF NOT EXISTS transcriptions_fts_decode_{name}"
+                when = f"NOT ({plain})"
+                values = f"text_decode({row}.raw_text), text_decode({row}.enhanced_text, {row}.raw_text)"
+            else:
+                create = f"CREATE TRIGGER IF NOT EXISTS transcriptions_fts_{name}"
+                when = plain
+                values = f"{row}.raw_text, {row}.enhanced_text"
+            if row == "new":
+                action = f"""
+                    INSERT INTO transcriptions_fts (rowid, raw_text, enhanced_text)
+                    VALUES (new.id, {values});"""
+            else:
+                action = f"""
+                    INSERT INTO transcriptions_fts (transcriptions_fts, rowid, raw_text, enhanced_text)
+                    VALUES ('delete', old.id, {values});"""
+            statements.append(f"""
+                {create}
+                {event} ON transcriptions WHEN {when} BEGIN{action}
+                END;""")
+        return "\n".join(statements)
+    
+    def _init_fts(self) -> bool:
+        """Cria o índice FTS5 sobre a view de texto decodificado e os triggers.
+        
+        O índice tem conteúdo externo (a view `transcriptions_text`), então
+        não duplica os textos. A view usa a função SQL `text_decode`,
+        registrada em cada conexão do app; os triggers gravados no banco
+        não (ver `_fts_triggers_sql`). Fora do app, linhas de texto puro são
+        indexadas normalmente, mas alterar linhas comprimidas deixa o índice
+        desatualizado até um `rebuild` feito pelo app.
+        
+        Retorna False se o SQLite não tiver FTS5 (a busca cai para LIKE).
+        """
+        with self._connection() as conn:
+            exists = conn.execute("""
+                SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transcriptions_fts'
+            """).fetchone()
+            if not exists:
+                conn.execute("""
+                    CREATE VIEW IF NOT EXISTS transcriptions_text AS
+                    SELECT id,
+                           text_decode(raw_text) AS raw_text,
+                           text_decode(enhanced_text, raw_text) AS enhanced_text
+                    FROM transcriptions
+                """)
+                try:
+                    conn.execute("""
+                        CREATE VIRTUAL TABLE IF NOT EXISTS transcriptions_fts USING fts5(
+                            raw_text,
+                            enhanced_text,
+                            content='transcriptions_text',
+                            content_rowid='id',
+                            tokenize='unicode61 remove_diacritics 2'
+                        )
+                    """)
+                except sqlite3.OperationalError:
+                    return False
+            
+            conn.executescript(self._fts_triggers_sql(decode=False))
+            # Conexões abertas daqui em diante criam os seus em _open_connection
+            conn.executescript(self._fts_triggers_sql(decode=True))
+            if not exists:
+                # Indexa o histórico que já existia
+                conn.execute("INSERT INTO transcriptions_fts (transcriptions_fts) VALUES ('rebuild')")
+                conn.commit()
+            return True
+    
     def calculate_cost(self, 
                       audio_duration: float,
                       whisper_model: str,
@@ -112,13 +573,13 @@ class TranscriptionStorage:
     
     def save_transcription(self, transcription: Transcription) -> int:
         """Salva transcrição e retorna o ID gerado."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
 
             # 1) Calcula custo se não fornecido
             if transcription.cost_usd == 0:
                 cost, _tokens = self.calculate_cost(
-                    transcription.audio_duration,
+                    transcription.billed_duration,
                     transcription.whisper_model,
                     transcription.gpt_model,
                     transcription.tokens_used // 2,  # estimativa
@@ -133,7 +594,8 @@ class TranscriptionStorage:
                 else None
             )
 
-            # 3) Insere no banco
+            # 3) Insere no banco (textos comprimidos/delta, se configurado)
+            raw_text, enhanced_text = self._encode_texts(transcription)
             cursor.execute(
                 """
                 INSERT INTO transcriptions
@@ -143,8 +605,8 @@ class TranscriptionStorage:
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
-                    transcription.raw_text,
-                    transcription.enhanced_text,
+                    raw_text,
+                    enhanced_text,
                     transcription.audio_duration,
                     transcription.whisper_model,
                     transcription.gpt_model,
@@ -168,6 +630,26 @@ class TranscriptionStorage:
 
             return transcription_id
 
+    def _encode_texts(self, transcription: Transcription) -> Tuple:
+        """Valores gravados para raw_text/enhanced_text (ver text_codec)."""
+        raw_text = text_codec.encode(transcription.raw_text, self.compression)
+        enhanced_text = text_codec.encode(
+            transcription.enhanced_text,
+            self.compression,
+            base=transcription.raw_text if self.text_delta else None
+        )
+        return raw_text, enhanced_text
+    
+    def merge_metadata(self, transcription_id: int, patch: Dict):
+        """Mescla `patch` no metadata JSON (objetos aninhados são combinados)."""
+        with self._connection() as conn:
+            conn.execute("""
+                UPDATE transcriptions
+                SET metadata = json_patch(COALESCE(metadata, '{}'), ?)
+                WHERE id = ?
+            """, (json.dumps(patch), transcription_id))
+            conn.commit()
+
     def _add_to_clipboard_history(self, cursor, transcription_id: int):
         """Adiciona ao histórico do clipboard."""
         # só adiciona se o ID for um inteiro > 0
@@ -197,8 +679,7 @@ class TranscriptionStorage:
 
     def get_transcription(self, transcription_id: int) -> Optional[Transcription]:
         """Recupera transcrição por ID."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connection() as conn:
             cursor = conn.cursor()
             
             row = cursor.execute("""
@@ -211,22 +692,83 @@ class TranscriptionStorage:
     
     def get_recent_transcriptions(self, limit: int = 10) -> List[Transcription]:
         """Recupera transcrições recentes."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connection() as conn:
             cursor = conn.cursor()
             
             rows = cursor.execute("""
                 SELECT * FROM transcriptions
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
                 LIMIT ?
             """, (limit,)).fetchall()
             
             return [self._row_to_transcription(row) for row in rows]
     
+    def get_transcriptions_page(self,
+                                limit: int = 50,
+                                before: Optional[Tuple[str, int]] = None,
+                                after: Optional[Tuple[str, int]] = None) -> List[Transcription]:
+        """Página do histórico (mais recentes primeiro) por chave (created_at, id).
+        
+        `before`: itens mais antigos que a chave (próxima página);
+        `after`: itens mais novos que a chave (página anterior). Sem chave,
+        começa do mais recente. O custo não depende da profundidade.
+        """
+        if before and after:
+            raise ValueError("Use before ou after, não ambos")
+        
+        if after:
+            query = """
+                SELECT * FROM (
+                    SELECT * FROM transcriptions
+                    WHERE (created_at, id) > (?, ?)
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT ?
+                ) ORDER BY created_at DESC, id DESC
+            """
+            params = (*after, limit)
+        elif before:
+            query = """
+                SELECT * FROM transcriptions
+                WHERE (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """
+            params = (*before, limit)
+        else:
+            query = """
+                SELECT * FROM transcriptions
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """
+            params = (limit,)
+        
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._row_to_transcription(row) for row in rows]
+    
+    def get_history_key(self, position: int) -> Optional[Tuple[str, int]]:
+        """Chave (created_at, id) do item na posição `position` (0 = mais recente).
+        
+        Percorre só o índice (sem ler as linhas); usado para saltos da
+        barra de rolagem, depois a leitura segue por chave.
+        """
+        with self._connection() as conn:
+            row = conn.execute("""
+                SELECT created_at, id FROM transcriptions
+                ORDER BY created_at DESC, id DESC
+                LIMIT 1 OFFSET ?
+            """, (position,)).fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def count_transcriptions(self) -> int:
+        """Total de transcrições (agregado mantido por trigger)."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT count FROM stats_global WHERE id = 1").fetchone()
+        return row[0] if row else 0
+    
     def get_clipboard_history(self, limit: int = 10) -> List[Tuple[Transcription, str]]:
         """Recupera histórico do clipboard com timestamps."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connection() as conn:
             cursor = conn.cursor()
             
             rows = cursor.execute("""
@@ -253,7 +795,7 @@ class TranscriptionStorage:
             pyperclip.copy(text)
             
             # Atualiza histórico
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 self._add_to_clipboard_history(cursor, transcription_id)
                 conn.commit()
@@ -261,43 +803,554 @@ class TranscriptionStorage:
             return True
         return False
     
+    def search(self,
+               query: str,
+               limit: int = 20,
+               offset: int = 0,
+               highlight: Tuple[str, str] = ("«", "»")) -> List[SearchResult]:
+        """Busca textual no histórico, ordenada por relevância (bm25).
+        
+        Cada palavra da consulta precisa aparecer (como prefixo) no texto
+        original ou no aprimorado; acentos e maiúsculas são ignorados.
+        """
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        
+        if not self.fts_enabled:
+            return self._search_like(terms, limit, offset)
+        
+        match = " ".join(f'"{term}"*' for term in terms)
+        start, end = highlight
+        with self._connection() as conn:
+            rows = conn.execute("""
+                SELECT t.*,
+                       bm25(transcriptions_fts) AS rank,
+                       snippet(transcriptions_fts, -1, ?, ?, '…', 16) AS snippet
+                FROM transcriptions_fts
+                JOIN transcriptions t ON t.id = transcriptions_fts.rowid
+                WHERE transcriptions_fts MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            """, (start, end, match, limit, offset)).fetchall()
+        
+        return [
+            SearchResult(self._row_to_transcription(row), row["rank"], row["snippet"])
+            for row in rows
+        ]
+    
+    def _search_like(self, terms: List[str], limit: int, offset: int) -> List[SearchResult]:
+        """Busca sem FTS5: LIKE em todas as linhas, mais recentes primeiro."""
+        condition = " AND ".join(
+            "(text_decode(raw_text) LIKE ? OR "
+            "COALESCE(text_decode(enhanced_text, raw_text), '') LIKE ?)" for _ in terms
+        )
+        params = [f"%{term}%" for term in terms for _ in range(2)]
+        with self._connection() as conn:
+            rows = conn.execute(f"""
+                SELECT * FROM transcriptions WHERE {condition}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            """, params + [limit, offset]).fetchall()
+        
+        results = []
+        for row in rows:
+            transcription = self._row_to_transcription(row)
+            text = transcription.to_clipboard_text()
+            position = max(0, text.lower().find(terms[0].lower()) - 40)
+            results.append(SearchResult(transcription, 0.0, text[position:position + 120]))
+        return results
+    
+    def get_cached_transcription(self, cache_key: str) -> Optional[str]:
+        """Busca texto no cache de transcrições e contabiliza hit/miss."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            row = cursor.execute("""
+                SELECT raw_text FROM transcription_cache WHERE cache_key = ?
+            """, (cache_key,)).fetchone()
+            
+            if row:
+                cursor.execute("""
+                    UPDATE transcription_cache
+                    SET last_used_at = CURRENT_TIMESTAMP
+                    WHERE cache_key = ?
+                """, (cache_key,))
+            self._count_cache_access(cursor, "transcription", hit=row is not None)
+            conn.commit()
+            
+            return row[0] if row else None
+    
+    def cache_transcription(self,
+                            cache_key: str,
+                            audio_hash: str,
+                            model: str,
+                            language: Optional[str],
+                            raw_text: str,
+                            audio_bytes: int = 0):
+        """Guarda transcrição no cache e aplica a política de remoção."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                INSERT OR REPLACE INTO transcription_cache
+                (cache_key, audio_hash, model, language, raw_text, audio_bytes)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (cache_key, audio_hash, model, language, raw_text, audio_bytes))
+            
+            self._evict_cache(cursor, "transcription_cache")
+            conn.commit()
+    
+    def get_cached_enhancement(self, cache_key: str) -> Optional[str]:
+        """Busca texto aprimorado no cache e contabiliza hit/miss."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            row = cursor.execute("""
+                SELECT enhanced_text FROM enhancement_cache WHERE cache_key = ?
+            """, (cache_key,)).fetchone()
+            
+            if row:
+                cursor.execute("""
+                    UPDATE enhancement_cache
+                    SET last_used_at = CURRENT_TIMESTAMP
+                    WHERE cache_key = ?
+                """, (cache_key,))
+            self._count_cache_access(cursor, "enhancement", hit=row is not None)
+            conn.commit()
+            
+            return row[0] if row else None
+    
+    def cache_enhancement(self,
+                          cache_key: str,
+                          model: str,
+                          enhanced_text: str,
+                          input_tokens: int = 0,
+                          output_tokens: int = 0):
+        """Guarda aprimoramento no cache e aplica a política de remoção."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                INSERT OR REPLACE INTO enhancement_cache
+                (cache_key, model, enhanced_text, input_tokens, output_tokens)
+                VALUES (?, ?, ?, ?, ?)
+            """, (cache_key, model, enhanced_text, input_tokens, output_tokens))
+            
+            self._evict_cache(cursor, "enhancement_cache")
+            conn.commit()
+    
+    def record_cache_access(self, name: str, hit: bool):
+        """Contabiliza hit/miss de um cache externo (ex: LRU em memória)."""
+        with self._connection() as conn:
+            self._count_cache_access(conn.cursor(), name, hit)
+            conn.commit()
+    
+    def claim_imported_file(self, file_hash: str, path: str) -> bool:
+        """Reserva um arquivo para importação. False se já importado/em andamento."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR IGNORE INTO imported_files (file_hash, path, claimed_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            """, (file_hash, path))
+            conn.commit()
+            return cursor.rowcount == 1
+    
+    def complete_imported_file(self, file_hash: str, transcription_id: int):
+        """Marca a importação como concluída."""
+        with self._connection() as conn:
+            conn.execute("""
+                UPDATE imported_files
+                SET status = 'done', transcription_id = ?, imported_at = CURRENT_TIMESTAMP
+                WHERE file_hash = ?
+            """, (transcription_id, file_hash))
+            conn.commit()
+    
+    def release_imported_file(self, file_hash: str):
+        """Libera a reserva de um arquivo que falhou (tenta de novo depois)."""
+        with self._connection() as conn:
+            conn.execute("""
+                DELETE FROM imported_files WHERE file_hash = ? AND status = 'pending'
+            """, (file_hash,))
+            conn.commit()
+    
+    def reset_pending_imports(self, older_than: float) -> int:
+        """Descarta reservas deixadas por uma importação interrompida.
+        
+        Só as feitas há mais de `older_than` segundos: as recentes podem ser
+        de outra importação ainda rodando no mesmo banco.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM imported_files
+                WHERE status = 'pending' AND claimed_at < datetime('now', ?)
+            """, (f"-{older_than} seconds",))
+            conn.commit()
+            return cursor.rowcount
+    
+    def enqueue_bot_job(self,
+                        chat_id: int,
+                        user_id: int,
+                        message_id: int,
+                        file_id: str,
+                        status_message_id: Optional[int] = None,
+                        file_name: Optional[str] = None,
+                        duration: float = 0.0,
+                        caption: Optional[str] = None) -> int:
+        """Enfileira um áudio do bot; retorna o id do job."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO bot_jobs (chat_id, user_id, message_id, status_message_id,
+                                      file_id, file_name, duration, caption)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (chat_id, user_id, message_id, status_message_id,
+                  file_id, file_name, duration, caption))
+            conn.commit()
+            return cursor.lastrowid
+    
+    def claim_bot_job(self, max_per_user: int = 0, worker_id: Optional[str] = None) -> Optional[Dict]:
+        """Pega o job mais antigo da fila (atômico entre processos).
+        
+        Com `max_per_user`, pula usuários que já têm esse número de jobs
+        em andamento. O job fica em nome de `worker_id`, que deve manter o
+        heartbeat (heartbeat_bot_jobs). O dict inclui `wait_seconds`
+        (tempo na fila).
+        """
+        with self._connection() as conn:
+            row = conn.execute("""
+                UPDATE bot_jobs
+                SET status = 'running', stage = NULL, attempts = attempts + 1,
+                    started_at = strftime('%Y-%m-%d %H:%M:%f', 'now'),
+                    worker_id = ?, heartbeat_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE id = (
+                    SELECT id FROM bot_jobs
+                    WHERE status = 'queued'
+                      AND (? <= 0 OR user_id NOT IN (
+                          SELECT user_id FROM bot_jobs
+                          WHERE status = 'running'
+                          GROUP BY user_id HAVING COUNT(*) >= ?
+                      ))
+                    ORDER BY id LIMIT 1
+                )
+                RETURNING *, (julianday(started_at) - julianday(created_at)) * 86400 AS wait_seconds
+            """, (worker_id, max_per_user, max_per_user)).fetchone()
+            conn.commit()
+            return dict(row) if row else None
+    
+    def set_bot_job_stage(self, job_id: int, stage: str):
+        """Registra a etapa atual de um job em andamento (visível no /status)."""
+        with self._connection() as conn:
+            conn.execute("UPDATE bot_jobs SET stage = ? WHERE id = ?", (stage, job_id))
+            conn.commit()
+    
+    def finish_bot_job(self,
+                       job_id: int,
+                       transcription_id: Optional[int] = None,
+                       error: Optional[str] = None):
+        """Marca o job como concluído (ou falho, se houver `error`)."""
+        with self._connection() as conn:
+            conn.execute("""
+                UPDATE bot_jobs
+                SET status = ?, stage = NULL, error = ?, transcription_id = ?,
+                    finished_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE id = ?
+            """, ("failed" if error else "done", error, transcription_id, job_id))
+            conn.commit()
+    
+    def heartbeat_bot_jobs(self, worker_id: str) -> int:
+        """Renova o heartbeat dos jobs em andamento de `worker_id`."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE bot_jobs SET heartbeat_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE status = 'running' AND worker_id = ?
+            """, (worker_id,))
+            conn.commit()
+            return cursor.rowcount
+    
+    def release_bot_jobs(self, worker_id: str) -> int:
+        """Devolve à fila os jobs de `worker_id` (parada normal do bot).
+        
+        A tentativa não conta: o job não teve culpa da interrupção.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE bot_jobs
+                SET status = 'queued', stage = NULL, worker_id = NULL,
+                    attempts = MAX(attempts - 1, 0)
+                WHERE status = 'running' AND worker_id = ?
+            """, (worker_id,))
+            conn.commit()
+            return cursor.rowcount
+    
+    def requeue_bot_jobs(self) -> int:
+        """Devolve à fila os jobs abandonados por um processo que morreu.
+        
+        Só jobs sem heartbeat há mais de BOT_JOB_STALE_SECONDS: os de
+        outra instância ainda viva continuam com ela. Jobs que já esgotaram
+        BOT_JOB_MAX_ATTEMPTS viram falha (evita que um áudio que derruba o
+        processo trave a fila). Também remove jobs terminados há mais de
+        BOT_JOBS_MAX_AGE_DAYS dias.
+        """
+        stale = """
+            status = 'running'
+            AND (heartbeat_at IS NULL OR heartbeat_at < strftime('%Y-%m-%d %H:%M:%f', 'now', ?))
+        """
+        cutoff = f"-{self.BOT_JOB_STALE_SECONDS} seconds"
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE bot_jobs
+                SET status = 'failed', stage = NULL, error = 'interrompido várias vezes',
+                    finished_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE {stale} AND attempts >= ?
+            """, (cutoff, self.BOT_JOB_MAX_ATTEMPTS))
+            cursor.execute(f"""
+                UPDATE bot_jobs SET status = 'queued', stage = NULL, worker_id = NULL
+                WHERE {stale}
+            """, (cutoff,))
+            requeued = cursor.rowcount
+            cursor.execute("""
+                DELETE FROM bot_jobs
+                WHERE status IN ('done', 'failed') AND finished_at < datetime('now', ?)
+            """, (f"-{self.BOT_JOBS_MAX_AGE_DAYS} days",))
+            conn.commit()
+            return requeued
+    
+    def get_bot_job_position(self, job_id: int) -> int:
+        """Posição do job na fila (1 = próximo); 0 se não está aguardando."""
+        with self._connection() as conn:
+            return conn.execute("""
+                SELECT COUNT(*) FROM bot_jobs
+                WHERE status = 'queued' AND id <= ?
+                  AND EXISTS (SELECT 1 FROM bot_jobs WHERE id = ? AND status = 'queued')
+            """, (job_id, job_id)).fetchone()[0]
+    
+    def get_bot_queue_stats(self, user_id: Optional[int] = None) -> Dict:
+        """Profundidade e tempos de espera da fila do bot.
+        
+        `avg_wait_seconds` e os contadores de concluídos/falhos cobrem a
+        última hora. Com `user_id`, lista os jobs pendentes desse usuário.
+        """
+        with self._connection() as conn:
+            queue = conn.execute("""
+                SELECT
+                    COALESCE(SUM(status = 'queued'), 0) AS queued,
+                    COALESCE(SUM(status = 'running'), 0) AS running,
+                    COALESCE(MAX(CASE WHEN status = 'queued'
+                        THEN (julianday('now') - julianday(created_at)) * 86400 END), 0)
+                        AS oldest_wait_seconds
+                FROM bot_jobs
+                WHERE status IN ('queued', 'running')
+            """).fetchone()
+            recent = conn.execute("""
+                SELECT
+                    COALESCE(AVG((julianday(started_at) - julianday(created_at)) * 86400), 0)
+                        AS avg_wait_seconds,
+                    COALESCE(SUM(status = 'done'), 0) AS done,
+                    COALESCE(SUM(status = 'failed'), 0) AS failed
+                FROM bot_jobs
+                WHERE started_at >= strftime('%Y-%m-%d %H:%M:%f', 'now', '-1 hour')
+            """).fetchone()
+            
+            stats = {**dict(queue), **dict(recent)}
+            if user_id is not None:
+                rows = conn.execute("""
+                    SELECT j.id, j.status, j.stage,
+                           (SELECT COUNT(*) FROM bot_jobs q
+                            WHERE q.status = 'queued' AND q.id <= j.id) AS position
+                    FROM bot_jobs j
+                    WHERE j.user_id = ? AND j.status IN ('queued', 'running')
+                    ORDER BY j.id
+                """, (user_id,)).fetchall()
+                stats["user_jobs"] = [
+                    {**dict(row), "position": row["position"] if row["status"] == "queued" else 0}
+                    for row in rows
+                ]
+            return stats
+    
+    def _evict_cache(self, cursor, table: str):
+        """Remove entradas antigas e, acima do limite, as menos usadas."""
+        cursor.execute(f"""
+            DELETE FROM {table}
+            WHERE last_used_at < datetime('now', ?)
+        """, (f"-{self.CACHE_MAX_AGE_DAYS} days",))
+        
+        cursor.execute(f"""
+            DELETE FROM {table}
+            WHERE cache_key IN (
+                SELECT cache_key FROM {table}
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
+            )
+        """, (self.CACHE_MAX_ENTRIES,))
+    
+    def _count_cache_access(self, cursor, name: str, hit: bool):
+        """Incrementa contador de hit ou miss de um cache."""
+        column = "hits" if hit else "misses"
+        cursor.execute(f"""
+            INSERT INTO cache_stats (name, {column}) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET {column} = {column} + 1
+        """, (name,))
+    
     def get_statistics(self) -> Dict:
         """Retorna estatísticas de uso."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             
+            cache = {
+                name: (hits, misses)
+                for name, hits, misses in cursor.execute(
+                    "SELECT name, hits, misses FROM cache_stats"
+                )
+            }
+            transcription_cache = cache.get("transcription", (0, 0))
+            enhancement_cache = cache.get("enhancement", (0, 0))
+            
+            # Agregado mantido por trigger: leitura O(1)
             stats = cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_transcriptions,
-                    SUM(audio_duration) as total_duration,
-                    SUM(tokens_used) as total_tokens,
-                    SUM(cost_usd) as total_cost,
-                    AVG(audio_duration) as avg_duration,
-                    AVG(cost_usd) as avg_cost
-                FROM transcriptions
-            """).fetchone()
+                SELECT count, total_duration, total_tokens, total_cost
+                FROM stats_global WHERE id = 1
+            """).fetchone() or (0, 0, 0, 0)
+            count, duration, tokens, cost = stats
             
             return {
-                "total_transcriptions": stats[0] or 0,
-                "total_duration_seconds": stats[1] or 0,
-                "total_duration_minutes": (stats[1] or 0) / 60,
-                "total_tokens": stats[2] or 0,
-                "total_cost_usd": round(stats[3] or 0, 2),
-                "avg_duration_seconds": stats[4] or 0,
-                "avg_cost_usd": round(stats[5] or 0, 4)
+                "total_transcriptions": count,
+                "total_duration_seconds": duration,
+                "total_duration_minutes": duration / 60,
+                "total_tokens": tokens,
+                "total_cost_usd": round(cost, 2),
+                "avg_duration_seconds": duration / count if count else 0,
+                "avg_cost_usd": round(cost / count, 4) if count else 0,
+                "transcription_cache_hits": transcription_cache[0],
+                "transcription_cache_misses": transcription_cache[1],
+                "enhancement_cache_hits": enhancement_cache[0],
+                "enhancement_cache_misses": enhancement_cache[1]
+            }
+    
+    # Formatos de agrupamento sobre o dia (UTC) do agregado diário
+    BUCKETS = {
+        "day": "day",
+        "week": "strftime('%Y-W%W', day)",
+        "month": "substr(day, 1, 7)",
+        "year": "substr(day, 1, 4)",
+    }
+    
+    def get_usage_over_time(self,
+                            bucket: str = "day",
+                            start: Optional[str] = None,
+                            end: Optional[str] = None) -> List[Dict]:
+        """Uso e custo por período (para gráficos), a partir do agregado diário.
+        
+        `bucket`: day | week | month | year. `start`/`end` são datas
+        'AAAA-MM-DD' (UTC); o fim é exclusivo.
+        """
+        if bucket not in self.BUCKETS:
+            raise ValueError(f"Agrupamento inválido: {bucket}")
+        
+        query = f"""
+            SELECT {self.BUCKETS[bucket]} AS bucket,
+                   SUM(count), SUM(total_duration), SUM(total_tokens), SUM(total_cost)
+            FROM stats_daily
+            WHERE count > 0
+        """
+        params = []
+        if start:
+            query += " AND day >= ?"
+            params.append(start)
+        if end:
+            query += " AND day < ?"
+            params.append(end)
+        query += " GROUP BY bucket ORDER BY bucket"
+        
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {
+                "bucket": row[0],
+                "transcriptions": row[1],
+                "duration_minutes": row[2] / 60,
+                "tokens": row[3],
+                "cost_usd": round(row[4], 4),
+            }
+            for row in rows
+        ]
+    
+    def get_model_statistics(self) -> List[Dict]:
+        """Uso e custo por combinação de modelos (Whisper + GPT)."""
+        with self._connection() as conn:
+            rows = conn.execute("""
+                SELECT whisper_model, gpt_model, count, total_duration, total_tokens, total_cost
+                FROM stats_model
+                WHERE count > 0
+                ORDER BY total_cost DESC
+            """).fetchall()
+        return [
+            {
+                "whisper_model": row[0],
+                "gpt_model": row[1] or None,
+                "transcriptions": row[2],
+                "duration_minutes": row[3] / 60,
+                "tokens": row[4],
+                "cost_usd": round(row[5], 4),
             }
+            for row in rows
+        ]
+    
+    def get_latency_report(self,
+                           start: Optional[str] = None,
+                           end: Optional[str] = None) -> Dict[str, Dict]:
+        """Percentis de latência por etapa (`metadata.timings`) no período.
+
+        `start`/`end` no formato de `created_at` (ex: '2024-05-01'); o fim
+        é exclusivo. Retorna {etapa: {count, avg, p50, p95, p99}} em segundos.
+        """
+        query = """
+            SELECT j.key, j.value
+            FROM transcriptions t, json_each(t.metadata, '$.timings') j
+            WHERE t.metadata IS NOT NULL
+        """
+        params = []
+        if start:
+            query += " AND t.created_at >= ?"
+            params.append(start)
+        if end:
+            query += " AND t.created_at < ?"
+            params.append(end)
+        query += " ORDER BY j.key, j.value"
+        
+        with self._connection() as conn:
+            values: Dict[str, List[float]] = {}
+            for stage, seconds in conn.execute(query, params):
+                values.setdefault(stage, []).append(seconds)
+        
+        return {
+            stage: {
+                "count": len(samples),
+                "avg": round(sum(samples) / len(samples), 4),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "p99": percentile(samples, 99),
+            }
+            for stage, samples in values.items()
+        }
     
     def _row_to_transcription(self, row: sqlite3.Row) -> Transcription:
         """Converte linha do banco em objeto Transcription."""
         metadata = None
         if row['metadata']:
             metadata = json.loads(row['metadata'])
-            
+        
+        raw_text = text_codec.decode(row['raw_text'])
         return Transcription(
             id=row['id'],
             created_at=row['created_at'],
-            raw_text=row['raw_text'],
-            enhanced_text=row['enhanced_text'],
+            raw_text=raw_text,
+            enhanced_text=text_codec.decode(row['enhanced_text'], raw_text),
             audio_duration=row['audio_duration'],
             whisper_model=row['whisper_model'],
             gpt_model=row['gpt_model'],
@@ -306,15 +1359,144 @@ class TranscriptionStorage:
             metadata=metadata
         )
     
-    def export_to_json(self, output_path: str, limit: Optional[int] = None):
-        """Exporta transcrições para JSON."""
-        transcriptions = self.get_recent_transcriptions(limit or 1000)
+    def iter_transcriptions(self,
+                            start: Optional[str] = None,
+                            end: Optional[str] = None,
+                            whisper_model: Optional[str] = None,
+                            gpt_model: Optional[str] = None,
+                            source: Optional[str] = None,
+                            after: Optional[Tuple[str, int]] = None,
+                            batch_size: int = 500) -> Iterator[Transcription]:
+        """Percorre as transcrições (mais antigas primeiro) em lotes por chave.
         
-        data = {
-            "exported_at": datetime.now().isoformat(),
-            "statistics": self.get_statistics(),
-            "transcriptions": [asdict(t) for t in transcriptions]
-        }
+        Memória constante: cada lote é uma consulta curta por (created_at, id),
+        sem transação de leitura aberta entre lotes. `start`/`end` são datas
+        'AAAA-MM-DD' (fim exclusivo); `after` é uma chave (created_at, id)
+        a partir da qual continuar.
+        """
+        filters, params = [], []
+        if start:
+            filters.append("created_at >= ?")
+            params.append(start)
+        if end:
+            filters.append("created_at < ?")
+            params.append(end)
+        if whisper_model:
+            filters.append("whisper_model = ?")
+            params.append(whisper_model)
+        if gpt_model:
+            filters.append("gpt_model = ?")
+            params.append(gpt_model)
+        if source:
+            # Coluna gerada a partir de metadata.source
+            filters.append("source = ?")
+            params.append(source)
+        
+        key = after
+        while True:
+            conditions = list(filters)
+            batch_params = list(params)
+            if key:
+                conditions.append("(created_at, id) > (?, ?)")
+                batch_params.extend(key)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            with self._connection() as conn:
+                rows = conn.execute(f"""
+                    SELECT * FROM transcriptions {where}
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT ?
+                """, (*batch_params, batch_size)).fetchall()
+            
+            for row in rows:
+                yield self._row_to_transcription(row)
+            if len(rows) < batch_size:
+                return
+            key = (rows[-1]['created_at'], rows[-1]['id'])
+    
+    def insert_transcriptions(self,
+                              transcriptions: Iterable[Transcription],
+                              batch_size: int = 500) -> int:
+        """Insere em lote preservando id e data (restauração de backup).
+        
+        IDs já existentes são ignorados, então restaurar de novo é seguro.
+        Retorna quantas linhas foram inseridas.
+        """
+        inserted = 0
+        batch = []
         
+        def flush():
+            nonlocal inserted
+            with self._connection() as conn:
+                # rowcount soma só as linhas inseridas (ignora triggers e ids repetidos)
+                inserted += conn.executemany("""
+                    INSERT OR IGNORE INTO transcriptions
+                    (id, created_at, raw_text, enhanced_text, audio_duration,
+                     whisper_model, gpt_model, tokens_used, cost_usd, metadata)
+                    VALUES (?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch).rowcount
+                conn.commit()
+            batch.clear()
+        
+        for t in transcriptions:
+            batch.append((
+                t.id, t.created_at, *self._encode_texts(t), t.audio_duration,
+                t.whisper_model, t.gpt_model, t.tokens_used, t.cost_usd,
+                json.dumps(t.metadata) if t.metadata else None
+            ))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return inserted
+    
+    def export_to_json(self, output_path: str, limit: Optional[int] = None):
+        """Exporta transcrições para JSON, escrevendo uma a uma.
+        
+        Sem `limit` exporta tudo; com `limit`, as N mais recentes (em ordem
+        cronológica, como o resto da exportação).
+        """
+        # Chave da primeira transcrição fora das N mais recentes
+        after = self.get_history_key(limit) if limit else None
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+            f.write('{\n  "exported_at": ' + json.dumps(datetime.now().isoformat()))
+            f.write(',\n  "statistics": ' + json.dumps(self.get_statistics(), ensure_ascii=False))
+            f.write(',\n  "transcriptions": [')
+            for count, transcription in enumerate(self.iter_transcriptions(after=after)):
+                f.write(",\n    " if count else "\n    ")
+                f.write(json.dumps(asdict(transcription), ensure_ascii=False))
+            f.write("\n  ]\n}\n")
+
+class AsyncStorage:
+    """Fachada assíncrona do TranscriptionStorage (bot do Telegram).
+    
+    Cada método vira uma corrotina executada num pool pequeno de threads
+    próprio, então o event loop nunca espera o SQLite e o número de
+    conexões fica limitado ao tamanho do pool (uma por thread).
+    
+        storage = AsyncStorage(TranscriptionStorage())
+        t = await storage.get_transcription(42)
+    """
+    
+    MAX_WORKERS = 4
+    
+    def __init__(self, storage: TranscriptionStorage, max_workers: int = MAX_WORKERS):
+        self.sync = storage
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="storage")
+    
+    def __getattr__(self, name: str):
+        attribute = getattr(self.sync, name)
+        if not callable(attribute):
+            return attribute
+        
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, lambda: attribute(*args, **kwargs))
+        
+        call.__name__ = name
+        return call
+    
+    def close(self):
+        """Encerra o pool (e as conexões das threads dele)."""
+        self._executor.shutdown(wait=True)
+        self.sync.close()
+
@@ -1,11 +1,16 @@
 import asyncio
+import io
 import os
-import tempfile
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import uuid
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyParameters
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
-from openai import OpenAI
-from storage import TranscriptionStorage, Transcription
+from openai_client import close_async_openai_client
+from storage import AsyncStorage, TranscriptionStorage, Transcription
+from transcription import CachedBackend, SpooledAudio, get_backend
+from enhancement import BOT_PROMPT, Enhancer
+from long_audio import atranscribe_chunked
 from notion_sync import NotionSync
+from timing import StageTimer
 import time
 from dotenv import load_dotenv
 
@@ -15,112 +20,341 @@ load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+class JobStatusMessage:
+    """Mensagem de status de um job da fila, editada pelos ids.
+    
+    Funciona também para jobs retomados após um reinício (quando o objeto
+    Message original já não existe). Edições mais próximas que `interval`
+    são agrupadas: só o texto mais recente é enviado, ao fim do intervalo.
+    """
+    
+    def __init__(self, bot, chat_id: int, message_id: int, interval: float):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self._last_edit = 0.0
+        self._pending = None
+        self._flush_task = None
+    
+    async def edit_text(self, text: str, **kwargs):
+        wait = self._last_edit + self.interval - time.monotonic()
+        if wait > 0:
+            self._pending = (text, kwargs)
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush(wait))
+            return
+        self._last_edit = time.monotonic()
+        await self.bot.edit_message_text(
+            text, chat_id=self.chat_id, message_id=self.message_id, **kwargs
+        )
+    
+    async def _flush(self, wait: float):
+        await asyncio.sleep(wait)
+        self._flush_task = None
+        text, kwargs = self._pending
+        try:
+            await self.edit_text(text, **kwargs)
+        except Exception:
+            pass  # mesmo tratamento de _safe_edit
+    
+    async def delete(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.bot.delete_message(self.chat_id, self.message_id)
+
 class TranscriptionBot:
-    def __init__(self):
-        self.storage = TranscriptionStorage()
+    # Intervalo mínimo entre edições da mensagem de status (limite do Telegram)
+    EDIT_INTERVAL = 1.5
+    # Resultados por busca (/search)
+    SEARCH_LIMIT = 5
+    # Áudios processados ao mesmo tempo (workers da fila) e por usuário
+    MAX_CONCURRENT_JOBS = int(os.getenv("BOT_MAX_CONCURRENT_JOBS", "16"))
+    MAX_JOBS_PER_USER = int(os.getenv("BOT_MAX_JOBS_PER_USER", "2"))
+    # Workers ociosos consultam a fila nesse intervalo mesmo sem aviso
+    QUEUE_POLL_SECONDS = 5.0
+    # Heartbeat dos jobs em andamento (bem abaixo de BOT_JOB_STALE_SECONDS)
+    HEARTBEAT_SECONDS = 30.0
+    # Pausa de um worker depois de um erro inesperado (ex: banco travado)
+    WORKER_ERROR_SECONDS = 1.0
+    # Texto da mensagem de status em cada etapa do job
+    STAGE_MESSAGES = {
+        "download": "🎧 Baixando áudio...",
+        "whisper": "🎤 Transcrevendo...",
+        "gpt": "✨ Aprimorando com GPT...",
+    }
+    # Áudios até esse tamanho ficam só em memória; acima vão para um arquivo
+    # anônimo (a Bot API baixa até 20 MB, e são até MAX_CONCURRENT_JOBS por vez)
+    AUDIO_MEMORY_BYTES = int(float(os.getenv("BOT_AUDIO_MEMORY_MB", "5")) * 1024 * 1024)
+    # Acima dessa duração (s) o áudio é transcrito em pedaços paralelos
+    LONG_AUDIO_SECONDS = float(os.getenv("BOT_LONG_AUDIO_SECONDS", "180"))
+    # Limite de texto de uma mensagem (o resto vai como arquivo .txt)
+    MESSAGE_TEXT_LIMIT = 4000
+    
+    def __init__(self, token: str = TELEGRAM_TOKEN, storage=None, backend=None, enhancer=None):
+        # Tudo no event loop é assíncrono: OpenAI via AsyncOpenAI e o
+        # SQLite num pool de threads próprio (AsyncStorage)
+        sync_storage = storage or TranscriptionStorage()
+        self.storage = AsyncStorage(sync_storage)
         self.notion = NotionSync() if os.getenv("NOTION_TOKEN") else None
-        self.openai = OpenAI(api_key=OPENAI_API_KEY)
-        self.app = Application.builder().token(TELEGRAM_TOKEN).build()
+        # Mesmo backend do app desktop (TRANSCRIPTION_BACKEND no .env);
+        # carregado uma vez aqui e reutilizado em todos os áudios
+        self.backend = backend or CachedBackend(get_backend(), sync_storage)
+        self.enhancer = enhancer or Enhancer(
+            storage=sync_storage,
+            model="gpt-4-turbo",
+            prompt_template=BOT_PROMPT
+        )
+        # Sem concurrent_updates o PTB trata uma mensagem por vez
+        self.app = (
+            Application.builder()
+            .token(token)
+            .concurrent_updates(True)
+            .post_init(self._on_startup)
+            .post_stop(self._on_stop)
+            .post_shutdown(self._on_shutdown)
+            .build()
+        )
+        self.bot = self.app.bot
         self._setup_handlers()
         
-        # Cache temporário pra áudios processados
-        self.processing_cache = {}
+        # Áudios vão para a fila persistente (bot_jobs); os workers consomem.
+        # Os jobs pegos ficam em nome desta instância (outra no mesmo banco
+        # só os retoma se o heartbeat parar)
+        self.worker_id = uuid.uuid4().hex
+        self._workers = []
+        self._heartbeat = None
+        self._queue_changed = asyncio.Event()
     
     def _setup_handlers(self):
         self.app.add_handler(CommandHandler("start", self.start))
         self.app.add_handler(CommandHandler("last", self.last_transcription))
+        self.app.add_handler(CommandHandler("search", self.search))
+        self.app.add_handler(CommandHandler("status", self.queue_status))
         self.app.add_handler(MessageHandler(filters.VOICE | filters.AUDIO, self.handle_audio))
         self.app.add_handler(CallbackQueryHandler(self.button_callback))
     
+    async def _on_startup(self, app):
+        """Retoma jobs interrompidos e inicia os workers da fila."""
+        requeued = await self.storage.requeue_bot_jobs()
+        if requeued:
+            print(f"↩️ {requeued} áudio(s) retomado(s) da fila")
+        self.start_workers()
+    
+    async def _on_stop(self, app):
+        """Para os workers e devolve à fila os jobs que estavam em andamento."""
+        await self.stop_workers()
+        released = await self.storage.release_bot_jobs(self.worker_id)
+        if released:
+            print(f"↩️ {released} áudio(s) devolvido(s) à fila")
+    
+    def start_workers(self):
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"bot-worker-{i}")
+            for i in range(self.MAX_CONCURRENT_JOBS)
+        ]
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop(), name="bot-heartbeat")
+    
+    async def stop_workers(self):
+        tasks = self._workers + [self._heartbeat] if self._heartbeat else self._workers
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+    
+    async def _heartbeat_loop(self):
+        """Mantém os jobs desta instância e retoma os de instâncias mortas."""
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_SECONDS)
+            try:
+                await self.storage.heartbeat_bot_jobs(self.worker_id)
+                if await self.storage.requeue_bot_jobs():
+                    self._queue_changed.set()
+            except Exception as e:
+                print(f"⚠️ Heartbeat da fila falhou: {e}")
+    
+    async def _on_shutdown(self, app):
+        """Fecha o pool HTTP assíncrono e as conexões do SQLite."""
+        await close_async_openai_client()
+        self.storage.close()
+    
     async def start(self, update: Update, context):
         await update.message.reply_text(
             "🎙️ *Bot de Transcrições*\n\n"
             "Envie um áudio ou voice que eu transcrevo!\n\n"
             "Comandos:\n"
-            "/last - Última transcrição\n\n"
+            "/last - Última transcrição\n"
+            "/search termos - Busca no histórico\n"
+            "/status - Fila de áudios\n\n"
             "Dica: Responda 'gpt' no áudio pra aprimorar o texto",
             parse_mode='Markdown'
         )
     
     async def handle_audio(self, update: Update, context):
-        """Processa áudio recebido."""
+        """Enfileira o áudio recebido e responde na hora (os workers processam)."""
         msg = update.message
+        media = msg.voice or msg.audio
+        user_id = update.effective_user.id if update.effective_user else msg.chat_id
         
         # Feedback imediato
-        status_msg = await msg.reply_text("🎧 Baixando áudio...")
+        status_msg = await msg.reply_text("📥 Recebido, na fila...")
+        job_id = await self.storage.enqueue_bot_job(
+            chat_id=msg.chat_id,
+            user_id=user_id,
+            message_id=msg.message_id,
+            status_message_id=status_msg.message_id,
+            file_id=media.file_id,
+            file_name=getattr(media, "file_name", None),
+            duration=media.duration or 0,
+            caption=msg.caption
+        )
+        position = await self.storage.get_bot_job_position(job_id)
+        if position > 1:
+            await self._safe_edit(
+                status_msg, f"📥 Na fila: {position - 1} áudio(s) na frente"
+            )
+        self._queue_changed.set()
+    
+    async def _worker(self):
+        """Consome a fila até ser cancelado; erros não derrubam o worker."""
+        while True:
+            job = None
+            try:
+                self._queue_changed.clear()
+                job = await self.storage.claim_bot_job(self.MAX_JOBS_PER_USER, self.worker_id)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._queue_changed.wait(), self.QUEUE_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                await self._run_job(job)
+                # Pode ter liberado a vez de outro áudio do mesmo usuário
+                self._queue_changed.set()
+            except Exception as e:
+                print(f"⚠️ Worker da fila: {e}")
+                if job:
+                    # Sem isso o job ficaria "running" enquanto houver heartbeat
+                    try:
+                        await self.storage.finish_bot_job(job["id"], error=str(e) or type(e).__name__)
+                    except Exception:
+                        pass
+                await asyncio.sleep(self.WORKER_ERROR_SECONDS)
+    
+    async def _run_job(self, job):
+        """Processa um job e registra o resultado (cancelamento o deixa pendente)."""
+        status_msg = JobStatusMessage(
+            self.bot, job["chat_id"], job["status_message_id"], self.EDIT_INTERVAL
+        )
+        try:
+            tid = await self._process_job(job, status_msg)
+        except Exception as e:
+            await self.storage.finish_bot_job(job["id"], error=str(e) or type(e).__name__)
+            if getattr(e, "status_code", None) == 429:
+                # Retentativas do agendador esgotadas
+                await self._safe_edit(status_msg, "⏳ Limite da OpenAI atingido. Tente de novo em instantes.")
+            else:
+                await self._safe_edit(status_msg, f"❌ Erro: {str(e)}")
+        else:
+            await self.storage.finish_bot_job(job["id"], transcription_id=tid)
+    
+    async def _set_stage(self, job, status_msg, stage: str):
+        """Registra a etapa (para o /status) e atualiza a mensagem de status."""
+        await self.storage.set_bot_job_stage(job["id"], stage)
+        await self._safe_edit(status_msg, self.STAGE_MESSAGES[stage])
+    
+    async def _process_job(self, job, status_msg) -> int:
+        """Baixa, transcreve, aprimora, salva e responde (sem bloquear o loop)."""
+        started_at = time.perf_counter()
+        timer = StageTimer()
+        timer.add("job_queue", job["wait_seconds"] or 0.0)
         
+        # Baixa direto para a memória e entrega o buffer ao backend
+        # (sem arquivo temporário; acima do limite vira arquivo anônimo)
+        audio = SpooledAudio(job["file_name"] or "voice.ogg", self.AUDIO_MEMORY_BYTES)
         try:
-            # Baixa o arquivo
-            file_obj = await (msg.voice or msg.audio).get_file()
+            await self._set_stage(job, status_msg, "download")
+            with timer.span("download"):
+                file_obj = await self.bot.get_file(job["file_id"])
+                await file_obj.download_to_memory(audio)
+                audio.seek(0)
             
-            # Salva temporariamente
-            with tempfile.NamedTemporaryFile(suffix='.ogg', delete=False) as tmp:
-                await file_obj.download_to_drive(tmp.name)
-                audio_path = tmp.name
-            
-            # Atualiza status
-            await status_msg.edit_text("🎤 Transcrevendo...")
+            await self._set_stage(job, status_msg, "whisper")
             start_time = time.time()
             
-            # Transcreve com Whisper
-            with open(audio_path, 'rb') as audio_file:
-                response = self.openai.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="pt"
-                )
+            # Transcreve com o backend configurado; áudios longos em pedaços
+            # simultâneos, com o texto parcial aparecendo na mensagem de status
+            duration = job["duration"] or 0
+            with timer.span("whisper"):
+                if duration > self.LONG_AUDIO_SECONDS:
+                    result = await atranscribe_chunked(
+                        self.backend, audio, on_text=self._partial_text(status_msg)
+                    )
+                else:
+                    result = await self.backend.atranscribe(audio)
             
-            raw_text = response.text.strip()
-            duration = (msg.voice or msg.audio).duration or 0
+            raw_text = result.text
+            caption = job["caption"]
             
             # Verifica se deve aprimorar
             should_enhance = (
-                msg.caption and 'gpt' in msg.caption.lower() or
+                caption and 'gpt' in caption.lower() or
                 len(raw_text) > 500  # Auto-aprimora textos longos
             )
             
             enhanced_text = None
-            tokens_used = 0
+            input_tokens = output_tokens = 0
             gpt_model = None
+            metadata = {"source": "telegram"}
+            if result.cached:
+                metadata["transcription_cached"] = True
             
             if should_enhance:
-                await status_msg.edit_text("✨ Aprimorando com GPT...")
-                
-                prompt = (
-                    "Reescreva o seguinte texto transcrito, corrigindo erros, "
-                    "adicionando pontuação adequada e melhorando a fluência. "
-                    "Mantenha todo o conteúdo original:\n\n"
-                    f"{raw_text}"
-                )
+                await self._set_stage(job, status_msg, "gpt")
                 
-                gpt_response = self.openai.chat.completions.create(
-                    model="gpt-4-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.3
-                )
-                
-                enhanced_text = gpt_response.choices[0].message.content.strip()
-                tokens_used = len(prompt)//4 + len(enhanced_text)//4  # Estimativa
-                gpt_model = "gpt-4-turbo"
-            
-            # Calcula custo
-            cost, _ = self.storage.calculate_cost(
-                duration, "whisper-1", gpt_model, 
-                tokens_used//2, tokens_used//2
-            )
+                # Streaming: texto parcial aparece na mensagem de status.
+                # Reenvio do mesmo texto sai do cache (zero tokens)
+                on_delta = self._stream_to_message(status_msg, "✨ Aprimorando com GPT...\n\n")
+                with timer.span("gpt"):
+                    enhancement = await self.enhancer.aenhance(raw_text, None, on_delta)
+                enhanced_text = enhancement.text
+                input_tokens, output_tokens = enhancement.input_tokens, enhancement.output_tokens
+                gpt_model = enhancement.model
+                if enhancement.cached:
+                    metadata["enhancement_cached"] = True
+                if enhancement.first_token_seconds is not None:
+                    metadata["enhancement_ttft"] = round(enhancement.first_token_seconds, 3)
+                metadata["enhancement_seconds"] = round(enhancement.total_seconds, 3)
             
-            # Salva no banco
+            # Tempos até aqui vão junto; save e total entram após o INSERT
+            metadata["timings"] = timer.as_dict()
+            
+            # Monta transcrição (áudio repetido vem do cache, sem custo de Whisper)
             transcription = Transcription(
                 raw_text=raw_text,
                 enhanced_text=enhanced_text,
                 audio_duration=duration,
-                whisper_model="whisper-1",
+                whisper_model=result.model,
                 gpt_model=gpt_model,
-                tokens_used=tokens_used,
-                cost_usd=cost
+                tokens_used=input_tokens + output_tokens,
+                metadata=metadata or None
             )
             
-            tid = self.storage.save_transcription(transcription)
+            # Calcula custo (só aritmética: não precisa sair do loop)
+            cost, _ = self.storage.sync.calculate_cost(
+                transcription.billed_duration, result.model, gpt_model, 
+                input_tokens, output_tokens
+            )
+            transcription.cost_usd = cost
+            
+            # Salva no banco
+            with timer.span("save"):
+                tid = await self.storage.save_transcription(transcription)
+            timer.add("total", timer.get("job_queue") + time.perf_counter() - started_at)
+            await self.storage.merge_metadata(tid, {"timings": timer.as_dict()})
             
             # Sync com Notion (async)
             if self.notion:
@@ -147,24 +381,70 @@ class TranscriptionBot:
             
             # Envia transcrição
             await status_msg.delete()
-            await msg.reply_text(
+            await self.bot.send_message(
+                job["chat_id"],
                 f"{'✨ *Texto Aprimorado:*' if enhanced_text else '📝 *Transcrição:*'}\n\n"
-                f"{final_text[:4000]}\n\n"
+                f"{final_text[:self.MESSAGE_TEXT_LIMIT]}\n\n"
                 f"⏱️ {process_time:.1f}s | 💰 ${cost:.3f}",
                 parse_mode='Markdown',
-                reply_markup=reply_markup
+                reply_markup=reply_markup,
+                # Responde ao áudio original (se ainda existir)
+                reply_parameters=ReplyParameters(job["message_id"], allow_sending_without_reply=True)
             )
-            
-            # Limpa arquivo temporário
-            os.unlink(audio_path)
-            
-        except Exception as e:
-            await status_msg.edit_text(f"❌ Erro: {str(e)}")
+            if len(final_text) > self.MESSAGE_TEXT_LIMIT:
+                # Áudios longos: texto completo como arquivo
+                await self.bot.send_document(
+                    job["chat_id"],
+                    document=io.BytesIO(final_text.encode("utf-8")),
+                    filename=f"transcricao_{tid}.txt",
+                    reply_parameters=ReplyParameters(job["message_id"], allow_sending_without_reply=True)
+                )
+            return tid
+        finally:
+            # Libera o buffer (e o arquivo anônimo, se houver) também em caso de erro
+            audio.close()
+    
+    def _partial_text(self, status_msg):
+        """Callback de atranscribe_chunked: mostra o texto já costurado."""
+        async def on_text(text: str, chunks: int):
+            # Edições são agrupadas pela JobStatusMessage (EDIT_INTERVAL)
+            await self._safe_edit(
+                status_msg, f"🎤 Transcrevendo... ({chunks} pedaços prontos)\n\n{text[-3500:]} ▌"
+            )
+        return on_text
+    
+    def _stream_to_message(self, message: JobStatusMessage, header: str):
+        """Cria callback (chamado no event loop) que edita `message` com o
+        texto parcial; o JobStatusMessage agrupa as edições."""
+        preview = ""
+        edits = set()  # referência às tasks até terminarem
+        
+        def on_delta(delta: str):
+            nonlocal preview
+            # Mostra só o final do texto para caber no limite de 4096 chars
+            preview = (preview + delta)[-3500:]
+            task = asyncio.get_running_loop().create_task(
+                self._safe_edit(message, f"{header}{preview} ▌")
+            )
+            edits.add(task)
+            task.add_done_callback(edits.discard)
+        
+        return on_delta
+    
+    async def _safe_edit(self, message, text: str):
+        """Edita mensagem ignorando erros (ex: conteúdo não modificado)."""
+        try:
+            await message.edit_text(text)
+        except Exception:
+            pass
     
     async def _sync_notion_async(self, tid: int):
         """Sync com Notion em background."""
         try:
-            await asyncio.to_thread(self.notion.create_transcription_page, tid)
+            timer = StageTimer()
+            with timer.span("notion"):
+                await asyncio.to_thread(self.notion.create_transcription_page, tid)
+            await self.storage.merge_metadata(tid, {"timings": timer.as_dict()})
         except:
             pass  # Fail silently
     
@@ -175,12 +455,17 @@ class TranscriptionBot:
         action, tid = query.data.split('_')
         tid = int(tid)
         
-        t = self.storage.get_transcription(tid)
+        t = await self.storage.get_transcription(tid)
         if not t:
             await query.answer("Transcrição não encontrada", show_alert=True)
             return
         
-        if action == "raw":
+        if action == "text":
+            await query.message.reply_text(
+                f"📋 Transcrição #{t.id} ({t.created_at}):\n\n{t.to_clipboard_text()[:4000]}"
+            )
+        
+        elif action == "raw":
             await query.message.reply_text(
                 f"📝 *Original (sem correções):*\n\n{t.raw_text[:4000]}",
                 parse_mode='Markdown'
@@ -217,9 +502,58 @@ class TranscriptionBot:
             else:
                 await query.answer("Notion não configurado", show_alert=True)
     
+    async def search(self, update: Update, context):
+        """Busca no histórico: /search termos (ranking bm25, 5 melhores)."""
+        query = " ".join(context.args or []).strip()
+        if not query:
+            await update.message.reply_text("Uso: /search termos a buscar")
+            return
+        
+        results = await self.storage.search(query, self.SEARCH_LIMIT)
+        if not results:
+            await update.message.reply_text(f"🔍 Nada encontrado para \"{query}\"")
+            return
+        
+        # Texto puro: trechos do usuário podem quebrar o Markdown
+        lines = [f"🔍 Resultados para \"{query}\":\n"]
+        for result in results:
+            t = result.transcription
+            lines.append(f"#{t.id} · {t.created_at}\n{result.snippet}\n")
+        keyboard = [
+            [InlineKeyboardButton(f"📄 #{r.transcription.id}", callback_data=f"text_{r.transcription.id}")
+             for r in results]
+        ]
+        await update.message.reply_text(
+            "\n".join(lines)[:4000],
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+    
+    async def queue_status(self, update: Update, context):
+        """Fila de áudios: /status (profundidade, espera e jobs do usuário)."""
+        user_id = update.effective_user.id if update.effective_user else update.message.chat_id
+        stats = await self.storage.get_bot_queue_stats(user_id)
+        
+        lines = [
+            "📊 Fila de áudios\n",
+            f"⏳ Aguardando: {stats['queued']}",
+            f"⚙️ Processando: {stats['running']} (até {self.MAX_CONCURRENT_JOBS})",
+            f"🕐 Mais antigo na fila: {stats['oldest_wait_seconds']:.0f}s",
+            f"📈 Espera média (1h): {stats['avg_wait_seconds']:.1f}s",
+            f"✅ Concluídos (1h): {stats['done']} | ❌ Falhas: {stats['failed']}",
+        ]
+        if stats["user_jobs"]:
+            lines.append("\nSeus áudios:")
+            for job in stats["user_jobs"]:
+                if job["status"] == "queued":
+                    lines.append(f"#{job['id']}: na fila, posição {job['position']}")
+                else:
+                    stage = self.STAGE_MESSAGES.get(job["stage"], "⚙️ Processando...")
+                    lines.append(f"#{job['id']}: {stage}")
+        await update.message.reply_text("\n".join(lines))
+    
     async def last_transcription(self, update: Update, context):
         """Mostra última transcrição do banco."""
-        transcriptions = self.storage.get_recent_transcriptions(1)
+        transcriptions = await self.storage.get_recent_transcriptions(1)
         
         if not transcriptions:
             await update.message.reply_text("Nenhuma transcrição encontrada")
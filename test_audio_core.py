@@ -5,7 +5,9 @@ Rode isso ANTES de tentar a UI completa
 
 import time
 import os
-from audio_core import AudioRecorder
+import numpy as np
+from audio_core import AudioRecorder, RingBuffer, StreamingTranscriber
+from transcription import TranscriptResult
 
 def test_basic_recording():
     """Testa gravação básica sem travamentos."""
@@ -123,6 +125,78 @@ def test_long_recording():
     
     return True
 
+def test_ring_buffer():
+    """Testa buffer circular: wrap-around, overrun e high-water mark."""
+    print("\n🧪 Teste 5: Buffer circular")
+    
+    ring = RingBuffer(capacity_frames=10, channels=1)
+    block = np.arange(4, dtype=np.int16).reshape(-1, 1)
+    
+    assert ring.write(block) and ring.write(block)
+    assert ring.available == 8
+    assert ring.high_water == 8
+    
+    # Não cabe mais um bloco de 4 frames
+    assert not ring.write(block), "Deveria acusar overrun"
+    assert ring.overruns == 1
+    
+    # Consome 6 frames e escreve de novo (dá a volta no buffer)
+    ring.advance(len(ring.peek(6)))
+    assert ring.write(block)
+    
+    drained = []
+    while ring.available:
+        chunk = ring.peek()
+        drained.append(chunk.copy())
+        ring.advance(len(chunk))
+    
+    data = np.concatenate(drained).flatten().tolist()
+    assert data == [2, 3, 0, 1, 2, 3], f"Conteúdo inesperado: {data}"
+    print("✅ Buffer circular OK")
+    return True
+
+def test_streaming_chunk_error_and_discard():
+    """Erro num trecho chega no finish(); discard() não envia o que falta."""
+    print("\n🧪 Teste 6: Streaming com falha e descarte")
+    
+    def flaky(buffer):
+        if buffer.name.startswith("chunk_0001"):
+            raise ConnectionError("timeout no trecho")
+        return TranscriptResult("ok", "whisper-1")
+    
+    streamer = StreamingTranscriber(flaky, 16000)
+    for _ in range(3):
+        streamer.submit(np.zeros(1600, dtype=np.int16))
+    try:
+        streamer.finish(timeout=5)
+        raise AssertionError("Erro do trecho deveria subir no finish()")
+    except ConnectionError:
+        pass
+    
+    # Primeiro trecho "em envio"; os seguintes ficam na fila e são descartados
+    import threading
+    release = threading.Event()
+    sent = []
+    
+    def slow(buffer):
+        sent.append(buffer.name)
+        release.wait(5)
+        return TranscriptResult("ok", "whisper-1", cached=True)
+    
+    streamer = StreamingTranscriber(slow, 16000)
+    for _ in range(3):
+        streamer.submit(np.zeros(1600, dtype=np.int16))
+    while not sent:
+        time.sleep(0.01)
+    streamer.discard()
+    release.set()
+    streamer._worker.join(5)
+    assert not streamer._worker.is_alive()
+    assert sent == ["chunk_0000.wav"], f"Enviados: {sent}"
+    assert streamer.cached
+    print("✅ Streaming com falha/descarte OK")
+    return True
+
 if __name__ == "__main__":
     print("🚀 Iniciando testes do audio_core corrigido\n")
     
@@ -131,6 +205,8 @@ if __name__ == "__main__":
         test_pause_resume()
         test_multiple_sessions()
         test_long_recording()
+        test_ring_buffer()
+        test_streaming_chunk_error_and_discard()
         
         print("\n🎉 TODOS OS TESTES PASSARAM!")
         print("✅ O core está funcionando. Pode testar a UI.")
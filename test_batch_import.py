@@ -0,0 +1,112 @@
+"""
+Testes da importação em lote (backend falso, sem rede)
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio_decode import decode_to_flac
+from batch_import import find_audio_files, import_file
+from pipeline import TranscriptionPipeline
+from storage import TranscriptionStorage
+from transcription import TranscriptionBackend, TranscriptResult
+
+class FakeBackend(TranscriptionBackend):
+    """Backend de teste que devolve a duração recebida."""
+    name = "test"
+    language = "pt"
+
+    def __init__(self):
+        self.calls = 0
+
+    @property
+    def model_name(self) -> str:
+        return "whisper-1"
+
+    def transcribe(self, audio, language=None) -> TranscriptResult:
+        self.calls += 1
+        return TranscriptResult(f"{sf.info(audio).duration:.1f}s de fala", self.model_name)
+
+def _write_audio(folder: str, name: str, seconds: float = 2.0, channels: int = 2):
+    t = np.arange(int(44100 * seconds)) / 44100
+    tone = (8000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    path = os.path.join(folder, name)
+    sf.write(path, np.column_stack([tone] * channels), 44100)
+    return path
+
+def test_import_is_resumable_by_hash():
+    """Arquivo já importado (mesmo com outro nome) é pulado."""
+    folder = tempfile.mkdtemp()
+    os.makedirs(os.path.join(folder, "sub"))
+    first = _write_audio(folder, "a.wav")
+    _write_audio(os.path.join(folder, "sub"), "copia.wav")
+    with open(os.path.join(folder, "notas.txt"), "w") as f:
+        f.write("não é áudio")
+
+    files = find_audio_files([folder])
+    assert [os.path.basename(path) for path in files] == ["a.wav", "copia.wav"]
+
+    storage = TranscriptionStorage(os.path.join(folder, "test.db"))
+    backend = FakeBackend()
+    pipeline = TranscriptionPipeline(storage, backend)
+
+    results = [import_file(path, pipeline) for path in files]
+    assert [result.status for result in results] == ["imported", "skipped"]
+    assert backend.calls == 1
+
+    saved = storage.get_transcription(results[0].transcription_id)
+    assert saved.raw_text == "2.0s de fala"
+    assert saved.metadata["source_file"] == first
+    assert abs(saved.audio_duration - 2.0) < 0.01
+    assert {"encode", "whisper", "save", "total"} <= set(saved.metadata["timings"])
+
+    # Rodar de novo não reprocessa nada
+    assert import_file(first, pipeline).status == "skipped"
+
+def test_failed_import_can_be_retried():
+    """Falha libera a reserva; a próxima execução tenta de novo."""
+    folder = tempfile.mkdtemp()
+    broken = os.path.join(folder, "quebrado.wav")
+    with open(broken, "wb") as f:
+        f.write(b"isto nao e um wav")
+
+    storage = TranscriptionStorage(os.path.join(folder, "test.db"))
+    pipeline = TranscriptionPipeline(storage, FakeBackend())
+
+    assert import_file(broken, pipeline).status == "failed"
+    assert import_file(broken, pipeline).status == "failed"
+
+def test_only_stale_claims_are_reset():
+    """Reserva recente pode ser de outra importação rodando: não é descartada."""
+    folder = tempfile.mkdtemp()
+    storage = TranscriptionStorage(os.path.join(folder, "test.db"))
+    assert storage.claim_imported_file("antigo", "a.wav")
+    assert storage.claim_imported_file("recente", "b.wav")
+    with storage._connection() as conn:
+        conn.execute("""
+            UPDATE imported_files SET claimed_at = datetime('now', '-2 hours')
+            WHERE file_hash = 'antigo'
+        """)
+        conn.commit()
+
+    assert storage.reset_pending_imports(older_than=3600) == 1
+    assert storage.claim_imported_file("antigo", "a.wav")
+    assert not storage.claim_imported_file("recente", "b.wav")
+
+def test_undecodable_file_leaves_no_temp_file(monkeypatch):
+    """Entrada que nem abre (ex: m4a sem ffmpeg) não deixa .flac no temporário."""
+    folder = tempfile.mkdtemp()
+    scratch = tempfile.mkdtemp()
+    monkeypatch.setattr(tempfile, "tempdir", scratch)
+    monkeypatch.setattr("audio_decode.shutil.which", lambda name: None)
+    broken = os.path.join(folder, "voz.m4a")
+    with open(broken, "wb") as f:
+        f.write(b"isto nao e um m4a")
+
+    with pytest.raises(RuntimeError):
+        decode_to_flac(broken)
+    assert os.listdir(scratch) == []
@@ -0,0 +1,156 @@
+"""
+Testes do aprimoramento GPT: cache, streaming e divisão em pedaços (sem rede)
+"""
+
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace as NS
+from storage import TranscriptionStorage
+from enhancement import Enhancer, count_tokens, merge_overlap, split_into_chunks
+
+def _storage() -> TranscriptionStorage:
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    return TranscriptionStorage(path)
+
+class FakeChatClient:
+    """Cliente de chat de teste: devolve o texto em maiúsculas."""
+    
+    def __init__(self):
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+    
+    def create(self, model, messages, temperature):
+        self.calls += 1
+        text = messages[0]["content"].rsplit("\n", 1)[-1].upper()
+        return NS(
+            choices=[NS(message=NS(content=text))],
+            usage=NS(prompt_tokens=10, completion_tokens=5)
+        )
+
+def test_enhancement_cache_records_zero_tokens():
+    """Reaprimorar o mesmo texto (mesmo com espaços diferentes) não chama a API."""
+    storage = _storage()
+    client = FakeChatClient()
+    
+    first = Enhancer(storage=storage, client=client).enhance("ola mundo")
+    again = Enhancer(storage=storage, client=client).enhance("ola   mundo ")
+    other_temp = Enhancer(storage=storage, client=client, temperature=0.9).enhance("ola mundo")
+    
+    assert client.calls == 2
+    assert first.total_tokens == 15 and not first.cached
+    assert again.cached and again.total_tokens == 0 and again.text == first.text
+    assert not other_temp.cached
+    
+    stats = storage.get_statistics()
+    assert stats["enhancement_cache_hits"] == 1
+    assert stats["enhancement_cache_misses"] == 2
+
+def test_streaming_enhancement_reports_deltas():
+    """Em streaming, o callback recebe os pedaços e o resultado traz o TTFT."""
+    from types import SimpleNamespace as NS
+    
+    class StreamingClient(FakeChatClient):
+        def create(self, model, messages, temperature, stream=False, stream_options=None):
+            self.calls += 1
+            chunks = [NS(choices=[NS(delta=NS(content=piece))], usage=None) for piece in ["Olá, ", "mundo."]]
+            chunks.append(NS(choices=[], usage=NS(prompt_tokens=7, completion_tokens=3)))
+            return iter(chunks)
+    
+    storage = _storage()
+    deltas = []
+    result = Enhancer(storage=storage, client=StreamingClient()).enhance("ola mundo", on_delta=deltas.append)
+    
+    assert deltas == ["Olá, ", "mundo."]
+    assert result.text == "Olá, mundo." and result.total_tokens == 10
+    assert result.first_token_seconds is not None
+    
+    # Hit de cache entrega o texto inteiro de uma vez
+    deltas.clear()
+    again = Enhancer(storage=storage, client=StreamingClient()).enhance("ola mundo", on_delta=deltas.append)
+    assert again.cached and deltas == ["Olá, mundo."]
+
+def test_split_into_chunks_respects_budget_and_sentences():
+    """Pedaços cabem no orçamento e não cortam frases no meio."""
+    text = ("Esta é uma frase de teste razoável. " * 40 + "\n\n") * 3
+    chunks = split_into_chunks(text, 120)
+    
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 120 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+def test_merge_overlap_removes_repeated_context():
+    """A repetição (mesmo levemente reescrita) some na junção."""
+    merged = merge_overlap("Fui ao mercado. Comprei pão e leite.",
+                           "Comprei pão e o leite. Depois voltei para casa.")
+    assert merged == "Fui ao mercado. Comprei pão e leite. Depois voltei para casa."
+    
+    # Sem repetição, só concatena
+    assert merge_overlap("Primeira parte.", "Segunda parte.") == "Primeira parte. Segunda parte."
+
+def test_chunked_enhancement_runs_in_parallel_and_sums_usage():
+    """Texto longo vira várias chamadas simultâneas, remontadas em ordem."""
+    class SlowClient(FakeChatClient):
+        def __init__(self):
+            super().__init__()
+            self.active = self.peak = 0
+            self.lock = threading.Lock()
+        
+        def create(self, model, messages, temperature):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.05)
+            with self.lock:
+                self.active -= 1
+            return super().create(model, messages, temperature)
+    
+    text = " ".join(f"Frase {i} do ditado longo." for i in range(200))
+    client = SlowClient()
+    enhancer = Enhancer(client=client, max_chunk_tokens=150, max_parallel=3)
+    result = enhancer.enhance(text)
+    
+    assert client.calls > 3
+    assert client.peak > 1, "Pedaços deveriam rodar em paralelo"
+    assert result.total_tokens == 15 * client.calls
+    # Ordem preservada e sem duplicar a sobreposição
+    numbers = [int(w) for w in result.text.replace(".", " ").split() if w.isdigit()]
+    assert numbers == list(range(200)), numbers[:20]
+
+def test_async_enhancement_shares_cache_and_runs_chunks_concurrently():
+    """aenhance usa o cliente assíncrono, o mesmo cache e pedaços simultâneos."""
+    import asyncio
+    
+    class AsyncClient:
+        def __init__(self):
+            self.calls = self.active = self.peak = 0
+            self.chat = NS(completions=NS(create=self.create))
+        
+        async def create(self, model, messages, temperature):
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(0.02)
+            self.active -= 1
+            text = messages[0]["content"].rsplit("\n", 1)[-1].upper()
+            return NS(choices=[NS(message=NS(content=text))],
+                      usage=NS(prompt_tokens=10, completion_tokens=5))
+    
+    storage = _storage()
+    client = AsyncClient()
+    enhancer = Enhancer(storage=storage, async_client=client, max_chunk_tokens=150, max_parallel=3)
+    
+    first = asyncio.run(enhancer.aenhance("ola mundo"))
+    assert first.text == "OLA MUNDO" and first.total_tokens == 15
+    # Versão síncrona (outra instância) acha o resultado no SQLite
+    assert Enhancer(storage=storage, client=FakeChatClient()).enhance("ola mundo").cached
+    
+    text = " ".join(f"Frase {i} do ditado longo." for i in range(200))
+    result = asyncio.run(enhancer.aenhance(text))
+    assert 1 < client.peak <= 3
+    numbers = [int(w) for w in result.text.replace(".", " ").split() if w.isdigit()]
+    assert numbers == list(range(200))
@@ -0,0 +1,68 @@
+"""
+Testes da exportação/restauração em streaming
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+
+from export import detect_format, export_transcriptions, import_transcriptions
+from storage import TranscriptionStorage
+
+def _storage() -> TranscriptionStorage:
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    return TranscriptionStorage(path)
+
+def _fill(storage: TranscriptionStorage):
+    with storage._connection() as conn:
+        conn.executemany("""
+            INSERT INTO transcriptions
+            (created_at, raw_text, enhanced_text, audio_duration, whisper_model, gpt_model,
+             tokens_used, cost_usd, metadata)
+            VALUES (?, ?, ?, 12.5, ?, ?, 40, 0.01, ?)
+        """, [
+            (f"2024-0{1 + i % 3}-10 10:00:00", f"texto {i}, com \"aspas\"\ne quebra",
+             "aprimorado" if i % 2 else None, "whisper-1",
+             "gpt-4-turbo" if i % 2 else None, json.dumps({"timings": {"gpt": i}}))
+            for i in range(30)
+        ])
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_restore_roundtrip(fmt):
+    """Exportar e restaurar num banco vazio reproduz as linhas; restaurar de novo não duplica."""
+    source = _storage()
+    _fill(source)
+    path = tempfile.mktemp(suffix=f".{fmt}")
+    
+    assert export_transcriptions(source, path) == 30
+    target = _storage()
+    assert import_transcriptions(target, path) == 30
+    assert import_transcriptions(target, path) == 0
+    
+    assert list(target.iter_transcriptions()) == list(source.iter_transcriptions())
+    assert target.get_statistics()["total_transcriptions"] == 30
+    assert target.search("aspas")
+
+def test_export_filters_and_batches():
+    storage = _storage()
+    _fill(storage)
+    rows = list(storage.iter_transcriptions(start="2024-02-01", end="2024-03-01",
+                                            gpt_model="gpt-4-turbo", batch_size=3))
+    assert len(rows) == 5
+    assert all(t.created_at.startswith("2024-02") and t.gpt_model for t in rows)
+    
+    # export_to_json sem limite exporta tudo; com limite, as mais recentes
+    path = tempfile.mktemp(suffix=".json")
+    storage.export_to_json(path)
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)["transcriptions"]) == 30
+    storage.export_to_json(path, limit=10)
+    with open(path, encoding="utf-8") as f:
+        exported = json.load(f)["transcriptions"]
+    assert [t["id"] for t in exported] == sorted(t.id for t in storage.get_recent_transcriptions(10))
+    
+    with pytest.raises(ValueError):
+        detect_format("historico.xlsx")
@@ -0,0 +1,45 @@
+"""
+Testes do modelo da lista de histórico (sem GUI)
+"""
+
+import os
+import tempfile
+
+from history import HistoryModel, SearchModel, history_model
+from storage import TranscriptionStorage
+
+def _storage_with(count: int) -> TranscriptionStorage:
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    storage = TranscriptionStorage(path)
+    with storage._connection() as conn:
+        conn.executemany(
+            "INSERT INTO transcriptions (created_at, raw_text) VALUES (datetime('2024-01-01', ? || ' seconds'), ?)",
+            [(i, f"item {i}") for i in range(count)]
+        )
+    return storage
+
+def test_model_loads_pages_on_demand():
+    """Saltos e rolagem nos dois sentidos devolvem as mesmas linhas da consulta direta."""
+    storage = _storage_with(230)
+    expected = [t.id for t in storage.get_recent_transcriptions(1000)]
+    model = HistoryModel(storage, page_size=20, max_pages=3)
+    
+    assert len(model) == 230
+    # Salto para o meio (barra de rolagem), depois para cima e para baixo
+    for index in [150, 139, 140, 160, 119, 229, 0, 45]:
+        assert model.row(index)[0].id == expected[index]
+    assert model.row(230) is None
+    assert len(model._pages) <= 3
+    
+    with storage._connection() as conn:
+        conn.execute("INSERT INTO transcriptions (created_at, raw_text) VALUES ('2030-01-01', 'nova')")
+    model.refresh()
+    assert len(model) == 231 and model.row(0)[0].raw_text == "nova"
+
+def test_search_model_uses_snippets():
+    storage = _storage_with(5)
+    model = history_model(storage, "item")
+    assert isinstance(model, SearchModel) and len(model) == 5
+    assert "«item»" in model.row(0)[2]
+    assert isinstance(history_model(storage, ""), HistoryModel)
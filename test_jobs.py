@@ -0,0 +1,103 @@
+"""
+Testes do agendador de jobs (sem UI)
+"""
+
+import queue
+import threading
+import time
+from jobs import JobScheduler
+
+def _wait_idle(scheduler, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        stats = scheduler.stats()
+        if not stats['queued'] and not stats['running']:
+            return
+        time.sleep(0.01)
+    raise AssertionError("Agendador não esvaziou a tempo")
+
+def test_latest_first_and_priorities():
+    """Prioridade menor roda antes; dentro dela, o mais recente primeiro."""
+    gate = threading.Event()
+    order = []
+    scheduler = JobScheduler(max_workers=1)
+    
+    scheduler.submit(gate.wait)  # ocupa o único worker
+    time.sleep(0.05)
+    scheduler.submit(order.append, "batch", priority=JobScheduler.PRIORITY_BATCH)
+    scheduler.submit(order.append, "rec1", priority=JobScheduler.PRIORITY_INTERACTIVE, latest_first=True)
+    scheduler.submit(order.append, "rec2", priority=JobScheduler.PRIORITY_INTERACTIVE, latest_first=True)
+    
+    gate.set()
+    _wait_idle(scheduler)
+    scheduler.shutdown()
+    assert order == ["rec2", "rec1", "batch"], order
+
+def test_cancel_queued_job():
+    """Job na fila pode ser cancelado e chama on_cancel."""
+    gate = threading.Event()
+    ran, cancelled = [], []
+    scheduler = JobScheduler(max_workers=1)
+    
+    scheduler.submit(gate.wait)
+    time.sleep(0.05)
+    job = scheduler.submit(ran.append, 1, on_cancel=lambda: cancelled.append(1))
+    
+    assert scheduler.cancel(job.id)
+    assert not scheduler.cancel(job.id), "Não pode cancelar duas vezes"
+    gate.set()
+    _wait_idle(scheduler)
+    scheduler.shutdown()
+    
+    assert ran == [] and cancelled == [1]
+    assert scheduler.stats()['cancelled'] == 1
+
+def test_stage_limit_and_backpressure():
+    """Etapa com limite 1 nunca roda em paralelo; fila cheia recusa jobs."""
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    scheduler = JobScheduler(max_workers=3, stage_limits={"upload": 1}, max_queued=3)
+    
+    def work():
+        with scheduler.stage("upload"):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+    
+    for _ in range(3):
+        scheduler.submit(work)
+    _wait_idle(scheduler)
+    assert peak[0] == 1, f"Etapa rodou {peak[0]} em paralelo"
+    
+    gate = threading.Event()
+    for _ in range(3):
+        scheduler.submit(gate.wait)
+    time.sleep(0.05)
+    for _ in range(3):
+        scheduler.submit(gate.wait)
+    try:
+        scheduler.submit(gate.wait)
+        raise AssertionError("Deveria recusar com fila cheia")
+    except queue.Full:
+        pass
+    gate.set()
+    _wait_idle(scheduler)
+    scheduler.shutdown()
+
+def test_job_wait():
+    """`wait` bloqueia até o job terminar ou ser cancelado."""
+    gate = threading.Event()
+    scheduler = JobScheduler(max_workers=1)
+    running = scheduler.submit(gate.wait)
+    queued = scheduler.submit(lambda: "ok")
+    
+    assert not running.wait(0.05)
+    scheduler.cancel(queued.id)
+    assert queued.wait(0) and queued.status == "cancelled"
+    
+    gate.set()
+    assert running.wait(5) and running.status == "done"
+    scheduler.shutdown()
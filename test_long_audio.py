@@ -0,0 +1,91 @@
+"""
+Testes da transcrição em pedaços paralelos (backend falso, sem rede)
+"""
+
+import asyncio
+import io
+
+import numpy as np
+import soundfile as sf
+
+from long_audio import ChunkStitcher, atranscribe_chunked
+from transcription import TranscriptionBackend, TranscriptResult
+
+SR = 8000
+
+def _dictation(words: int) -> io.BytesIO:
+    """FLAC com `words` "palavras" (0.3 s) separadas por pausas (0.2 s).
+
+    A amplitude de cada palavra é 1000 + índice, então o backend falso
+    consegue "ouvir" quais palavras cada pedaço contém.
+    """
+    parts = []
+    for i in range(words):
+        word = np.full(int(0.3 * SR), 1000 + i, dtype=np.int16)
+        word[::2] *= -1
+        parts += [word, np.zeros(int(0.2 * SR), dtype=np.int16)]
+    buffer = io.BytesIO()
+    sf.write(buffer, np.concatenate(parts), SR, format="FLAC")
+    buffer.seek(0)
+    buffer.name = "ditado.flac"
+    return buffer
+
+class ListeningBackend(TranscriptionBackend):
+    """Transcreve cada trecho com som como a palavra correspondente."""
+    name = "test"
+    language = "pt"
+
+    def __init__(self):
+        self.calls = self.active = self.peak = 0
+
+    @property
+    def model_name(self) -> str:
+        return "whisper-1"
+
+    async def atranscribe(self, audio, language=None) -> TranscriptResult:
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        samples, _ = sf.read(audio, dtype="int16")
+        sound = np.abs(samples.astype(np.int32))
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], sound > 0, [0]))) == 1)
+        return TranscriptResult(" ".join(f"w{sound[i] - 1000}" for i in edges), self.model_name)
+
+def test_long_audio_is_stitched_in_order_without_repeats():
+    """Pedaços simultâneos, texto na ordem e sobreposição removida."""
+    backend = ListeningBackend()
+    partial = []
+
+    async def on_text(text, chunks):
+        partial.append((chunks, text))
+
+    result = asyncio.run(atranscribe_chunked(
+        backend, _dictation(600), on_text=on_text, max_parallel=3, chunk_seconds=30
+    ))
+
+    assert result.text == " ".join(f"w{i}" for i in range(600))
+    assert backend.calls >= 10 and 1 < backend.peak <= 3
+    # Texto parcial só cresce, sempre como prefixo do resultado final
+    assert [chunks for chunks, _ in partial] == sorted(chunks for chunks, _ in partial)
+    assert all(result.text.startswith(text) for _, text in partial)
+
+def test_undecodable_audio_goes_whole():
+    """Formato que não dá para decodificar aqui vai inteiro ao backend."""
+    class WholeBackend(ListeningBackend):
+        async def atranscribe(self, audio, language=None):
+            self.calls += 1
+            return TranscriptResult(f"inteiro {len(audio.read())}", self.model_name)
+
+    backend = WholeBackend()
+    audio = io.BytesIO(b"nao e audio" * 100)
+    audio.name = "voz.m4a"
+    result = asyncio.run(atranscribe_chunked(backend, audio))
+    assert backend.calls == 1 and result.text == "inteiro 1100"
+
+def test_stitcher_waits_for_missing_chunks():
+    stitcher = ChunkStitcher()
+    assert not stitcher.add(1, "c d e f g")
+    assert stitcher.add(0, "a b c d e")
+    assert stitcher.text == "a b c d e f g" and stitcher.done == 2
@@ -0,0 +1,116 @@
+"""
+Testes do agendador de chamadas à OpenAI (relógio falso, sem rede)
+"""
+
+import pytest
+
+from rate_limit import RequestScheduler, TokenBucket
+
+class FakeClock:
+    """Relógio manual: `sleep` só avança o tempo."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+class APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(headers or {})
+
+def test_token_bucket_paces_requests():
+    """Com o bucket vazio, cada reserva espera 1/rate a mais."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=2, clock=clock)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits == [0, 0, 1.0, 2.0]
+
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+def test_tokens_per_minute_limit():
+    """Chamadas grandes esperam o TPM reabastecer."""
+    clock = FakeClock()
+    scheduler = RequestScheduler(1000, tokens_per_minute=600, sleep=clock.sleep, clock=clock)
+    scheduler.call(lambda: "a", tokens=600)
+    scheduler.call(lambda: "b", tokens=300)
+    assert clock.sleeps == [pytest.approx(30.0)]
+    assert scheduler.stats()["queue_wait_max"] == pytest.approx(30.0)
+
+def test_retry_after_is_honored_and_pauses_group():
+    """429 com Retry-After espera pelo menos o indicado e depois repete."""
+    clock = FakeClock()
+    scheduler = RequestScheduler(1000, sleep=clock.sleep, clock=clock, base_delay=0.5)
+    responses = [APIError(429, {"retry-after": "7"}), "ok"]
+
+    def flaky():
+        result = responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert scheduler.call(flaky) == "ok"
+    assert 7.0 <= clock.sleeps[0] <= 7.5
+    stats = scheduler.stats()
+    assert stats["rate_limited"] == 1 and stats["retries"] == 1 and stats["requests"] == 1
+
+def test_gives_up_after_max_retries_and_on_client_errors():
+    """Erros não transitórios sobem na hora; transitórios após max_retries."""
+    clock = FakeClock()
+    scheduler = RequestScheduler(1000, max_retries=2, sleep=clock.sleep, clock=clock)
+    calls = []
+
+    def always(status):
+        calls.append(status)
+        raise APIError(status)
+
+    with pytest.raises(APIError):
+        scheduler.call(always, 400)
+    assert calls == [400]
+
+    with pytest.raises(APIError):
+        scheduler.call(always, 503)
+    assert calls.count(503) == 3
+    assert scheduler.stats()["failed"] == 2
+
+def test_async_call_waits_without_blocking_and_retries():
+    """acall usa o sleep assíncrono (não o bloqueante) e segue a mesma política."""
+    import asyncio
+    
+    clock = FakeClock()
+    async_sleeps = []
+    
+    async def fake_sleep(seconds):
+        async_sleeps.append(seconds)
+        clock.now += seconds
+    
+    def blocking_sleep(seconds):
+        raise AssertionError("acall não pode bloquear o event loop")
+    
+    scheduler = RequestScheduler(60, sleep=blocking_sleep, clock=clock,
+                                 async_sleep=fake_sleep, base_delay=0.5)
+    scheduler.requests.tokens = 0  # bucket vazio: primeira chamada espera 1 s
+    responses = [APIError(503), "ok"]
+    
+    async def flaky():
+        result = responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    assert asyncio.run(scheduler.acall(flaky)) == "ok"
+    assert async_sleeps[0] == pytest.approx(1.0)
+    stats = scheduler.stats()
+    assert stats["retries"] == 1 and stats["requests"] == 1 and stats["waiting"] == 0
@@ -0,0 +1,414 @@
+"""
+Testes da persistência SQLite (banco temporário, sem rede)
+"""
+
+import io
+import os
+import tempfile
+from storage import TranscriptionStorage, Transcription
+from transcription import CachedBackend, SpooledAudio, TranscriptionBackend, TranscriptResult
+
+def _storage() -> TranscriptionStorage:
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    return TranscriptionStorage(path)
+
+class CountingBackend(TranscriptionBackend):
+    """Backend de teste que conta chamadas."""
+    name = "test"
+    language = "pt"
+    
+    def __init__(self):
+        self.calls = 0
+    
+    @property
+    def model_name(self) -> str:
+        return "whisper-1"
+    
+    def transcribe(self, audio, language=None) -> TranscriptResult:
+        self.calls += 1
+        return TranscriptResult(f"texto {len(audio.read())}", self.model_name)
+
+def test_transcription_cache_hit_is_free():
+    """Mesmo áudio não chama o backend de novo e não cobra Whisper."""
+    storage = _storage()
+    backend = CountingBackend()
+    cached = CachedBackend(backend, storage)
+    
+    first = cached.transcribe(io.BytesIO(b"audio-bytes"))
+    second = cached.transcribe(io.BytesIO(b"audio-bytes"))
+    other = cached.transcribe(io.BytesIO(b"outro audio"))
+    
+    assert backend.calls == 2
+    assert not first.cached and second.cached and not other.cached
+    assert second.text == first.text
+    
+    t = Transcription(raw_text=second.text, audio_duration=120,
+                      metadata={"transcription_cached": True})
+    assert t.billed_duration == 0
+    
+    stats = storage.get_statistics()
+    assert stats["transcription_cache_hits"] == 1
+    assert stats["transcription_cache_misses"] == 2
+
+def test_spooled_audio_uploads_from_memory():
+    """Buffer do bot: nome para a OpenAI, sem disco abaixo do limite."""
+    import httpx
+    
+    payload = b"OggS" + os.urandom(4096)
+    with SpooledAudio("voice.ogg", max_size=1024 * 1024) as audio:
+        audio.write(payload)
+        audio.seek(0)
+        assert CachedBackend(CountingBackend(), _storage()).transcribe(audio).text == "texto 4100"
+        
+        # Multipart do httpx (usado pelo SDK) mede e lê o buffer sem fileno()
+        audio.seek(0)
+        request = httpx.Request("POST", "https://api.test/upload", files={"file": audio})
+        body = request.read()
+        assert audio.in_memory
+        assert b'filename="voice.ogg"' in body and payload in body
+    
+    with SpooledAudio("audio.mp3", max_size=1024) as audio:
+        audio.write(payload)
+        assert not audio.in_memory and audio.fileno() >= 0
+        assert audio.name == "audio.mp3"
+
+def test_transcription_cache_eviction():
+    """Acima do limite, as entradas menos usadas saem."""
+    storage = _storage()
+    storage.CACHE_MAX_ENTRIES = 2
+    for i in range(3):
+        storage.cache_transcription(f"k{i}", f"h{i}", "whisper-1", "pt", f"t{i}")
+    
+    remaining = [storage.get_cached_transcription(f"k{i}") for i in range(3)]
+    assert remaining.count(None) == 1
+
+def test_trimmed_duration_drives_cost():
+    """Custo calculado no save usa a duração após o corte de silêncio."""
+    storage = _storage()
+    tid = storage.save_transcription(Transcription(
+        raw_text="oi", audio_duration=600,
+        metadata={"original_duration": 600, "trimmed_duration": 300}
+    ))
+    saved = storage.get_transcription(tid)
+    assert saved.cost_usd == round(storage.PRICING["whisper-1"] * 5, 4)
+
+def test_latency_report_percentiles():
+    """Tempos por etapa no metadata viram p50/p95/p99 no período."""
+    storage = _storage()
+    for i in range(1, 101):
+        tid = storage.save_transcription(Transcription(
+            raw_text="oi", metadata={"timings": {"whisper": i / 10}}
+        ))
+        storage.merge_metadata(tid, {"timings": {"save": 0.01}})
+    
+    saved = storage.get_transcription(tid)
+    assert saved.metadata["timings"] == {"whisper": 10.0, "save": 0.01}
+    
+    report = storage.get_latency_report()
+    assert report["whisper"]["count"] == 100
+    assert report["whisper"]["p50"] == 5.0
+    assert report["whisper"]["p95"] == 9.5
+    assert report["whisper"]["p99"] == 9.9
+    assert report["save"]["p99"] == 0.01
+    assert storage.get_latency_report(start="2999-01-01") == {}
+
+def test_connections_are_per_thread_and_wal():
+    """Cada thread reusa sua conexão; o banco fica em modo WAL."""
+    import threading
+    storage = _storage()
+    assert storage._connection() is storage._connection()
+    mode = storage._connection().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+    
+    ids, errors = [], []
+    def worker(n):
+        try:
+            for i in range(20):
+                ids.append(storage.save_transcription(Transcription(raw_text=f"{n}-{i}")))
+                storage.get_recent_transcriptions(5)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    
+    assert not errors
+    assert len(set(ids)) == 80
+    assert storage.get_statistics()["total_transcriptions"] == 80
+    storage.close()
+    assert storage.get_transcription(ids[0]).raw_text  # reabre sob demanda
+
+def test_search_ranks_and_snippets():
+    """Busca ignora acentos, usa prefixo e acompanha edições via triggers."""
+    storage = _storage()
+    ids = [storage.save_transcription(Transcription(raw_text=text, enhanced_text=enhanced))
+           for text, enhanced in [
+               ("reunião sobre orçamento", "Reunião sobre o orçamento de 2024."),
+               ("lista de compras", None),
+               ("orcamento orcamento orcamento", None),
+           ]]
+    
+    results = storage.search("orçamen")
+    assert [r.transcription.id for r in results] == [ids[2], ids[0]]
+    assert "«" in results[0].snippet
+    assert storage.search("orçamento", limit=1, offset=1)[0].transcription.id == ids[0]
+    assert storage.search("compras reunião") == []
+    assert storage.search("  --  ") == []
+    
+    # metadata não reindexa; texto sim
+    storage.merge_metadata(ids[1], {"x": 1})
+    with storage._connection() as conn:
+        conn.execute("UPDATE transcriptions SET raw_text = 'lista de presentes' WHERE id = ?", (ids[1],))
+    assert storage.search("compras") == []
+    assert storage.search("presentes")[0].transcription.id == ids[1]
+    
+    # Banco antigo sem índice: o histórico existente é indexado ao abrir
+    with storage._connection() as conn:
+        conn.execute("DROP TABLE transcriptions_fts")
+    reopened = TranscriptionStorage(storage.db_path)
+    assert len(reopened.search("orcamento")) == 2
+
+def test_rollups_match_full_aggregates():
+    """Agregados por trigger batem com COUNT/SUM, inclusive após update/delete."""
+    storage = _storage()
+    rows = [("2024-01-01 10:00:00", 60, "whisper-1", None, 0, 0.006),
+            ("2024-01-01 23:00:00", 120, "whisper-1", "gpt-4-turbo", 900, 0.03),
+            ("2024-02-10 08:00:00", 30, "faster-whisper-small", None, 0, 0.0)]
+    with storage._connection() as conn:
+        ids = [conn.execute("""
+            INSERT INTO transcriptions
+            (created_at, raw_text, audio_duration, whisper_model, gpt_model, tokens_used, cost_usd)
+            VALUES (?, 'x', ?, ?, ?, ?, ?)
+        """, row).lastrowid for row in rows]
+        conn.execute("UPDATE transcriptions SET cost_usd = 0.05 WHERE id = ?", (ids[1],))
+        conn.execute("DELETE FROM transcriptions WHERE id = ?", (ids[0],))
+    
+    stats = storage.get_statistics()
+    assert stats["total_transcriptions"] == 2
+    assert stats["total_duration_seconds"] == 150
+    assert stats["total_tokens"] == 900
+    assert abs(stats["avg_cost_usd"] - 0.025) < 1e-9
+    
+    monthly = storage.get_usage_over_time("month")
+    assert [(m["bucket"], m["transcriptions"], m["cost_usd"]) for m in monthly] == [
+        ("2024-01", 1, 0.05), ("2024-02", 1, 0.0)
+    ]
+    assert [d["bucket"] for d in storage.get_usage_over_time("day", start="2024-02-01")] == ["2024-02-10"]
+    
+    models = storage.get_model_statistics()
+    assert models[0]["whisper_model"] == "whisper-1" and models[0]["gpt_model"] == "gpt-4-turbo"
+    assert len(models) == 2
+    
+    # Banco criado antes dos agregados: preenchido a partir do histórico
+    with storage._connection() as conn:
+        conn.executescript("""
+            DROP TRIGGER stats_insert; DROP TRIGGER stats_delete; DROP TRIGGER stats_update;
+            DROP TABLE stats_global; DROP TABLE stats_daily; DROP TABLE stats_model;
+        """)
+    reopened = TranscriptionStorage(storage.db_path)
+    assert reopened.get_statistics()["total_transcriptions"] == 2
+    assert len(reopened.get_usage_over_time("year")) == 1
+
+def test_keyset_pagination_walks_whole_history():
+    """Páginas por (created_at, id) cobrem tudo, sem repetir, nos dois sentidos."""
+    storage = _storage()
+    with storage._connection() as conn:
+        conn.executemany(
+            "INSERT INTO transcriptions (created_at, raw_text) VALUES (?, ?)",
+            # Vários itens no mesmo segundo: o id desempata
+            [(f"2024-01-01 10:00:{i // 3:02d}", f"t{i}") for i in range(25)]
+        )
+    
+    seen, page = [], storage.get_transcriptions_page(10)
+    while page:
+        seen.extend(t.id for t in page)
+        last = page[-1]
+        page = storage.get_transcriptions_page(10, before=(last.created_at, last.id))
+    assert seen == [t.id for t in storage.get_recent_transcriptions(100)]
+    assert len(set(seen)) == 25
+    
+    first = storage.get_transcription(seen[10])
+    newer = storage.get_transcriptions_page(10, after=(first.created_at, first.id))
+    assert [t.id for t in newer] == seen[:10]
+    assert storage.get_history_key(10) == (first.created_at, first.id)
+    assert storage.get_history_key(25) is None
+    assert storage.count_transcriptions() == 25
+
+def test_compressed_texts_roundtrip_and_search():
+    """Textos comprimidos/delta voltam iguais; busca e snippets continuam funcionando."""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    storage = TranscriptionStorage(path, compression="zlib", text_delta=True)
+    raw = "a gente precisa revisar o orçamento do projeto antes da reunião de sexta " * 3
+    enhanced = raw.replace("a gente precisa", "Precisamos").strip() + "."
+    tid = storage.save_transcription(Transcription(
+        raw_text=raw, enhanced_text=enhanced, metadata={"source": "telegram"}
+    ))
+    
+    with storage._connection() as conn:
+        stored = conn.execute(
+            "SELECT typeof(raw_text), typeof(enhanced_text), source FROM transcriptions WHERE id = ?",
+            (tid,)
+        ).fetchone()
+    assert tuple(stored) == ("blob", "blob", "telegram")
+    
+    saved = storage.get_transcription(tid)
+    assert (saved.raw_text, saved.enhanced_text) == (raw, enhanced)
+    assert "«orçamento»" in storage.search("orcamento")[0].snippet
+    assert [t.id for t in storage.iter_transcriptions(source="telegram")] == [tid]
+    
+    # Instância sem compressão lê o mesmo banco normalmente
+    assert TranscriptionStorage(path).get_transcription(tid).enhanced_text == enhanced
+
+def test_plain_sqlite_clients_can_write():
+    """Triggers do FTS não dependem de funções do app (sqlite3 da linha de comando)."""
+    import sqlite3
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    storage = TranscriptionStorage(path, compression="zlib")
+    compressed = storage.save_transcription(Transcription(raw_text="orçamento do projeto " * 5))
+    
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO transcriptions (raw_text) VALUES ('lista de compras')")
+    conn.execute("UPDATE transcriptions SET raw_text = 'lista de presentes' WHERE id = 2")
+    conn.execute("INSERT INTO transcriptions (raw_text) VALUES ('rascunho')")
+    conn.execute("DELETE FROM transcriptions WHERE id = 3")
+    conn.commit()
+    conn.close()
+    
+    assert storage.search("compras") == [] and storage.search("rascunho") == []
+    assert storage.search("presentes")[0].transcription.id == 2
+    assert storage.search("orcamento")[0].transcription.id == compressed
+    
+    # No app, trocar texto comprimido por texto puro tira o antigo do índice
+    with storage._connection() as conn:
+        conn.execute("UPDATE transcriptions SET raw_text = 'projeto novo' WHERE id = ?", (compressed,))
+        conn.execute("INSERT INTO transcriptions_fts (transcriptions_fts, rank) VALUES ('integrity-check', 1)")
+    assert storage.search("orcamento") == []
+    assert storage.search("projeto")[0].transcription.id == compressed
+
+def test_migrates_legacy_database():
+    """Banco da versão anterior (FTS lendo a tabela direto) migra e mantém a busca."""
+    import sqlite3
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE transcriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            raw_text TEXT NOT NULL, enhanced_text TEXT, audio_duration REAL DEFAULT 0,
+            whisper_model TEXT DEFAULT 'whisper-1', gpt_model TEXT,
+            tokens_used INTEGER DEFAULT 0, cost_usd REAL DEFAULT 0, metadata TEXT
+        );
+        CREATE VIRTUAL TABLE transcriptions_fts USING fts5(
+            raw_text, enhanced_text, content='transcriptions', content_rowid='id'
+        );
+        CREATE TRIGGER transcriptions_fts_insert AFTER INSERT ON transcriptions BEGIN
+            INSERT INTO transcriptions_fts (rowid, raw_text, enhanced_text)
+            VALUES (new.id, new.raw_text, new.enhanced_text);
+        END;
+        INSERT INTO transcriptions (raw_text, metadata)
+        VALUES ('reunião de planejamento', '{"source": "import", "file_hash": "abc"}');
+    """)
+    conn.close()
+    
+    storage = TranscriptionStorage(path, compression="zlib")
+    with storage._connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == storage.SCHEMA_VERSION
+        assert conn.execute(
+            "SELECT id FROM transcriptions WHERE file_hash = 'abc'"
+        ).fetchone()[0] == 1
+    
+    storage.save_transcription(Transcription(raw_text="planejamento do trimestre " * 5))
+    assert len(storage.search("planejamento")) == 2
+    assert storage.get_statistics()["total_transcriptions"] == 2
+
+def test_async_storage_runs_off_the_event_loop():
+    """A fachada assíncrona executa no pool próprio, fora da thread do loop."""
+    import asyncio
+    import threading
+    from storage import AsyncStorage
+    
+    storage = AsyncStorage(_storage(), max_workers=2)
+    threads = set()
+    original = storage.sync.save_transcription
+    
+    def save(transcription):
+        threads.add(threading.current_thread().name)
+        return original(transcription)
+    storage.sync.save_transcription = save
+    
+    async def scenario():
+        ids = await asyncio.gather(*(
+            storage.save_transcription(Transcription(raw_text=f"texto {i}")) for i in range(10)
+        ))
+        return ids, await storage.get_recent_transcriptions(3)
+    
+    ids, recent = asyncio.run(scenario())
+    assert len(set(ids)) == 10
+    assert [t.id for t in recent] == sorted(ids, reverse=True)[:3]
+    assert threads and all(name.startswith("storage") for name in threads)
+    assert storage.db_path == storage.sync.db_path
+    storage.close()
+
+def _stop_heartbeat(storage: TranscriptionStorage):
+    """Simula o dono dos jobs em andamento parado há uma hora."""
+    with storage._connection() as conn:
+        conn.execute("""
+            UPDATE bot_jobs SET heartbeat_at = datetime('now', '-1 hour')
+            WHERE status = 'running'
+        """)
+        conn.commit()
+
+def test_bot_job_queue_survives_restart():
+    """Fila do bot: ordem, limite por usuário e retomada após reinício."""
+    storage = _storage()
+    ids = [
+        storage.enqueue_bot_job(chat_id=user, user_id=user, message_id=i, file_id=f"f{i}")
+        for i, user in enumerate([1, 1, 2])
+    ]
+    assert storage.get_bot_job_position(ids[2]) == 3
+    
+    first = storage.claim_bot_job(max_per_user=1, worker_id="a")
+    assert first["id"] == ids[0] and first["attempts"] == 1 and first["wait_seconds"] >= 0
+    # Usuário 1 está no limite: o próximo é o do usuário 2
+    assert storage.claim_bot_job(max_per_user=1, worker_id="a")["id"] == ids[2]
+    assert storage.claim_bot_job(max_per_user=1, worker_id="a") is None
+    storage.set_bot_job_stage(first["id"], "whisper")
+    
+    stats = storage.get_bot_queue_stats(user_id=1)
+    assert (stats["queued"], stats["running"]) == (1, 2)
+    assert [(j["status"], j["stage"], j["position"]) for j in stats["user_jobs"]] == [
+        ("running", "whisper", 0), ("queued", None, 1)
+    ]
+    
+    # Outra instância no mesmo banco não rouba jobs de um dono vivo...
+    storage.finish_bot_job(ids[2], transcription_id=None)
+    restarted = TranscriptionStorage(storage.db_path)
+    assert restarted.requeue_bot_jobs() == 0
+    _stop_heartbeat(storage)
+    assert storage.heartbeat_bot_jobs("a") == 1
+    assert restarted.requeue_bot_jobs() == 0
+    # ...mas retoma os de um dono que parou de dar sinal
+    _stop_heartbeat(storage)
+    assert restarted.requeue_bot_jobs() == 1
+    assert restarted.claim_bot_job(worker_id="b")["id"] == ids[0]
+    assert restarted.claim_bot_job(worker_id="b")["id"] == ids[1]
+    restarted.finish_bot_job(ids[1], error="falhou")
+    
+    # Parada normal devolve os jobs sem gastar tentativa
+    assert restarted.release_bot_jobs("a") == 0
+    assert restarted.release_bot_jobs("b") == 1
+    assert restarted.claim_bot_job(worker_id="b")["attempts"] == 2
+    
+    # Job interrompido vezes demais vira falha em vez de voltar à fila
+    for _ in range(restarted.BOT_JOB_MAX_ATTEMPTS - 2):
+        _stop_heartbeat(restarted)
+        restarted.requeue_bot_jobs()
+        restarted.claim_bot_job(worker_id="b")
+    _stop_heartbeat(restarted)
+    assert restarted.requeue_bot_jobs() == 0
+    stats = restarted.get_bot_queue_stats()
+    assert (stats["queued"], stats["running"], stats["done"], stats["failed"]) == (0, 0, 1, 2)
@@ -0,0 +1,123 @@
+"""
+Testes do bot do Telegram (sem rede: nenhuma chamada à Bot API ou à OpenAI)
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+from storage import TranscriptionStorage
+from telegram_bot import JobStatusMessage, TranscriptionBot
+from transcription import TranscriptResult
+
+def _bot(backend=None) -> TranscriptionBot:
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    return TranscriptionBot("123:test", TranscriptionStorage(path),
+                            backend=backend or object(), enhancer=object())
+
+class FakeTelegram:
+    """Só as chamadas da Bot API que um job faz; o download entrega `payload`."""
+
+    def __init__(self, payload: bytes = b""):
+        self.payload = payload
+        self.sent = []
+
+    async def get_file(self, file_id):
+        payload = self.payload
+
+        class File:
+            async def download_to_memory(self, out):
+                out.write(payload)
+        return File()
+
+    async def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        pass
+
+    async def delete_message(self, chat_id, message_id):
+        pass
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+def test_worker_survives_storage_errors():
+    """Erro do banco (ex: "database is locked") não mata o worker da fila."""
+    bot = _bot()
+    bot.MAX_CONCURRENT_JOBS = 1
+    bot.WORKER_ERROR_SECONDS = 0.01
+    processed = []
+
+    async def run():
+        claim = bot.storage.claim_bot_job
+        claims = []
+
+        async def flaky_claim(*args):
+            claims.append(args)
+            if len(claims) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            return await claim(*args)
+
+        done = asyncio.Event()
+
+        async def run_job(job):
+            processed.append(job["id"])
+            await bot.storage.finish_bot_job(job["id"])
+            done.set()
+
+        bot.storage.claim_bot_job = flaky_claim
+        bot._run_job = run_job
+        job_id = await bot.storage.enqueue_bot_job(chat_id=1, user_id=1, message_id=1, file_id="f")
+        bot.start_workers()
+        try:
+            await asyncio.wait_for(done.wait(), 5)
+        finally:
+            await bot.stop_workers()
+        return job_id
+
+    assert processed == [asyncio.run(run())]
+    bot.storage.close()
+
+def test_streamed_enhancement_edits_are_coalesced():
+    """Deltas do GPT (no event loop) viram edições agrupadas da mensagem de status."""
+    bot = _bot()
+    edits = []
+
+    class FakeBot:
+        async def edit_message_text(self, text, chat_id, message_id, **kwargs):
+            edits.append(text)
+
+    async def run():
+        status = JobStatusMessage(FakeBot(), chat_id=1, message_id=2, interval=0.05)
+        on_delta = bot._stream_to_message(status, "GPT: ")
+        for delta in ["a", "b", "c"]:
+            on_delta(delta)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert edits == ["GPT: a ▌", "GPT: abc ▌"]
+    bot.storage.close()
+
+def test_large_download_spills_to_disk():
+    """Acima de AUDIO_MEMORY_BYTES o áudio vai para arquivo anônimo (o padrão fica abaixo de 20 MB)."""
+    class SizeBackend:
+        async def atranscribe(self, audio, language=None):
+            self.in_memory = audio.in_memory
+            return TranscriptResult(f"{len(audio.read())} bytes", "whisper-1")
+
+    assert TranscriptionBot.AUDIO_MEMORY_BYTES < 20 * 1024 * 1024
+    backend = SizeBackend()
+    bot = _bot(backend)
+    size = bot.AUDIO_MEMORY_BYTES + 1
+    bot.bot = FakeTelegram(b"\0" * size)
+
+    async def run():
+        await bot.storage.enqueue_bot_job(chat_id=1, user_id=1, message_id=1,
+                                          status_message_id=2, file_id="f")
+        await bot._run_job(await bot.storage.claim_bot_job())
+
+    asyncio.run(run())
+    assert backend.in_memory is False
+    assert f"{size} bytes" in bot.bot.sent[0]
+    assert bot.storage.sync.get_bot_queue_stats()["done"] == 1
+    bot.storage.close()
@@ -0,0 +1,45 @@
+"""
+Testes da codificação compacta de textos
+"""
+
+import pytest
+
+from text_codec import DELTA, apply_delta, decode, encode, make_delta, require_codec
+
+RAW = (
+    "então eu acho que a gente precisa revisar o orçamento do projeto antes da reunião "
+    "de sexta porque os custos de infraestrutura subiram bastante no último trimestre "
+    "e o pessoal do financeiro pediu uma estimativa nova até quarta feira também "
+    "seria bom conversar com o fornecedor sobre o contrato de manutenção e ver se "
+    "dá pra renegociar o prazo de entrega dos servidores que atrasou duas semanas"
+)
+ENHANCED = (
+    "Então, acho que precisamos revisar o orçamento do projeto antes da reunião "
+    "de sexta, porque os custos de infraestrutura subiram bastante no último trimestre, "
+    "e o pessoal do financeiro pediu uma estimativa nova até quarta-feira. Também "
+    "seria bom conversar com o fornecedor sobre o contrato de manutenção e ver se "
+    "dá para renegociar o prazo de entrega dos servidores, que atrasou duas semanas."
+)
+
+def test_short_or_plain_text_stays_text():
+    assert encode("oi", "zlib") == "oi"
+    assert encode(RAW) == RAW
+    assert decode("texto antigo") == "texto antigo"
+    assert encode(None, "zlib") is None and decode(None) is None
+
+def test_zlib_roundtrip_is_smaller():
+    encoded = encode(RAW, "zlib")
+    assert isinstance(encoded, bytes) and encoded[0] == 1
+    assert len(encoded) < len(RAW.encode())
+    assert decode(encoded) == RAW
+
+def test_delta_against_raw():
+    assert apply_delta(RAW, make_delta(RAW, ENHANCED)) == ENHANCED
+    encoded = encode(ENHANCED, "zlib", base=RAW)
+    assert encoded[0] & DELTA
+    assert len(encoded) < len(encode(ENHANCED, "zlib"))
+    assert decode(encoded, RAW) == ENHANCED
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        require_codec("lzma")
@@ -0,0 +1,105 @@
+"""
+Testes do VAD (não precisam de microfone)
+"""
+
+import numpy as np
+import soundfile as sf
+import tempfile
+import os
+from vad import VADConfig, speech_mask, speech_segments, split_with_overlap, trim_silence, trim_file
+
+SR = 16000
+
+def _speech(seconds: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 3000, int(seconds * SR)).astype(np.int16)
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SR), dtype=np.int16)
+
+def test_long_silence_is_shortened():
+    """Pausas longas viram só o padding; pausas curtas ficam inteiras."""
+    config = VADConfig(padding_ms=300, min_silence_ms=600)
+    audio = np.concatenate([
+        _silence(2), _speech(1), _silence(0.3), _speech(1), _silence(5), _speech(1), _silence(2)
+    ])
+    
+    segments = speech_segments(audio, SR, config)
+    assert len(segments) == 2, f"Esperava 2 trechos, veio {segments}"
+    
+    trimmed = trim_silence(audio, SR, config)
+    seconds = len(trimmed) / SR
+    # 3s de fala + 0.3s de pausa curta + padding (2 trechos x 2 lados x 0.3s)
+    assert 3.3 < seconds < 4.8, f"Duração inesperada: {seconds:.2f}s"
+
+def test_short_clip_keeps_mask_length_and_padding():
+    """Clipe menor que a janela de padding: uma entrada por frame, padding antes da fala."""
+    config = VADConfig(frame_ms=30, padding_ms=300)
+    audio = np.concatenate([_silence(0.3), _speech(0.15)])  # 15 frames
+    
+    mask = speech_mask(audio, SR, config)
+    assert len(mask) == len(audio) // int(SR * 0.03)
+    # Fala começa no frame 10; 10 frames de padding alcançam o início
+    assert mask.all(), mask.astype(int).tolist()
+
+def test_silence_only():
+    """Áudio sem fala resulta em vazio."""
+    assert len(trim_silence(_silence(3), SR)) == 0
+
+def test_trim_file_reports_durations():
+    """trim_file grava novo arquivo e devolve as duas durações."""
+    audio = np.concatenate([_silence(3), _speech(2), _silence(3)])
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
+        path = tmp.name
+    sf.write(path, audio, SR, subtype='PCM_16')
+    
+    result = trim_file(path)
+    try:
+        assert result.path and result.path != path
+        assert abs(result.original_duration - 8.0) < 0.01
+        assert 2.0 <= result.trimmed_duration < 3.0
+        assert abs(sf.info(result.path).duration - result.trimmed_duration) < 0.01
+    finally:
+        os.unlink(path)
+        if result.path and result.path != path:
+            os.unlink(result.path)
+
+def test_trim_file_in_blocks_matches_whole_file():
+    """Em blocos pequenos (estéreo), trim_file corta igual ao áudio inteiro na memória."""
+    config = VADConfig()
+    mono = np.concatenate([_silence(2), _speech(1), _silence(0.3), _speech(1, seed=1),
+                           _silence(4), _speech(1.2, seed=2), _silence(1.05)])
+    audio = np.column_stack([mono, mono // 2])
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
+        path = tmp.name
+    sf.write(path, audio, SR, subtype='PCM_16')
+    
+    result = trim_file(path, config, block_frames=5000)
+    try:
+        expected = trim_silence(audio, SR, config)
+        written, _ = sf.read(result.path, dtype='int16', always_2d=True)
+        assert np.array_equal(written, expected)
+        assert result.trimmed_duration == len(expected) / SR
+    finally:
+        os.unlink(path)
+        os.unlink(result.path)
+
+def test_split_with_overlap_cuts_in_pauses():
+    """Pedaços cortados nas pausas, cobrindo tudo com a sobreposição pedida."""
+    phrases = []
+    for i in range(40):
+        phrases += [_speech(2.5, seed=i), _silence(0.8)]
+    audio = np.concatenate(phrases)
+    blocks = (audio[i:i + 4096] for i in range(0, len(audio), 4096))
+    
+    chunks = list(split_with_overlap(blocks, SR, chunk_seconds=20, overlap_seconds=1, search_seconds=5))
+    assert len(chunks) > 5
+    for (start, samples), (next_start, _) in zip(chunks, chunks[1:]):
+        assert len(samples) <= 20 * SR
+        end = start + len(samples)
+        assert end - next_start == 1 * SR  # sobreposição exata
+        # Corte dentro de uma pausa (silêncio dos dois lados)
+        assert not audio[end - 800:end + 800].any()
+        assert np.array_equal(samples, audio[start:end])
+    last_start, last = chunks[-1]
+    assert last_start + len(last) == len(audio)
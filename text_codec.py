@@ -0,0 +1,126 @@
+"""
+Codificação compacta dos textos salvos no SQLite.
+
+Texto comum continua sendo TEXT (bancos antigos e ferramentas externas
+leem normalmente). Quando compensa, o valor vira BLOB com um byte de
+cabeçalho:
+
+    bits 0-3: compressor (0 = nenhum, 1 = zlib, 2 = zstd)
+    bit 4:    delta — o texto aprimorado é guardado como diferença
+              (por palavras) em relação ao texto original
+
+zstd requer o pacote opcional zstandard.
+"""
+
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+from typing import List, Optional, Union
+
+CODECS = {"zlib": 1, "zstd": 2}
+DELTA = 0x10
+
+# Abaixo disso o cabeçalho e o dicionário do compressor não compensam
+MIN_COMPRESS_BYTES = 64
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+
+_TOKEN = re.compile(r"\s+|\S+\s*")
+_zstd = {}
+
+def _zstd_module():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Compressão zstd requer o pacote zstandard (pip install zstandard)")
+    return zstandard
+
+def require_codec(codec: Optional[str]):
+    """Valida o nome do compressor (e se o pacote do zstd está instalado)."""
+    if codec is None:
+        return
+    if codec not in CODECS:
+        raise ValueError(f"Compressor desconhecido: {codec} (use {', '.join(CODECS)})")
+    if codec == "zstd":
+        _zstd_module()
+
+def _compress(data: bytes, codec: int) -> bytes:
+    if codec == 1:
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == 2:
+        if "compressor" not in _zstd:
+            _zstd["compressor"] = _zstd_module().ZstdCompressor(level=ZSTD_LEVEL)
+        return _zstd["compressor"].compress(data)
+    return data
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == 1:
+        return zlib.decompress(data)
+    if codec == 2:
+        if "decompressor" not in _zstd:
+            _zstd["decompressor"] = _zstd_module().ZstdDecompressor()
+        return _zstd["decompressor"].decompress(data)
+    return data
+
+def make_delta(base: str, text: str) -> List:
+    """Diferença por palavras: [início, fim] copia tokens de `base`; str insere."""
+    base_tokens = _TOKEN.findall(base)
+    tokens = _TOKEN.findall(text)
+    ops = []
+    matcher = SequenceMatcher(None, base_tokens, tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append("".join(tokens[j1:j2]))
+    return ops
+
+def apply_delta(base: str, ops: List) -> str:
+    base_tokens = _TOKEN.findall(base)
+    return "".join(
+        "".join(base_tokens[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in ops
+    )
+
+def encode(text: Optional[str],
+           codec: Optional[str] = None,
+           base: Optional[str] = None) -> Union[str, bytes, None]:
+    """Menor representação de `text`: TEXT puro, comprimido ou delta de `base`."""
+    if text is None:
+        return None
+    codec_id = CODECS[codec] if codec else 0
+    raw = text.encode("utf-8")
+    best: Union[str, bytes] = text
+    best_size = len(raw)
+
+    if codec_id and len(raw) >= MIN_COMPRESS_BYTES:
+        compressed = bytes([codec_id]) + _compress(raw, codec_id)
+        if len(compressed) < best_size:
+            best, best_size = compressed, len(compressed)
+
+    if base:
+        payload = json.dumps(make_delta(base, text), ensure_ascii=False,
+                             separators=(",", ":")).encode("utf-8")
+        delta_codec = codec_id if len(payload) >= MIN_COMPRESS_BYTES else 0
+        delta = bytes([DELTA | delta_codec]) + _compress(payload, delta_codec)
+        if len(delta) < best_size:
+            best = delta
+
+    return best
+
+def decode(value: Union[str, bytes, None], base: Optional[str] = None) -> Optional[str]:
+    """Inverso de `encode`; `base` é o texto original já decodificado (para deltas)."""
+    if value is None or isinstance(value, str):
+        return value
+    header = value[0]
+    payload = _decompress(value[1:], header & 0x0F)
+    if header & DELTA:
+        return apply_delta(base or "", json.loads(payload))
+    return payload.decode("utf-8")
+
+def sql_decode(value, base=None) -> Optional[str]:
+    """Função SQL `text_decode(valor[, original])`: `original` ainda codificado."""
+    if isinstance(value, bytes) and value[0] & DELTA:
+        return decode(value, decode(base))
+    return decode(value)
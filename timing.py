@@ -0,0 +1,61 @@
+"""
+Medição de latência por etapa do processamento.
+Os tempos vão para `metadata["timings"]` de cada transcrição.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Etapas conhecidas, na ordem do fluxo (outras podem ser registradas)
+STAGES = (
+    "job_queue",  # espera no agendador de jobs
+    "finalize",   # fechar a gravação/arquivo
+    "download",   # bot: baixar o áudio do Telegram
+    "encode",     # decodificação, corte de silêncio e recodificação
+    "queue",      # espera pela vaga de upload
+    "whisper",    # requisição de transcrição (upload + processamento)
+    "gpt",        # aprimoramento
+    "save",       # INSERT no SQLite
+    "clipboard",
+    "notion",
+    "total",
+)
+
+class StageTimer:
+    """Acumula a duração (s) de cada etapa; seguro entre threads."""
+
+    def __init__(self):
+        self._spans: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        """Mede o bloco e soma em `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self._spans[name] = self._spans.get(name, 0.0) + seconds
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._spans.get(name, 0.0)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Tempos em segundos (4 casas), prontos para o JSON de metadata."""
+        with self._lock:
+            return {name: round(seconds, 4) for name, seconds in self._spans.items()}
+
+def percentile(sorted_values, pct: float) -> float:
+    """Percentil por posição mais próxima (lista já ordenada)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(len(sorted_values) * pct / 100))
+    return sorted_values[rank - 1]
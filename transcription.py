@@ -0,0 +1,308 @@
+"""
+Backends de transcrição (Whisper via API ou local).
+O app desktop e o bot do Telegram usam a mesma interface.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AudioInput = Union[str, BinaryIO]
+
+# Configuração padrão (sobrescrita pelo config do app ou por variáveis de ambiente)
+DEFAULT_BACKEND_CONFIG = {
+    "transcription_backend": os.getenv("TRANSCRIPTION_BACKEND", "openai"),
+    "whisper_model": os.getenv("WHISPER_MODEL", "whisper-1"),
+    "local_whisper_model": os.getenv("LOCAL_WHISPER_MODEL", "small"),
+    "local_whisper_compute_type": os.getenv("LOCAL_WHISPER_COMPUTE_TYPE", "int8"),
+    "local_whisper_threads": int(os.getenv("LOCAL_WHISPER_THREADS", "4")),
+    "language": os.getenv("TRANSCRIPTION_LANGUAGE", "pt"),
+}
+
+class SpooledAudio(tempfile.SpooledTemporaryFile):
+    """Áudio em memória com nome de arquivo (a OpenAI usa a extensão).
+
+    Passa para disco (arquivo anônimo, apagado ao fechar) só acima de
+    `max_size` bytes. Enquanto está em memória não expõe `fileno()`: o
+    httpx chamaria para medir o upload e isso forçaria a ida ao disco.
+    """
+
+    def __init__(self, filename: str, max_size: int = 0):
+        super().__init__(max_size=max_size)
+        self.filename = filename
+
+    @property
+    def name(self) -> str:
+        return self.filename
+
+    @property
+    def in_memory(self) -> bool:
+        return not self._rolled
+
+    def fileno(self) -> int:
+        if not self._rolled:
+            raise io.UnsupportedOperation("fileno")
+        return super().fileno()
+
+@dataclass
+class TranscriptResult:
+    """Resultado de uma transcrição."""
+    text: str
+    model: str
+    cached: bool = False
+
+class TranscriptionBackend:
+    """Interface comum dos backends de transcrição."""
+
+    name = "base"
+    language: Optional[str] = None
+
+    @property
+    def model_name(self) -> str:
+        """Nome gravado em `Transcription.whisper_model` (usado no custo)."""
+        raise NotImplementedError
+
+    def transcribe(self, audio: AudioInput, language: Optional[str] = None) -> TranscriptResult:
+        """Transcreve um caminho de arquivo ou arquivo aberto (modo binário)."""
+        raise NotImplementedError
+
+    async def atranscribe(self, audio: AudioInput, language: Optional[str] = None) -> TranscriptResult:
+        """Versão assíncrona; por padrão roda `transcribe` numa thread
+        (backends locais são limitados por CPU, não por rede)."""
+        return await asyncio.to_thread(self.transcribe, audio, language)
+
+class OpenAIBackend(TranscriptionBackend):
+    """Whisper via API da OpenAI (cobrado por minuto)."""
+
+    name = "openai"
+
+    def __init__(self, model: str = "whisper-1", language: str = "pt"):
+        from openai_client import get_openai_client
+        from rate_limit import get_request_scheduler
+        self.model = model
+        self.language = language
+        self.client = get_openai_client()
+        self.scheduler = get_request_scheduler("audio")
+        self._async_client = None
+
+    @property
+    def model_name(self) -> str:
+        return self.model
+
+    def transcribe(self, audio: AudioInput, language: Optional[str] = None) -> TranscriptResult:
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                return self.transcribe(f, language)
+
+        position = audio.tell()
+
+        def create():
+            # Numa nova tentativa o upload recomeça do início do arquivo
+            audio.seek(position)
+            return self.client.audio.transcriptions.create(
+                model=self.model,
+                file=audio,
+                language=language or self.language
+            )
+
+        response = self.scheduler.call(create)
+        return TranscriptResult(response.text.strip(), self.model)
+
+    @property
+    def async_client(self):
+        """Cliente assíncrono compartilhado (criado no primeiro uso)."""
+        if self._async_client is None:
+            from openai_client import get_async_openai_client
+            self._async_client = get_async_openai_client()
+        return self._async_client
+
+    async def atranscribe(self, audio: AudioInput, language: Optional[str] = None) -> TranscriptResult:
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                return await self.atranscribe(f, language)
+
+        position = audio.tell()
+
+        async def create():
+            audio.seek(position)
+            return await self.async_client.audio.transcriptions.create(
+                model=self.model,
+                file=audio,
+                language=language or self.language
+            )
+
+        response = await self.scheduler.acall(create)
+        return TranscriptResult(response.text.strip(), self.model)
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """Whisper local na CPU via CTranslate2 (faster-whisper).
+
+    O modelo é carregado uma única vez e fica quente em memória; as
+    transcrições são serializadas por um lock porque o modelo já usa
+    `cpu_threads` threads internamente.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self,
+                 model: str = "small",
+                 compute_type: str = "int8",
+                 cpu_threads: int = 4,
+                 language: str = "pt"):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError(
+                "Backend local requer o pacote faster-whisper "
+                "(pip install faster-whisper)"
+            )
+
+        self.model = model
+        self.language = language
+        self._lock = threading.Lock()
+        self._model = WhisperModel(
+            model,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=cpu_threads
+        )
+
+    @property
+    def model_name(self) -> str:
+        # Prefixo evita colisão com preços da API (custo local = zero)
+        return f"faster-whisper-{self.model}"
+
+    def transcribe(self, audio: AudioInput, language: Optional[str] = None) -> TranscriptResult:
+        with self._lock:
+            segments, _info = self._model.transcribe(
+                audio,
+                language=language or self.language,
+                vad_filter=False  # o corte de silêncio já é feito pelo vad.py
+            )
+            text = " ".join(segment.text.strip() for segment in segments)
+        return TranscriptResult(text.strip(), self.model_name)
+
+class CachedBackend(TranscriptionBackend):
+    """Cache na frente de um backend, endereçado pelo hash do áudio.
+
+    A chave combina SHA-256 dos bytes do áudio, modelo e idioma. Um hit
+    devolve o texto guardado no SQLite sem chamar o Whisper (custo zero).
+    """
+
+    HASH_BLOCK = 1024 * 1024
+
+    def __init__(self, backend: TranscriptionBackend, storage):
+        self.backend = backend
+        self.storage = storage
+        self.name = backend.name
+        self.language = backend.language
+
+    @property
+    def model_name(self) -> str:
+        return self.backend.model_name
+
+    @classmethod
+    def hash_audio(cls, audio: BinaryIO) -> Tuple[str, int]:
+        """SHA-256 e tamanho do conteúdo, preservando a posição de leitura."""
+        position = audio.tell()
+        digest = hashlib.sha256()
+        size = 0
+        for block in iter(lambda: audio.read(cls.HASH_BLOCK), b""):
+            digest.update(block)
+            size += len(block)
+        audio.seek(position)
+        return digest.hexdigest(), size
+
+    def _cache_key(self, audio_hash: str, language: Optional[str]) -> str:
+        return hashlib.sha256(
+            f"{audio_hash}:{self.model_name}:{language}".encode()
+        ).hexdigest()
+
+    def transcribe(self, audio: AudioInput, language: Optional[str] = None) -> TranscriptResult:
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                return self.transcribe(f, language)
+
+        language = language or self.language
+        audio_hash, audio_bytes = self.hash_audio(audio)
+        cache_key = self._cache_key(audio_hash, language)
+
+        cached_text = self.storage.get_cached_transcription(cache_key)
+        if cached_text is not None:
+            return TranscriptResult(cached_text, self.model_name, cached=True)
+
+        result = self.backend.transcribe(audio, language)
+        self.storage.cache_transcription(
+            cache_key, audio_hash, self.model_name, language,
+            result.text, audio_bytes
+        )
+        return result
+
+    async def atranscribe(self, audio: AudioInput, language: Optional[str] = None) -> TranscriptResult:
+        """Como `transcribe`; hash e SQLite rodam fora do event loop."""
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                return await self.atranscribe(f, language)
+
+        language = language or self.language
+        audio_hash, audio_bytes = await asyncio.to_thread(self.hash_audio, audio)
+        cache_key = self._cache_key(audio_hash, language)
+
+        cached_text = await asyncio.to_thread(self.storage.get_cached_transcription, cache_key)
+        if cached_text is not None:
+            return TranscriptResult(cached_text, self.model_name, cached=True)
+
+        result = await self.backend.atranscribe(audio, language)
+        await asyncio.to_thread(
+            self.storage.cache_transcription,
+            cache_key, audio_hash, self.model_name, language,
+            result.text, audio_bytes
+        )
+        return result
+
+_backends: Dict[tuple, TranscriptionBackend] = {}
+_backends_lock = threading.Lock()
+
+def get_backend(config: Optional[Dict] = None) -> TranscriptionBackend:
+    """Retorna o backend configurado, criado uma vez por processo.
+
+    `config` usa as mesmas chaves de DEFAULT_BACKEND_CONFIG; as ausentes
+    vêm do ambiente. Chamadas repetidas com a mesma configuração reusam
+    a instância (e o modelo local já carregado).
+    """
+    settings = dict(DEFAULT_BACKEND_CONFIG)
+    settings.update({k: v for k, v in (config or {}).items() if k in settings})
+
+    kind = settings["transcription_backend"]
+    if kind == "openai":
+        key = (kind, settings["whisper_model"], settings["language"])
+    elif kind == "faster-whisper":
+        key = (kind, settings["local_whisper_model"],
+               settings["local_whisper_compute_type"],
+               settings["local_whisper_threads"], settings["language"])
+    else:
+        raise ValueError(f"Backend de transcrição desconhecido: {kind}")
+
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            if kind == "openai":
+                backend = OpenAIBackend(settings["whisper_model"], settings["language"])
+            else:
+                backend = FasterWhisperBackend(
+                    settings["local_whisper_model"],
+                    settings["local_whisper_compute_type"],
+                    settings["local_whisper_threads"],
+                    settings["language"]
+                )
+            _backends[key] = backend
+        return backend
@@ -0,0 +1,255 @@
+"""
+Detecção de atividade de voz (VAD) vetorizada com NumPy.
+Remove/encurta silêncios antes do upload para pagar só pela fala.
+"""
+
+import numpy as np
+import soundfile as sf
+import tempfile
+import os
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+@dataclass
+class VADConfig:
+    """Parâmetros do detector de fala."""
+    frame_ms: int = 30
+    # Energia RMS mínima (int16) para considerar fala, independente do ruído
+    min_energy: float = 300.0
+    # Fala = energia acima de `noise_ratio` x piso de ruído estimado
+    noise_ratio: float = 3.0
+    # Frames com energia intermediária contam como fala se a taxa de
+    # cruzamento por zero for alta (fricativas: "s", "f", "x")
+    zcr_threshold: float = 0.25
+    # Margem mantida antes/depois de cada trecho de fala
+    padding_ms: int = 300
+    # Pausas menores que isso são mantidas inteiras
+    min_silence_ms: int = 600
+
+@dataclass
+class TrimResult:
+    """Resultado do corte de silêncio de um arquivo."""
+    path: Optional[str]
+    original_duration: float
+    trimmed_duration: float
+
+    @property
+    def removed_seconds(self) -> float:
+        return self.original_duration - self.trimmed_duration
+
+def _to_mono(samples: np.ndarray) -> np.ndarray:
+    """Converte para mono float32 (média dos canais)."""
+    samples = np.asarray(samples)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    return samples.astype(np.float32, copy=False)
+
+def frame_features(samples: np.ndarray,
+                   sample_rate: int,
+                   frame_ms: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+    """Retorna (energia RMS, taxa de cruzamento por zero) por frame.
+
+    Frames incompletos no final são ignorados.
+    """
+    mono = _to_mono(samples)
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(mono) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, np.float32), np.zeros(0, np.float32)
+
+    frames = mono[:n_frames * frame_len].reshape(n_frames, frame_len)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_len
+    return energy, zcr.astype(np.float32)
+
+def _dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """Expande trechos True em `radius` frames para cada lado."""
+    if radius <= 0 or not mask.any():
+        return mask
+    kernel = np.ones(2 * radius + 1, dtype=np.int32)
+    # 'full' + recorte: 'same' devolveria len(kernel) elementos em máscaras curtas
+    return np.convolve(mask.astype(np.int32), kernel, mode='full')[radius:radius + len(mask)] > 0
+
+def _fill_short_gaps(mask: np.ndarray, min_gap: int) -> np.ndarray:
+    """Marca como fala as pausas internas menores que `min_gap` frames."""
+    if min_gap <= 0 or not mask.any():
+        return mask
+    mask = mask.copy()
+    edges = np.diff(mask.astype(np.int8))
+    gap_starts = np.flatnonzero(edges == -1) + 1
+    gap_ends = np.flatnonzero(edges == 1) + 1
+    # Só pausas internas (entre dois trechos de fala)
+    if len(gap_ends) and len(gap_starts) and gap_ends[0] < gap_starts[0]:
+        gap_ends = gap_ends[1:]
+    for start, end in zip(gap_starts, gap_ends):
+        if end - start < min_gap:
+            mask[start:end] = True
+    return mask
+
+def speech_mask(samples: np.ndarray,
+                sample_rate: int,
+                config: Optional[VADConfig] = None) -> np.ndarray:
+    """Retorna máscara booleana de fala por frame (com padding aplicado)."""
+    config = config or VADConfig()
+    energy, zcr = frame_features(samples, sample_rate, config.frame_ms)
+    return _mask_from_features(energy, zcr, config)
+
+def _mask_from_features(energy: np.ndarray, zcr: np.ndarray, config: VADConfig) -> np.ndarray:
+    """Máscara de fala a partir das features de todos os frames."""
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+
+    # Piso de ruído adaptativo: percentil baixo das energias
+    noise_floor = float(np.percentile(energy, 10))
+    threshold = max(config.min_energy, noise_floor * config.noise_ratio)
+
+    mask = (energy > threshold) | (
+        (energy > threshold / 2) & (zcr > config.zcr_threshold)
+    )
+
+    mask = _fill_short_gaps(mask, config.min_silence_ms // config.frame_ms)
+    return _dilate(mask, config.padding_ms // config.frame_ms)
+
+def speech_segments(samples: np.ndarray,
+                    sample_rate: int,
+                    config: Optional[VADConfig] = None) -> List[Tuple[int, int]]:
+    """Retorna trechos de fala como intervalos [início, fim) em amostras."""
+    config = config or VADConfig()
+    mask = speech_mask(samples, sample_rate, config)
+    frame_len = max(1, int(sample_rate * config.frame_ms / 1000))
+    return _mask_to_segments(mask, frame_len, len(samples))
+
+def _mask_to_segments(mask: np.ndarray, frame_len: int, total: int) -> List[Tuple[int, int]]:
+    """Intervalos [início, fim) em amostras dos trechos True da máscara."""
+    if not mask.any():
+        return []
+
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * frame_len
+    ends = np.minimum(np.flatnonzero(edges == -1) * frame_len, total)
+
+    # A sobra após o último frame completo acompanha o último trecho
+    if mask[-1]:
+        ends[-1] = total
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def trim_silence(samples: np.ndarray,
+                 sample_rate: int,
+                 config: Optional[VADConfig] = None) -> np.ndarray:
+    """Remove silêncios longos, mantendo o padding em volta da fala."""
+    segments = speech_segments(samples, sample_rate, config)
+    if not segments:
+        return samples[:0]
+    if len(segments) == 1 and segments[0] == (0, len(samples)):
+        return samples
+    return np.concatenate([samples[start:end] for start, end in segments])
+
+def quietest_point(samples: np.ndarray,
+                   sample_rate: int,
+                   frame_ms: int = 30,
+                   window_ms: int = 300) -> int:
+    """Posição (em amostras) do trecho mais silencioso de `samples`.
+
+    Usa a energia média numa janela deslizante de `window_ms`, então
+    prefere o meio de uma pausa a um vale curto entre duas sílabas.
+    """
+    energy, _ = frame_features(samples, sample_rate, frame_ms)
+    if len(energy) == 0:
+        return len(samples)
+    window = max(1, window_ms // frame_ms)
+    smoothed = np.convolve(energy, np.ones(window) / window, mode='same')
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    return int(np.argmin(smoothed)) * frame_len + frame_len // 2
+
+def split_with_overlap(blocks: Iterable[np.ndarray],
+                       sample_rate: int,
+                       chunk_seconds: float = 60.0,
+                       overlap_seconds: float = 1.5,
+                       search_seconds: float = 15.0) -> Iterator[Tuple[int, np.ndarray]]:
+    """Corta um fluxo de blocos em pedaços de até `chunk_seconds`.
+
+    O corte cai no ponto mais silencioso dos últimos `search_seconds` de
+    cada pedaço; o pedaço seguinte começa `overlap_seconds` antes do
+    corte (a repetição é removida ao juntar os textos). Retorna
+    (amostra inicial, amostras) e só guarda em memória um pedaço por vez.
+    """
+    chunk = int(chunk_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    if not overlap < search < chunk:
+        raise ValueError("Esperado overlap_seconds < search_seconds < chunk_seconds")
+
+    pending: List[np.ndarray] = []
+    pending_len = 0
+    start = 0  # posição absoluta de pending[0]
+    for block in blocks:
+        pending.append(block)
+        pending_len += len(block)
+        while pending_len >= chunk:
+            audio = np.concatenate(pending)
+            cut = chunk - search + quietest_point(audio[chunk - search:chunk], sample_rate)
+            yield start, audio[:cut]
+            pending = [audio[cut - overlap:]]
+            pending_len = len(pending[0])
+            start += cut - overlap
+
+    # O resto só vale como pedaço se tiver algo além da sobreposição
+    if pending_len > (overlap if start else 0):
+        yield start, np.concatenate(pending)
+
+def trim_file(path: str,
+              config: Optional[VADConfig] = None,
+              block_frames: int = 64 * 1024) -> TrimResult:
+    """Corta silêncios de um arquivo de áudio.
+
+    Grava o resultado num novo arquivo temporário no mesmo formato. Se
+    nada for removido, devolve o próprio `path`; se não houver fala,
+    `path` é None e `trimmed_duration` é zero.
+
+    Lê o arquivo em blocos duas vezes (features, depois cópia dos trechos
+    de fala), então a memória não cresce com a duração.
+    """
+    config = config or VADConfig()
+    info = sf.info(path)
+    sample_rate = info.samplerate
+    frame_len = max(1, int(sample_rate * config.frame_ms / 1000))
+    # Blocos com número inteiro de frames dão as mesmas features do arquivo inteiro
+    blocksize = max(1, block_frames // frame_len) * frame_len
+
+    energies, zcrs = [], []
+    total = 0
+    for block in sf.blocks(path, blocksize=blocksize, dtype='int16', always_2d=True):
+        energy, zcr = frame_features(block, sample_rate, config.frame_ms)
+        energies.append(energy)
+        zcrs.append(zcr)
+        total += len(block)
+    original_duration = total / sample_rate
+
+    mask = _mask_from_features(np.concatenate(energies or [np.zeros(0, np.float32)]),
+                               np.concatenate(zcrs or [np.zeros(0, np.float32)]), config)
+    segments = _mask_to_segments(mask, frame_len, total)
+    if not segments:
+        return TrimResult(None, original_duration, 0.0)
+    if segments == [(0, total)]:
+        return TrimResult(path, original_duration, original_duration)
+
+    suffix = os.path.splitext(path)[1] or '.wav'
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        trimmed_path = tmp.name
+
+    kept = 0
+    position = 0
+    with sf.SoundFile(trimmed_path, mode='w', samplerate=sample_rate, channels=info.channels,
+                      format=info.format, subtype=info.subtype) as writer:
+        for block in sf.blocks(path, blocksize=blocksize, dtype='int16', always_2d=True):
+            end = position + len(block)
+            for seg_start, seg_end in segments:
+                if seg_start < end and seg_end > position:
+                    part = block[max(seg_start, position) - position:min(seg_end, end) - position]
+                    writer.write(part)
+                    kept += len(part)
+            position = end
+
+    return TrimResult(trimmed_path, original_duration, kept / sample_rate)